@@ -0,0 +1,72 @@
+import json
+import logging
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+
+class AnalysisCache:
+    """
+    SQLite cache of DeepSeek analysis results keyed by text digest.
+
+    Every entry records the prompt/model fingerprint it was produced with;
+    entries from any other fingerprint are purged on startup, so editing
+    ``json_prompt_template`` or switching ``deepseek_model`` invalidates them.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS analysis_cache (
+        cache_key TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        result TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, db_path: str, fingerprint: str):
+        self.db_path = db_path
+        self.fingerprint = fingerprint
+        self._setup()
+
+    def _setup(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            purged = conn.execute(
+                "DELETE FROM analysis_cache WHERE fingerprint != ?", (self.fingerprint,)
+            ).rowcount
+        if purged:
+            logging.info(f"Purged {purged} cached analyses from an older prompt/model")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, cache_key: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM analysis_cache WHERE cache_key = ? AND fingerprint = ?",
+                (cache_key, self.fingerprint),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, cache_key: str, result: Dict):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO analysis_cache (cache_key, fingerprint, result, created_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (
+                    cache_key,
+                    self.fingerprint,
+                    json.dumps(result, ensure_ascii=False),
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
@@ -1,16 +1,80 @@
 import fitz  # PyMuPDF
-import requests
+import hashlib
 import os
 import json
-import time
 import logging
 import re
-from typing import List, Dict, Optional
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import metrics
+from figure_detection import caption_for_rect, find_captions, render_vector_figures
+from llm_client import LLMAuthError, LLMClient, LLMClientError
+from text_chunking import estimate_tokens, merge_partial_analyses, split_into_chunks, strip_references
+
+
+def _extract_page_range_text(source: Union[str, bytes], start: int, stop: int) -> List[Tuple[int, str]]:
+    """
+    Process-pool entry point: open a private document and extract pages [start, stop).
+    """
+    if isinstance(source, (bytes, bytearray)):
+        doc = fitz.open(stream=bytes(source), filetype="pdf")
+    else:
+        doc = fitz.open(source)
+    page_texts = []
+    try:
+        for page_num in range(start, stop):
+            try:
+                page_texts.append((page_num, doc.load_page(page_num).get_text("text")))
+            except Exception as e:
+                logging.warning(f"  [Warning] Error extracting text from page {page_num + 1}: {e}")
+    finally:
+        doc.close()
+    return page_texts
+
+
+DEFAULT_API_URL = "https://api.deepseek.com/chat/completions"
+DEFAULT_MODEL = "deepseek-chat"
+
 
 class AnalysisService:
-    def __init__(self):
-        self.deepseek_api_url = "https://api.deepseek.com/chat/completions"
-        self.deepseek_model = "deepseek-chat"
+    def __init__(
+        self,
+        text_workers: Optional[int] = None,
+        sharded_text_min_pages: int = 64,
+        llm_client: Optional[LLMClient] = None,
+        figure_mode: str = "raster",
+        figure_dpi: int = 150,
+        figure_parallel_min_pages: int = 8,
+        api_url: Optional[str] = None,
+        model: Optional[str] = None,
+    ):
+        # Text of documents with at least this many pages is extracted by a
+        # process pool; 0 disables sharding.
+        self.text_workers = text_workers or os.cpu_count() or 2
+        self.sharded_text_min_pages = sharded_text_min_pages
+        self._text_pool: Optional[ProcessPoolExecutor] = None
+        self._text_pool_lock = threading.Lock()
+        # "raster" saves embedded images only; "captions" additionally links
+        # figures to their "Fig. N"/"图N" captions and rasterizes drawn
+        # (vector) figures at figure_dpi. Documents with at least
+        # figure_parallel_min_pages pages are scanned by the process pool.
+        self.figure_mode = figure_mode
+        self.figure_dpi = figure_dpi
+        self.figure_parallel_min_pages = figure_parallel_min_pages
+        # Texts above max_input_tokens (after stripping references) are split
+        # into chunk_tokens-sized chunks and analyzed map-reduce style.
+        self.max_input_tokens = 48000
+        self.chunk_tokens = 12000
+        self.chunk_workers = 4
+        self.llm_client = llm_client or LLMClient()
+        # Any OpenAI-compatible chat completions endpoint, e.g. llm_stub.py.
+        self.deepseek_api_url = api_url or DEFAULT_API_URL
+        self.deepseek_model = model or DEFAULT_MODEL
         self.json_prompt_template = """
 你是专业的文献分析专家，擅长从学术论文中提取核心信息并生成结构化总结。
 请根据我提供的以下文献全文，严格按照这个JSON结构，提取并总结文献的核心信息：
@@ -56,6 +120,51 @@ class AnalysisService:
 
 请只返回填充好的JSON代码块，不要包含其他任何解释性文字。
 """
+        self.report_prompt_template = """请根据以下文献信息生成一份专业的研究进展汇报。这是用于组会汇报的材料。
+
+汇报应该包括以下结构:
+1. 本周研究进展概述（简洁的总结）
+2. 文献阅读与理解
+   - 阅读的主要文献及其核心内容
+   - 关键创新点和发现
+3. 主要工作完成情况
+4. 存在的问题与挑战
+5. 下周计划与展望
+
+请用中文生成汇报内容，格式专业、清晰、便于在组会上展示。使用markdown格式，包含适当的标题和列表。"""
+        self.report_max_tokens = 2500
+
+    def analysis_fingerprint(self) -> str:
+        """
+        Digest of everything besides the text that shapes an analysis result.
+        """
+        material = (
+            f"{self.deepseek_model}\n{self.json_prompt_template}\n"
+            f"{self.max_input_tokens}/{self.chunk_tokens}"
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def report_fingerprint(self) -> str:
+        material = f"{self.deepseek_model}\n{self.report_prompt_template}\n{self.report_max_tokens}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def report_cache_key(self, papers: List[Dict], additional_work: str) -> str:
+        """
+        Digest of the report inputs: the projected papers (in id order) and
+        the free-text additional work.
+        """
+        ordered = sorted(papers, key=lambda paper: str(paper.get("id")))
+        digest = hashlib.sha256()
+        digest.update(self.report_fingerprint().encode("utf-8"))
+        digest.update(json.dumps(ordered, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        digest.update(additional_work.encode("utf-8"))
+        return digest.hexdigest()
+
+    def analysis_cache_key(self, full_text: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(self.analysis_fingerprint().encode("utf-8"))
+        digest.update(full_text.encode("utf-8"))
+        return digest.hexdigest()
 
     def clean_json_response(self, response_text: str) -> Optional[str]:
         """
@@ -84,38 +193,333 @@ class AnalysisService:
             logging.debug(f"Raw response (first 200 chars): {response_text[:200]}")
             return None
 
-    def extract_text_from_pdf(self, pdf_path: str) -> Optional[str]:
+    def _open_document(self, source: Union[str, bytes]):
+        """
+        Open a PDF given either a filesystem path or the raw bytes.
+        """
+        if isinstance(source, (bytes, bytearray)):
+            return fitz.open(stream=bytes(source), filetype="pdf")
+        return fitz.open(source)
+
+    def _describe_source(self, source: Union[str, bytes]) -> str:
+        if isinstance(source, (bytes, bytearray)):
+            return f"<in-memory PDF, {len(source)} bytes>"
+        return source
+
+    def _join_page_texts(self, page_texts: List[str]) -> str:
+        full_text = "".join(f"{text}\n\n" for text in page_texts)
+        return full_text.replace("-\n", "") # Merge hyphenated words
+
+    def _save_page_images(
+        self,
+        doc,
+        page_num: int,
+        output_dir: str,
+        start_index: int,
+        seen: Optional[Set] = None,
+        placements: Optional[Dict[str, int]] = None,
+    ) -> List[str]:
+        """
+        Save the embedded raster images of one page as fig<N>.<ext>.
+        Filters small images (100x100). ``seen`` is shared across the pages
+        of a document so an xref (or identical bytes under another xref,
+        e.g. a masthead logo) is only saved the first time it appears.
+        ``placements`` receives the xref of every saved file.
+        """
+        saved = []
+        image_counter = start_index
+        seen = seen if seen is not None else set()
+        for img_info in doc.get_page_images(page_num, full=True):
+            xref = img_info[0]
+            if ("xref", xref) in seen:
+                continue
+            seen.add(("xref", xref))
+            try:
+                base_image = doc.extract_image(xref)
+
+                img_width = base_image["width"]
+                img_height = base_image["height"]
+                if img_width < 100 or img_height < 100:
+                    logging.debug(f"  Skipping small image (Size: {img_width}x{img_height})")
+                    continue
+
+                digest = hashlib.sha256(base_image["image"]).hexdigest()
+                if ("sha256", digest) in seen:
+                    logging.debug(f"  Skipping repeated image on page {page_num + 1} (xref {xref})")
+                    continue
+                seen.add(("sha256", digest))
+
+                image_filename = f"fig{image_counter}.{base_image['ext']}"
+                with open(os.path.join(output_dir, image_filename), "wb") as img_file:
+                    img_file.write(base_image["image"])
+
+                saved.append(image_filename)
+                if placements is not None:
+                    placements[image_filename] = xref
+                image_counter += 1
+
+            except Exception as e:
+                logging.debug(f"  Error extracting xref {xref}: {e}")
+        return saved
+
+    def _detect_vector_figures(self, source: Union[str, bytes], page_count: int) -> Dict[int, List[Dict]]:
+        """
+        Rasterized vector figures by 1-based page number, in reading order.
+        """
+        use_pool = 0 < self.figure_parallel_min_pages <= page_count and self.text_workers > 1
+        if use_pool:
+            shard = max(1, -(-page_count // self.text_workers))
+            pool = self._get_text_pool()
+            futures = [
+                pool.submit(render_vector_figures, source, list(range(start, min(start + shard, page_count))), self.figure_dpi)
+                for start in range(0, page_count, shard)
+            ]
+            detected = [figure for future in futures for figure in future.result()]
+        else:
+            detected = render_vector_figures(source, list(range(page_count)), self.figure_dpi)
+
+        by_page: Dict[int, List[Dict]] = {}
+        for figure in detected:
+            by_page.setdefault(figure["page"], []).append(figure)
+        for figures in by_page.values():
+            figures.sort(key=lambda f: f["y"])
+        return by_page
+
+    def _save_vector_figures(self, detected: List[Dict], output_dir: str, start_index: int) -> List[Dict]:
+        saved = []
+        for offset, figure in enumerate(detected):
+            filename = f"fig{start_index + offset}.png"
+            with open(os.path.join(output_dir, filename), "wb") as img_file:
+                img_file.write(figure["png"])
+            saved.append({
+                "filename": filename,
+                "page": figure["page"],
+                "source": "vector",
+                "caption": figure["caption"],
+                "figure_label": figure["label"],
+            })
+        return saved
+
+    def _link_raster_captions(self, page, page_num: int, saved: List[str], placements: Dict[str, int]) -> List[Dict]:
+        captions = find_captions(page) if page is not None and saved else []
+        linked = []
+        for filename in saved:
+            caption = None
+            try:
+                rects = page.get_image_rects(placements[filename]) if captions else []
+                caption = caption_for_rect(captions, rects[0]) if rects else None
+            except Exception as e:
+                logging.debug(f"  Cannot locate {filename} on page {page_num + 1}: {e}")
+            linked.append({
+                "filename": filename,
+                "page": page_num + 1,
+                "source": "raster",
+                "caption": caption["text"] if caption else "",
+                "figure_label": caption["label"] if caption else "",
+            })
+        return linked
+
+    def extract_document(self, source: Union[str, bytes], output_dir: Optional[str] = None) -> Optional[Dict]:
+        """
+        [Stage 1] Single pass over the PDF yielding text, images and page metadata.
+
+        ``source`` may be a path or the PDF bytes. Images are only written
+        when ``output_dir`` is given; in "captions" figure mode ``figures``
+        then lists each file with its page, source (raster/vector) and
+        caption. ``timings`` holds the seconds spent on text and on images.
+        Returns None if the PDF cannot be opened.
+        """
+        label = self._describe_source(source)
+        logging.info(f"[Stage 1] Processing PDF: {label}")
+
+        try:
+            doc = self._open_document(source)
+        except Exception as e:
+            logging.error(f"  [Error] Cannot open PDF {label}. {e}")
+            return None
+
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+            logging.info(f"  Created image directory: {output_dir}")
+
+        page_count = len(doc)
+        timings = {"text_extraction": 0.0, "image_extraction": 0.0}
+        shard_futures = None
+        if self._should_shard(page_count):
+            # Text shards run in the pool while this process saves the figures.
+            shard_futures = self._submit_text_shards(source, page_count)
+
+        link_figures = bool(output_dir) and self.figure_mode == "captions"
+        vector_figures: Dict[int, List[Dict]] = {}
+        if link_figures:
+            started = time.perf_counter()
+            try:
+                vector_figures = self._detect_vector_figures(source, page_count)
+            except Exception as e:
+                logging.warning(f"  [Warning] Vector figure detection failed: {e}")
+            timings["image_extraction"] += time.perf_counter() - started
+
+        page_texts = []
+        image_files = []
+        figures = []
+        pages = []
+        seen_images: Set = set()
+        for page_num in range(page_count):
+            text = ""
+            page = None
+            started = time.perf_counter()
+            try:
+                page = doc.load_page(page_num)
+                if shard_futures is None:
+                    text = page.get_text("text")
+                width, height = page.rect.width, page.rect.height
+            except Exception as e:
+                logging.warning(f"  [Warning] Error extracting text from page {page_num + 1}: {e}")
+                width = height = 0
+            else:
+                page_texts.append(text)
+            timings["text_extraction"] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            saved = []
+            if output_dir:
+                placements: Dict[str, int] = {}
+                saved = self._save_page_images(
+                    doc, page_num, output_dir, len(image_files) + 1, seen_images, placements
+                )
+                image_files.extend(saved)
+            if link_figures:
+                figures.extend(self._link_raster_captions(page, page_num, saved, placements))
+                vector_saved = self._save_vector_figures(
+                    vector_figures.get(page_num + 1, []), output_dir, len(image_files) + 1
+                )
+                image_files.extend(figure["filename"] for figure in vector_saved)
+                saved = saved + [figure["filename"] for figure in vector_saved]
+                figures.extend(vector_saved)
+            timings["image_extraction"] += time.perf_counter() - started
+
+            pages.append({
+                "page": page_num + 1,
+                "width": width,
+                "height": height,
+                "chars": len(text),
+                "images": saved,
+            })
+
+        if shard_futures is not None:
+            started = time.perf_counter()
+            texts_by_page = self._collect_text_shards(shard_futures)
+            timings["text_extraction"] += time.perf_counter() - started
+            page_texts = [texts_by_page[num] for num in sorted(texts_by_page)]
+            for entry in pages:
+                entry["chars"] = len(texts_by_page.get(entry["page"] - 1, ""))
+
+        doc.close()
+        full_text = self._join_page_texts(page_texts)
+        logging.info(
+            f"[Stage 1] Extraction complete! {len(pages)} pages, "
+            f"{len(full_text)} chars, {len(image_files)} images."
+        )
+        return {
+            "text": full_text,
+            "image_files": image_files,
+            "pages": pages,
+            "figures": figures,
+            "timings": timings,
+        }
+
+    def extract_text_from_pdf(self, pdf_path: Union[str, bytes]) -> Optional[str]:
         """
         [Stage 1b] Extract all text from PDF.
         """
-        logging.info(f"[Stage 1b] Processing PDF: {pdf_path}")
+        label = self._describe_source(pdf_path)
+        logging.info(f"[Stage 1b] Processing PDF: {label}")
         
         try:
-            doc = fitz.open(pdf_path)
+            doc = self._open_document(pdf_path)
         except Exception as e:
-            logging.error(f"  [Error] Cannot open PDF {pdf_path}. {e}")
+            logging.error(f"  [Error] Cannot open PDF {label}. {e}")
             return None
 
-        full_text = ""
+        page_texts = []
         for page_num in range(len(doc)):
             try:
                 page = doc.load_page(page_num)
-                full_text += page.get_text("text")
-                full_text += "\n\n"
+                page_texts.append(page.get_text("text"))
             except Exception as e:
                 logging.warning(f"  [Warning] Error extracting text from page {page_num + 1}: {e}")
 
         doc.close()
-        full_text = full_text.replace("-\n", "") # Merge hyphenated words
+        full_text = self._join_page_texts(page_texts)
+        logging.info(f"[Stage 1b] Text extraction complete! Total chars: {len(full_text)}.")
+        return full_text
+
+    def _get_text_pool(self) -> ProcessPoolExecutor:
+        with self._text_pool_lock:
+            if self._text_pool is None:
+                self._text_pool = ProcessPoolExecutor(
+                    max_workers=self.text_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._text_pool
+
+    def close(self):
+        with self._text_pool_lock:
+            if self._text_pool is not None:
+                self._text_pool.shutdown(wait=True)
+                self._text_pool = None
+
+    def _should_shard(self, page_count: int) -> bool:
+        return 0 < self.sharded_text_min_pages <= page_count and self.text_workers > 1
+
+    def _submit_text_shards(self, source: Union[str, bytes], page_count: int, pages_per_shard: Optional[int] = None):
+        shard = pages_per_shard or max(1, -(-page_count // self.text_workers))
+        ranges = [(start, min(start + shard, page_count)) for start in range(0, page_count, shard)]
+        logging.info(f"  Sharding text extraction: {page_count} pages in {len(ranges)} shards")
+        pool = self._get_text_pool()
+        return [pool.submit(_extract_page_range_text, source, start, stop) for start, stop in ranges]
+
+    def _collect_text_shards(self, futures) -> Dict[int, str]:
+        texts_by_page = {}
+        for future in futures:
+            texts_by_page.update(future.result())
+        return texts_by_page
+
+    def extract_text_sharded(self, pdf_path: Union[str, bytes], pages_per_shard: Optional[int] = None) -> Optional[str]:
+        """
+        [Stage 1b] Extract text with page ranges spread across a process pool.
+
+        Each worker opens its own fitz document; results are joined in page
+        order and match ``extract_text_from_pdf`` exactly. Documents shorter
+        than ``sharded_text_min_pages`` are extracted in-process.
+        """
+        label = self._describe_source(pdf_path)
+        try:
+            doc = self._open_document(pdf_path)
+            page_count = len(doc)
+            doc.close()
+        except Exception as e:
+            logging.error(f"  [Error] Cannot open PDF {label}. {e}")
+            return None
+
+        if not self._should_shard(page_count) and pages_per_shard is None:
+            return self.extract_text_from_pdf(pdf_path)
+
+        logging.info(f"[Stage 1b] Processing PDF: {label}")
+        texts_by_page = self._collect_text_shards(
+            self._submit_text_shards(pdf_path, page_count, pages_per_shard)
+        )
+        full_text = self._join_page_texts([texts_by_page[num] for num in sorted(texts_by_page)])
         logging.info(f"[Stage 1b] Text extraction complete! Total chars: {len(full_text)}.")
         return full_text
 
-    def extract_images_from_pdf(self, pdf_path: str, output_dir: str) -> List[str]:
+    def extract_images_from_pdf(self, pdf_path: Union[str, bytes], output_dir: str) -> List[str]:
         """
         [Stage 1a] Extract images from PDF and save to directory.
         Filters small images (100x100).
         """
-        logging.info(f"[Stage 1a] Extracting images: {pdf_path}")
+        label = self._describe_source(pdf_path)
+        logging.info(f"[Stage 1a] Extracting images: {label}")
         
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
@@ -123,57 +527,28 @@ class AnalysisService:
 
         saved_image_paths = []
         try:
-            doc = fitz.open(pdf_path)
+            doc = self._open_document(pdf_path)
         except Exception as e:
-            logging.error(f"  [Error] Cannot open PDF {pdf_path}. {e}")
+            logging.error(f"  [Error] Cannot open PDF {label}. {e}")
             return []
 
-        image_counter = 1
-        
+        seen_images: Set = set()
         for page_num in range(len(doc)):
-            image_list = doc.get_page_images(page_num, full=True)
-
-            for img_info in image_list:
-                xref = img_info[0]
-                try:
-                    base_image = doc.extract_image(xref)
-                    
-                    img_width = base_image["width"]
-                    img_height = base_image["height"]
-                    if img_width < 100 or img_height < 100:
-                        logging.debug(f"  Skipping small image (Size: {img_width}x{img_height})")
-                        continue
-                    
-                    image_bytes = base_image["image"]
-                    image_ext = base_image["ext"]
-                    
-                    image_filename = f"fig{image_counter}.{image_ext}"
-                    image_path = os.path.join(output_dir, image_filename)
-                    
-                    with open(image_path, "wb") as img_file:
-                        img_file.write(image_bytes)
-                    
-                    saved_image_paths.append(image_filename)
-                    image_counter += 1
-                    
-                except Exception as e:
-                    logging.debug(f"  Error extracting xref {xref}: {e}")
-                    pass
+            saved_image_paths.extend(
+                self._save_page_images(doc, page_num, output_dir, len(saved_image_paths) + 1, seen_images)
+            )
 
         doc.close()
         logging.info(f"[Stage 1a] Image extraction complete! Saved {len(saved_image_paths)} images to {output_dir}")
         return saved_image_paths
 
-    def analyze_text_with_deepseek(self, full_text: str, api_key: str, retries=3, delay=10) -> Optional[Dict]:
-        """
-        [Stage 2] Send full text to DeepSeek API.
-        """
-        logging.info(f"  [Stage 2] Sending full text ({len(full_text)} chars) to DeepSeek...")
-        
-        if not api_key or "sk-" not in api_key:
-            logging.error("  [Error] Invalid API Key provided!")
-            return {"error": "Invalid API Key provided"}
-
+    def _chat_request(
+        self,
+        messages: List[Dict],
+        api_key: str,
+        max_tokens: int = 4096,
+        temperature: float = 0.1,
+    ) -> Tuple[Dict, Dict]:
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
@@ -181,39 +556,306 @@ class AnalysisService:
         
         payload = {
             "model": self.deepseek_model,
-            "messages": [
-                {"role": "system", "content": self.json_prompt_template},
-                {"role": "user", "content": f"这是我需要你分析的文献全文：\n\n{full_text}"}
-            ],
-            "max_tokens": 4096,
-            "temperature": 0.1
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        return headers, payload
+
+    def _analysis_messages(self, full_text: str) -> List[Dict]:
+        return [
+            {"role": "system", "content": self.json_prompt_template},
+            {"role": "user", "content": f"这是我需要你分析的文献全文：\n\n{full_text}"}
+        ]
+
+    def _chunk_messages(self, chunk: str, index: int, total: int) -> List[Dict]:
+        return [
+            {"role": "system", "content": self.json_prompt_template},
+            {"role": "user", "content": (
+                f"这是文献的第 {index}/{total} 部分（不是全文）。请只根据这一部分填写JSON，"
+                f"无法从这一部分确定的字段留空字符串或空列表：\n\n{chunk}"
+            )}
+        ]
+
+    def _reduce_messages(self, partials: List[Dict]) -> List[Dict]:
+        partial_json = json.dumps(partials, ensure_ascii=False)
+        return [
+            {"role": "system", "content": self.json_prompt_template},
+            {"role": "user", "content": (
+                "以下是同一篇文献按部分分别分析得到的JSON结果列表。请将它们合并、去重并整理为"
+                f"一份完整的结果，保持相同的JSON结构：\n\n{partial_json}"
+            )}
+        ]
+
+    def _report_messages(self, papers: List[Dict], additional_work: str) -> List[Dict]:
+        """
+        One compact text block per paper instead of the full records.
+        Papers carrying a ``topic_group`` label are listed under a heading
+        per group so the report can discuss related work together.
+        """
+        blocks = []
+        current_group = None
+        for index, paper in enumerate(papers, start=1):
+            group = paper.get("topic_group")
+            if group is not None and group != current_group:
+                blocks.append(f"## {group}")
+                current_group = group
+            meta = paper.get("文献信息") or {}
+            content = paper.get("内容提取") or {}
+            authors = meta.get("作者") or []
+            if isinstance(authors, list):
+                authors = ", ".join(authors[:3]) + (" 等" if len(authors) > 3 else "")
+            source = ", ".join(str(part) for part in (meta.get("期刊"), meta.get("年份")) if part)
+            lines = [f"[{index}] {meta.get('标题') or '无标题'}" + (f" ({source})" if source else "")]
+            if authors:
+                lines.append(f"作者: {authors}")
+            for label, key in (("摘要", "摘要"), ("结论", "结论"), ("创新点", "创新点")):
+                value = content.get(key)
+                if isinstance(value, list):
+                    value = "\n".join(f"- {item}" for item in value if item)
+                if value:
+                    lines.append(f"{label}:\n{value}" if "\n" in str(value) else f"{label}: {value}")
+            blocks.append("\n".join(lines))
+
+        user_content = "文献信息:\n\n" + "\n\n".join(blocks)
+        if additional_work:
+            user_content += f"\n\n补充工作内容：\n{additional_work}"
+        return [
+            {"role": "system", "content": self.report_prompt_template},
+            {"role": "user", "content": user_content},
+        ]
+
+    def generate_report(self, papers: List[Dict], additional_work: str, api_key: str) -> Dict:
+        """
+        Write a markdown progress report over the given (projected) papers.
+
+        Returns ``{"report", "token_usage"}`` or an ``{"error": ...}`` dict.
+        """
+        messages = self._report_messages(papers, additional_work)
+        headers, payload = self._chat_request(
+            messages, api_key, max_tokens=self.report_max_tokens, temperature=0.7
+        )
+        try:
+            result = self.llm_client.post_json(self.deepseek_api_url, headers, payload)
+            report = result["choices"][0]["message"]["content"]
+        except LLMClientError as e:
+            return {"error": f"Report generation failed: {e}"}
+        except (KeyError, IndexError, TypeError) as e:
+            return {"error": f"Unusable API response: {e}"}
+        return {
+            "report": report,
+            "token_usage": self.usage_summary([result.get("usage") or {}], mode="report"),
         }
 
+    def _build_analysis_request(self, full_text: str, api_key: str) -> Tuple[Dict, Dict]:
+        return self._chat_request(self._analysis_messages(full_text), api_key)
+
+    def parse_analysis_text(self, analysis_text: str) -> Dict:
+        """
+        Turn the raw completion text into the analysis dict (or an error dict).
+        """
+        json_string = self.clean_json_response(analysis_text)
+        if json_string:
+            return json.loads(json_string)
+        logging.error(f"  [Error] clean_json_response failed to extract JSON.")
+        return {"error": "AI response was not valid JSON", "raw_response": analysis_text}
+
+    def stream_analysis_with_deepseek(self, full_text: str, api_key: str) -> Iterator[Tuple[str, object]]:
+        """
+        [Stage 2, streaming] Yield ("delta", text) as tokens arrive, then
+        exactly one ("result", dict) or ("error", message).
+        """
+        full_text = self.prepare_text(full_text)
+        logging.info(f"  [Stage 2] Streaming full text ({len(full_text)} chars) to DeepSeek...")
+
+        if not api_key or "sk-" not in api_key:
+            logging.error("  [Error] Invalid API Key provided!")
+            yield "error", "Invalid API Key provided"
+            return
+
+        headers, payload = self._build_analysis_request(full_text, api_key)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+
+        chunks = []
+        usage = {}
+        try:
+            with self.llm_client.open_stream(self.deepseek_api_url, headers, payload) as response:
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    if event.get("usage"):
+                        usage = event["usage"]
+                    if not event.get("choices"):
+                        continue
+                    delta = event["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        chunks.append(delta)
+                        yield "delta", delta
+        except LLMClientError as e:
+            logging.error(f"  [Error] Streaming API Request Failed: {e}")
+            yield "error", str(e)
+            return
+        except Exception as e:
+            logging.error(f"  [Error] Streaming API Request Failed: {e}")
+            yield "error", f"API request failed: {e}"
+            return
+
+        try:
+            result = self.parse_analysis_text("".join(chunks))
+            if "error" not in result:
+                result["token_usage"] = self.usage_summary([usage], mode="stream")
+            yield "result", result
+        except Exception as e:
+            logging.error(f"  [Error] Streamed response was not valid JSON: {e}")
+            yield "error", "AI response was not valid JSON"
+
+    def usage_summary(self, usages: List[Dict], mode: str, chunks: int = 1) -> Dict:
+        totals = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        for usage in usages:
+            for key in totals:
+                totals[key] += int((usage or {}).get(key) or 0)
+        totals.update({"calls": len(usages), "mode": mode, "chunks": chunks})
+        # Every completed LLM result passes through here exactly once.
+        metrics.observe_tokens(totals, mode)
+        return totals
+
+    def _complete_json(
+        self,
+        messages: List[Dict],
+        api_key: str,
+        retries=3,
+        throttle: Optional[Callable[[], ContextManager]] = None,
+    ) -> Dict:
+        """
+        POST one chat completion and parse its JSON answer.
+
+        Transport retries, backoff and the circuit breaker live in
+        ``self.llm_client``; a reply that does not parse as JSON is re-asked
+        up to ``retries`` times. Every request, re-asks included, is made
+        inside ``throttle()`` when given. Returns the parsed dict with the raw
+        API ``usage`` under ``_usage``, or an ``{"error": ...}`` dict.
+        """
+        headers, payload = self._chat_request(messages, api_key)
+
         for attempt in range(retries):
             try:
-                response = requests.post(self.deepseek_api_url, headers=headers, json=payload, timeout=300)
-                response.raise_for_status()
-                
-                result = response.json()
+                with throttle() if throttle else nullcontext():
+                    result = self.llm_client.post_json(self.deepseek_api_url, headers, payload)
+            except LLMAuthError as e:
+                logging.error("  [Critical] 401 Unauthorized - Check your API Key.")
+                return {"error": str(e)}
+            except LLMClientError as e:
+                return {"error": f"API analysis failed: {e}"}
+
+            try:
                 analysis_text = result['choices'][0]['message']['content']
-                
-                json_string = self.clean_json_response(analysis_text)
-                if json_string:
-                    parsed_json = json.loads(json_string)
-                    return parsed_json
-                else:
-                    logging.error(f"  [Error] clean_json_response failed to extract JSON.")
-                    return {"error": "AI response was not valid JSON", "raw_response": analysis_text}
-
-            except requests.exceptions.HTTPError as e:
-                logging.error(f"  [Error] HTTP Error (Attempt {attempt + 1}/{retries}): {e}")
-                if e.response.status_code == 401:
-                     logging.error("  [Critical] 401 Unauthorized - Check your API Key.")
-                     return {"error": "401 Unauthorized - Invalid API Key"}
-                time.sleep(delay)
-                delay *= 2
+                parsed = self.parse_analysis_text(analysis_text)
             except Exception as e:
-                logging.error(f"  [Error] API Request Failed (Attempt {attempt + 1}/{retries}): {e}")
-                time.sleep(delay)
-                
-        return {"error": "API analysis failed after multiple retries"}
\ No newline at end of file
+                logging.error(f"  [Error] Unusable API response (Attempt {attempt + 1}/{retries}): {e}")
+                continue
+            if "error" in parsed:
+                logging.error(f"  [Error] No JSON in API response (Attempt {attempt + 1}/{retries})")
+                continue
+            parsed["_usage"] = result.get("usage") or {}
+            return parsed
+
+        return {"error": "API analysis failed after multiple retries"}
+
+    def analyze_text_with_deepseek(
+        self,
+        full_text: str,
+        api_key: str,
+        retries=3,
+        throttle: Optional[Callable[[], ContextManager]] = None,
+    ) -> Optional[Dict]:
+        """
+        [Stage 2] Send full text to DeepSeek API.
+        """
+        logging.info(f"  [Stage 2] Sending full text ({len(full_text)} chars) to DeepSeek...")
+        
+        if not api_key or "sk-" not in api_key:
+            logging.error("  [Error] Invalid API Key provided!")
+            return {"error": "Invalid API Key provided"}
+
+        result = self._complete_json(self._analysis_messages(full_text), api_key, retries, throttle)
+        usage = result.pop("_usage", {})
+        if "error" not in result:
+            result["token_usage"] = self.usage_summary([usage], mode="single")
+        return result
+
+    def prepare_text(self, full_text: str) -> str:
+        """
+        Strip the reference list before anything is sent to the LLM.
+        """
+        return strip_references(full_text)
+
+    def needs_chunking(self, full_text: str) -> bool:
+        return estimate_tokens(self.prepare_text(full_text)) > self.max_input_tokens
+
+    def analyze_full_text(
+        self,
+        full_text: str,
+        api_key: str,
+        throttle: Optional[Callable[[], ContextManager]] = None,
+    ) -> Optional[Dict]:
+        """
+        [Stage 2] Analyze a paper, switching to map-reduce for long texts.
+
+        ``throttle()`` returns a context manager held around each LLM request
+        (to pace and cap concurrent requests); a chunked analysis makes one
+        request per chunk plus the merge.
+        """
+        text = self.prepare_text(full_text)
+        if len(text) < len(full_text):
+            logging.info(f"  [Stage 2] Stripped references: {len(full_text)} -> {len(text)} chars")
+        if estimate_tokens(text) <= self.max_input_tokens:
+            return self.analyze_text_with_deepseek(text, api_key, throttle=throttle)
+        return self.analyze_text_chunked(text, api_key, throttle=throttle)
+
+    def analyze_text_chunked(
+        self,
+        full_text: str,
+        api_key: str,
+        throttle: Optional[Callable[[], ContextManager]] = None,
+    ) -> Optional[Dict]:
+        """
+        [Stage 2, chunked] Analyze chunks concurrently, then merge them.
+
+        The merge is another LLM call over the compact partial results; if
+        that fails the partials are merged deterministically instead.
+        """
+        if not api_key or "sk-" not in api_key:
+            logging.error("  [Error] Invalid API Key provided!")
+            return {"error": "Invalid API Key provided"}
+
+        chunks = split_into_chunks(full_text, self.chunk_tokens)
+        logging.info(f"  [Stage 2] Chunked analysis: {len(chunks)} chunks (~{estimate_tokens(full_text)} tokens)")
+
+        with ThreadPoolExecutor(max_workers=self.chunk_workers, thread_name_prefix="chunk") as pool:
+            results = list(pool.map(
+                lambda item: self._complete_json(
+                    self._chunk_messages(item[1], item[0], len(chunks)), api_key, throttle=throttle
+                ),
+                enumerate(chunks, start=1),
+            ))
+
+        usages = [result.pop("_usage", {}) for result in results]
+        partials = [result for result in results if "error" not in result]
+        if not partials:
+            return results[0] if results else {"error": "No text to analyze"}
+        if len(partials) < len(results):
+            logging.warning(f"  [Warning] {len(results) - len(partials)}/{len(results)} chunks failed, merging the rest")
+
+        merged = self._complete_json(self._reduce_messages(partials), api_key, throttle=throttle)
+        usages.append(merged.pop("_usage", {}))
+        if "error" in merged:
+            logging.warning(f"  [Warning] Merge call failed ({merged['error']}), merging locally")
+            merged = merge_partial_analyses(partials)
+
+        merged["token_usage"] = self.usage_summary(usages, mode="chunked", chunks=len(chunks))
+        return merged
@@ -1,23 +1,37 @@
+import argparse
 import logging
 import os
+import signal
 import threading
 import time
 import webbrowser
+from typing import Any, Dict, List, Optional
 
-from flask import Flask, send_from_directory
+from flask import Flask, Response, g, request, send_from_directory
 from flask_cors import CORS
 
 
-from routes.literature_routes import literature_bp
+import metrics
+from routes.literature_routes import init_services, literature_bp, shutdown_services
+from settings import load_settings
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-def create_app() -> Flask:
+def create_app(settings: Optional[Dict[str, Any]] = None) -> Flask:
+    """
+    Application factory; also the entry point for WSGI servers
+    (``gunicorn 'app:create_app()'``). Settings default to
+    ``load_settings()``: environment variables and ``$LITERATURE_CONFIG``.
+    """
+    settings = settings or load_settings()
+    init_services(settings)
+    metrics.configure(timing_log=settings["TIMING_LOG"])
     app = Flask(__name__)
     CORS(app)
     register_routes(app)
+    register_metrics(app)
     return app
 
 
@@ -37,19 +51,97 @@ def register_routes(app: Flask):
         return send_from_directory(".", filename)
 
 
-def open_browser():
-    time.sleep(1)
-    logging.info("Opening browser to http://localhost:5000")
-    webbrowser.open_new_tab("http://localhost:5000")
+def register_metrics(app: Flask):
+    """
+    Time every request per route template and expose ``/metrics`` in the
+    Prometheus text format. Streaming responses are timed until their
+    headers are ready.
+    """
 
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
 
-app = create_app()
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                route=request.url_rule.rule if request.url_rule else "<unmatched>",
+                method=request.method,
+                status=response.status_code,
+            )
+        return response
 
+    @app.route("/metrics")
+    def serve_metrics():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
-if __name__ == "__main__":
+
+def open_browser(port: int = 5000):
+    time.sleep(1)
+    logging.info(f"Opening browser to http://localhost:{port}")
+    webbrowser.open_new_tab(f"http://localhost:{port}")
+
+
+def run_desktop(app: Flask, settings: Dict[str, Any]):
+    """
+    Single-user mode: Flask's debug server with the reloader, plus a browser tab.
+    """
     logging.info("Starting Flask server...")
 
     if os.environ.get("WERKZEUG_RUN_MAIN") != "true":
-        threading.Timer(1, open_browser).start()
+        threading.Timer(1, open_browser, args=(settings["PORT"],)).start()
+
+    app.run(host=settings["HOST"], port=settings["PORT"], debug=True)
+
+
+def run_server(app: Flask, settings: Dict[str, Any]):
+    """
+    Production mode on waitress (multi-threaded, works on Windows too).
+    For several worker processes use gunicorn with ``gunicorn.conf.py``.
+    """
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit("Serve mode needs waitress (pip install waitress), or run: gunicorn -c gunicorn.conf.py")
+
+    def _stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _stop)
+    logging.info(f"Serving on {settings['HOST']}:{settings['PORT']} with {settings['WEB_THREADS']} threads")
+    serve(app, host=settings["HOST"], port=settings["PORT"], threads=settings["WEB_THREADS"])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Literature manager server.")
+    parser.add_argument(
+        "mode",
+        nargs="?",
+        choices=["desktop", "serve"],
+        default="desktop",
+        help="desktop: debug server and browser tab (default); serve: production server",
+    )
+    parser.add_argument("--config", help="JSON settings file (default: $LITERATURE_CONFIG)")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    args = parser.parse_args(argv)
+
+    settings = load_settings(args.config, overrides={"HOST": args.host, "PORT": args.port})
+    app = create_app(settings)
+    try:
+        if args.mode == "serve":
+            run_server(app, settings)
+        else:
+            run_desktop(app, settings)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_services(settings["SHUTDOWN_DRAIN_SECONDS"])
+    return 0
 
-    app.run(host="0.0.0.0", port=5000, debug=True)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def write_json_atomic(filepath: str, data: Any, keep_dir_mtime: bool = False):
+    """
+    Write JSON so readers only ever see the old or the new file.
+
+    The data goes to a temp file in the same directory, is fsynced and then
+    renamed over ``filepath``; the directory is fsynced where supported so
+    the rename itself survives a crash.
+
+    The temp file and rename touch the directory. With ``keep_dir_mtime``
+    its mtime is restored when ``filepath`` already existed, for callers
+    that treat the directory mtime as the creation time of its contents.
+    """
+    directory = os.path.dirname(filepath) or "."
+    dir_stat = os.stat(directory) if keep_dir_mtime and os.path.exists(filepath) else None
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if dir_stat is not None:
+        os.utime(directory, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            # LK_LOCK retries for ~10 seconds before raising; keep waiting.
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return
+    f.seek(0)
+    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class StripedFileLocks:
+    """
+    Exclusive locks keyed by string that hold across threads and processes.
+
+    Keys are hashed onto a fixed number of lock files, so the number of
+    files stays bounded however many records exist; unrelated keys that
+    share a stripe merely serialize. Locks are not re-entrant.
+    """
+
+    def __init__(self, lock_dir: str, stripes: int = 128):
+        self.lock_dir = lock_dir
+        self.stripes = stripes
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._thread_locks = [threading.Lock() for _ in range(stripes)]
+
+    def _stripe(self, key: str) -> int:
+        # crc32 rather than hash(): it must agree between processes.
+        return zlib.crc32(key.encode("utf-8")) % self.stripes
+
+    @contextmanager
+    def lock(self, key: str):
+        index = self._stripe(key)
+        with self._thread_locks[index]:
+            path = os.path.join(self.lock_dir, f"{index:03d}.lock")
+            with open(path, "a+b") as f:
+                _lock_file(f)
+                try:
+                    yield
+                finally:
+                    _unlock_file(f)
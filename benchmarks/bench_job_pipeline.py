@@ -0,0 +1,150 @@
+"""
+Measure upload job throughput against the local LLM stub.
+
+Usage: python benchmarks/bench_job_pipeline.py [--papers 40] [--workers 1 2 4 8] [--latency 2.0]
+                                               [--error-rate 0.05] [--output results.json]
+
+Each worker count gets a fresh library in a temporary directory. Generated
+PDFs are submitted through ``LiteratureService.submit_upload`` exactly as
+the upload endpoint does, and analyzed by ``llm_stub.py`` with the given
+latency and injected error rates, so the numbers show how the job queue,
+extraction and LLM retries behave under load without a real API key.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.datastructures import FileStorage
+
+import llm_stub
+import metrics
+from analysis_core import AnalysisService
+from bench_repository import make_pdf
+from db_manager import LiteratureRepository
+from services.job_queue import JobQueue
+from services.literature_service import LiteratureService
+
+LLM_OUTCOMES = ("ok", "http_429", "http_500", "http_503", "connection_error", "circuit_open")
+
+
+def run(pdf_paths: List[str], root: str, workers: int, stub_url: str) -> Dict:
+    repository = LiteratureRepository(root)
+    analyzer = AnalysisService(sharded_text_min_pages=0, api_url=stub_url)
+    jobs = JobQueue(os.path.join(root, "jobs.sqlite3"), max_workers=workers, max_pending=len(pdf_paths))
+    service = LiteratureService(analyzer, repository, jobs=jobs)
+    before = {outcome: metrics.LLM_REQUESTS_TOTAL.value(outcome=outcome) for outcome in LLM_OUTCOMES}
+    retries_before = metrics.LLM_RETRIES_TOTAL.value()
+
+    started = time.perf_counter()
+    job_ids = []
+    for path in pdf_paths:
+        with open(path, "rb") as f:
+            upload = FileStorage(stream=f, filename=os.path.basename(path), content_type="application/pdf")
+            job_ids.append(service.submit_upload(upload, "sk-benchmark")["job_id"])
+
+    finished: Dict[str, Dict] = {}
+    while len(finished) < len(job_ids):
+        time.sleep(0.05)
+        for job_id in job_ids:
+            if job_id not in finished:
+                job = jobs.get(job_id)
+                if job["status"] not in ("queued", "running"):
+                    finished[job_id] = job
+    elapsed = time.perf_counter() - started
+    jobs.drain(0)
+    analyzer.close()
+
+    latencies = [
+        (datetime.fromisoformat(job["updated_at"]) - datetime.fromisoformat(job["created_at"])).total_seconds()
+        for job in finished.values()
+    ]
+    statuses: Dict[str, int] = {}
+    for job in finished.values():
+        statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+    return {
+        "workers": workers,
+        "papers": len(pdf_paths),
+        "elapsed_s": round(elapsed, 3),
+        "papers_per_minute": round(len(pdf_paths) / elapsed * 60, 1),
+        "job_latency_s": {
+            "median": round(statistics.median(latencies), 3),
+            "max": round(max(latencies), 3),
+        },
+        "statuses": statuses,
+        "llm_requests": {
+            outcome: metrics.LLM_REQUESTS_TOTAL.value(outcome=outcome) - before[outcome]
+            for outcome in LLM_OUTCOMES
+        },
+        "llm_retries": metrics.LLM_RETRIES_TOTAL.value() - retries_before,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--papers", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=2.0, help="Stub seconds per LLM call")
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    stub = llm_stub.start_in_thread(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    tmp_dir = tempfile.mkdtemp(prefix="literature_jobs_")
+    results = []
+    try:
+        pdf_paths = []
+        for index in range(args.papers):
+            path = os.path.join(tmp_dir, f"paper_{index}.pdf")
+            make_pdf(path, args.pages, images_per_page=1, seed=index)
+            pdf_paths.append(path)
+
+        for workers in args.workers:
+            result = run(pdf_paths, os.path.join(tmp_dir, f"library_{workers}"), workers, llm_stub.completions_url(stub))
+            print(
+                f"{workers:3d} workers: {result['papers_per_minute']:>8} papers/min, "
+                f"median job {result['job_latency_s']['median']} s, {result['statuses']}",
+                file=sys.stderr,
+            )
+            results.append(result)
+    finally:
+        stub.shutdown()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    output = json.dumps({
+        "stub": {
+            "latency_s": args.latency,
+            "jitter_s": args.jitter,
+            "error_rate": args.error_rate,
+            "rate_limit_rate": args.rate_limit_rate,
+        },
+        "runs": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,389 @@
+"""
+Time repository operations on synthetic libraries, PDF extraction and the ingest pipeline.
+
+Usage: python benchmarks/bench_repository.py [--sizes 1000 10000 50000] [--backend folder|sqlite]
+                                             [--output results.json] [--compare baseline.json]
+
+Libraries of ``--sizes`` papers are generated in the real ``analysis.json``
+format in a temporary directory (``--keep`` keeps them), then opened with
+``LiteratureRepository``, which builds its indexes as on first start.
+Extraction runs on generated PDFs with text and embedded images; ingestion
+runs end to end against ``llm_stub.py`` in place of the DeepSeek API, so
+no key or network is needed. Results are printed (or written to
+``--output``) as JSON; ``--compare`` prints the ratio to an earlier run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+import llm_stub
+import metrics
+from analysis_core import AnalysisService
+from db_manager import LiteratureRepository
+from record_store import open_record_store
+from services.literature_service import LiteratureService
+
+TOPICS = [
+    "钙钛矿太阳能电池", "锂离子电池", "图神经网络", "电致发光成像", "缺陷检测", "催化剂",
+    "大语言模型", "强化学习", "半导体器件", "光伏组件", "注意力机制", "扩散模型",
+]
+METHODS = ["卷积神经网络", "密度泛函理论", "有限元仿真", "迁移学习", "原位表征", "贝叶斯优化"]
+WORDS = (
+    "efficiency stability defect interface transport model network attention dataset "
+    "simulation voltage current spectrum imaging diffusion training inference benchmark"
+).split()
+JOURNALS = ["Nature Energy", "Applied Optics", "Joule", "NeurIPS", "Advanced Materials", "IEEE TPAMI"]
+TAGS = [f"tag-{i:03d}" for i in range(200)]
+RENAME_TAG = "bench-rename"
+
+
+# ---------------------------------------------------------------------- #
+# Synthetic data
+# ---------------------------------------------------------------------- #
+
+def make_record(rng: random.Random, paper_id: str) -> Dict:
+    """
+    A record shaped like one written by ``LiteratureService.save_ingested``.
+    """
+    topic, method = rng.choice(TOPICS), rng.choice(METHODS)
+    phrase = lambda n: " ".join(rng.choices(WORDS, k=n))
+    image_files = [f"fig{i}.{rng.choice(['png', 'jpeg'])}" for i in range(1, rng.randint(0, 14) + 1)]
+    timestamp = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00+00:00"
+    tags = rng.sample(TAGS, rng.randint(0, 4))
+    if rng.random() < 0.01:
+        tags.append(RENAME_TAG)
+    return {
+        "文献信息": {
+            "标题": f"基于{method}的{topic}研究: {phrase(6)}",
+            "作者": [f"Author {rng.randint(1, 5000)}" for _ in range(rng.randint(1, 8))],
+            "期刊": rng.choice(JOURNALS),
+            "年份": str(rng.randint(2015, 2025)),
+        },
+        "内容提取": {
+            "摘要": f"提出了一种基于{method}的{topic}方法，{phrase(40)}",
+            "关键图表": [
+                {"图序号": f"图{i}", "图表类型": "曲线图", "核心内容": phrase(12), "支撑结论": phrase(10)}
+                for i in range(1, rng.randint(1, 5) + 1)
+            ],
+            "实验": [f"实验方法：{phrase(15)}", f"实验设置：{phrase(10)}"],
+            "结论": [f"{topic}{phrase(18)}" for _ in range(rng.randint(2, 4))],
+            "创新点": [f"首次将{method}用于{topic} {phrase(10)}" for _ in range(rng.randint(1, 3))],
+            "不足": [phrase(12) for _ in range(2)],
+        },
+        "paper_id": paper_id,
+        "image_files": image_files,
+        "custom_tags": tags,
+        "image_metadata": [
+            {"filename": name, "figure_id": f"图{i}", "label": "", "category": "figure"}
+            for i, name in enumerate(image_files, start=1)
+        ],
+        "reading_time": timestamp,
+        "upload_time": timestamp,
+        "time_label": timestamp,
+        "pdf_sha256": f"{rng.getrandbits(256):064x}",
+        "version": 1,
+    }
+
+
+def generate_library(root: str, papers: int, backend: str, seed: int = 0) -> List[str]:
+    """
+    Write ``papers`` records straight into the record store (no indexes).
+    """
+    rng = random.Random(seed)
+    ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(papers)]
+    os.makedirs(root, exist_ok=True)
+    if backend == "sqlite":
+        store = open_record_store(root, "sqlite")
+        for start in range(0, papers, 5000):
+            store.write_many([(pid, make_record(rng, pid), None, None) for pid in ids[start:start + 5000]])
+        return ids
+    for paper_id in ids:
+        paper_dir = os.path.join(root, paper_id)
+        os.makedirs(paper_dir)
+        with open(os.path.join(paper_dir, "analysis.json"), "w", encoding="utf-8") as f:
+            json.dump(make_record(rng, paper_id), f, ensure_ascii=False, indent=4)
+    return ids
+
+
+def make_pdf(path: str, pages: int, images_per_page: int, seed: int):
+    """
+    A text PDF with distinct embedded raster images and figure captions.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        body = f"Page {page_num + 1} {seed}\n" + " ".join(rng.choices(WORDS, k=350))
+        page.insert_textbox(fitz.Rect(50, 50, 550, 420), body, fontsize=9)
+        for image_num in range(images_per_page):
+            samples = bytes(rng.getrandbits(8) for _ in range(160 * 120 * 3))
+            pixmap = fitz.Pixmap(fitz.csRGB, 160, 120, samples, False)
+            top = 440 + image_num * 180
+            page.insert_image(fitz.Rect(60, top, 300, top + 150), pixmap=pixmap)
+            page.insert_text((60, top + 165), f"Figure {page_num * images_per_page + image_num + 1}. {WORDS[image_num]}")
+    doc.save(path)
+    doc.close()
+
+
+# ---------------------------------------------------------------------- #
+# Measurements
+# ---------------------------------------------------------------------- #
+
+def measure(func: Callable[[], object], repeat: int, calls: int = 1) -> Dict:
+    """
+    Best and median wall time of ``func`` in ms, divided by ``calls`` when
+    one run performs several operations.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) / calls)
+    return {
+        "best_ms": round(min(timings) * 1000, 4),
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "runs": repeat,
+    }
+
+
+def bench_library(root: str, papers: int, backend: str, repeat: int) -> Dict:
+    start = time.perf_counter()
+    ids = generate_library(root, papers, backend)
+    generate_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    repository = LiteratureRepository(root, storage=backend)
+    open_s = time.perf_counter() - start
+
+    rng = random.Random(2)
+    sample = rng.sample(ids, min(200, len(ids)))
+    operations = {}
+
+    operations["get_all_literature_summaries"] = measure(repository.get_all_literature_summaries, repeat)
+    operations["query_literature_summaries_page"] = measure(
+        lambda: repository.query_literature_summaries(sort="mtime", descending=True, limit=50), repeat
+    )
+    operations["get_tag_stats"] = measure(repository.get_tag_stats, repeat)
+    operations["search_literature"] = measure(lambda: repository.search_literature("注意力机制", limit=20), repeat)
+
+    def rename_round_trip():
+        repository.rename_tag_globally(RENAME_TAG, RENAME_TAG + "-renamed")
+        repository.rename_tag_globally(RENAME_TAG + "-renamed", RENAME_TAG)
+
+    tagged = len(repository.tag_index.papers_with_tag(RENAME_TAG))
+    operations["rename_tag_globally"] = {**measure(rename_round_trip, repeat, calls=2), "papers": tagged}
+
+    for paper_id in sample:
+        repository.record_cache.invalidate(paper_id)
+    operations["get_literature_by_id_cold"] = measure(
+        lambda: [repository.get_literature_by_id(pid) for pid in sample], 1, calls=len(sample)
+    )
+    operations["get_literature_by_id_warm"] = measure(
+        lambda: [repository.get_literature_by_id(pid) for pid in sample], repeat, calls=len(sample)
+    )
+    operations["get_image_metadata"] = measure(
+        lambda: [repository.get_image_metadata(pid) for pid in sample], repeat, calls=len(sample)
+    )
+    updates = sample[:20]
+    operations["update_image_metadata"] = measure(
+        lambda: [repository.update_image_metadata(pid, repository.get_image_metadata(pid)) for pid in updates],
+        repeat,
+        calls=len(updates),
+    )
+    if repository.vector_index is not None:
+        repository.find_related_literature(sample[0])  # absorb the post-update refresh
+        operations["find_related_literature"] = measure(
+            lambda: [repository.find_related_literature(pid, 10) for pid in sample[:20]], repeat, calls=20
+        )
+
+    return {
+        "papers": papers,
+        "backend": backend,
+        "generate_s": round(generate_s, 3),
+        "open_and_index_s": round(open_s, 3),
+        "operations": operations,
+    }
+
+
+def bench_pdf(tmp_dir: str, pages_list: List[int], images_per_page: int, repeat: int) -> List[Dict]:
+    analyzer = AnalysisService(sharded_text_min_pages=0)
+    results = []
+    for pages in pages_list:
+        pdf_path = os.path.join(tmp_dir, f"extract_{pages}.pdf")
+        make_pdf(pdf_path, pages, images_per_page, seed=pages)
+        out_dir = os.path.join(tmp_dir, f"images_{pages}")
+
+        def extract_images():
+            shutil.rmtree(out_dir, ignore_errors=True)
+            return analyzer.extract_images_from_pdf(pdf_path, out_dir)
+
+        def extract_document():
+            shutil.rmtree(out_dir, ignore_errors=True)
+            return analyzer.extract_document(pdf_path, out_dir)
+
+        results.append({
+            "pages": pages,
+            "images": pages * images_per_page,
+            "extract_text_from_pdf": measure(lambda: analyzer.extract_text_from_pdf(pdf_path), repeat),
+            "extract_images_from_pdf": measure(extract_images, repeat),
+            "extract_document": measure(extract_document, repeat),
+        })
+    analyzer.close()
+    return results
+
+
+def bench_ingest(tmp_dir: str, papers: int, pages: int, latency: float) -> Dict:
+    stub = llm_stub.start_in_thread(latency=latency, stream_delay=0)
+    analyzer = AnalysisService(sharded_text_min_pages=0, api_url=llm_stub.completions_url(stub))
+    repository = LiteratureRepository(os.path.join(tmp_dir, "ingest_db"))
+    service = LiteratureService(analyzer, repository)
+
+    pdf_paths = []
+    for index in range(papers):
+        path = os.path.join(tmp_dir, f"ingest_{index}.pdf")
+        make_pdf(path, pages, images_per_page=1, seed=1000 + index)
+        pdf_paths.append(path)
+
+    stages = ("text_extraction", "image_extraction", "llm_analysis", "save")
+    before = {stage: metrics.INGEST_STAGE_SECONDS.total(stage=stage) for stage in stages}
+    timings = []
+    try:
+        for path in pdf_paths:
+            start = time.perf_counter()
+            service.ingest_pdf(path, os.path.basename(path), "sk-benchmark")
+            timings.append(time.perf_counter() - start)
+    finally:
+        stub.shutdown()
+        analyzer.close()
+
+    return {
+        "papers": papers,
+        "pages": pages,
+        "stub_latency_s": latency,
+        "per_paper_ms": {
+            "best_ms": round(min(timings) * 1000, 2),
+            "median_ms": round(statistics.median(timings) * 1000, 2),
+        },
+        "stage_mean_ms": {
+            stage: round((metrics.INGEST_STAGE_SECONDS.total(stage=stage) - before[stage]) / papers * 1000, 2)
+            for stage in stages
+        },
+    }
+
+
+# ---------------------------------------------------------------------- #
+# Reporting
+# ---------------------------------------------------------------------- #
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(value, prefix: str = "") -> Dict[str, float]:
+    """
+    ``{"libraries/folder-1000/.../best_ms": 1.2}`` for every best time
+    (or ``*_s``) in a result.
+    """
+    if isinstance(value, list):
+        keyed = {
+            "-".join(str(item[key]) for key in ("backend", "papers", "pages") if key in item) or str(index): item
+            for index, item in enumerate(value)
+        }
+        return {k: v for key, item in keyed.items() for k, v in flatten(item, f"{prefix}{key}/").items()}
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            if isinstance(item, (dict, list)):
+                flat.update(flatten(item, f"{prefix}{key}/"))
+            elif isinstance(item, (int, float)) and (key == "best_ms" or key.endswith("_s")):
+                flat[f"{prefix}{key}"] = item
+        return flat
+    return {}
+
+
+def compare(current: Dict, baseline: Dict):
+    old = flatten({k: v for k, v in baseline.items() if k in ("libraries", "pdf_extraction", "ingest")})
+    new = flatten({k: v for k, v in current.items() if k in ("libraries", "pdf_extraction", "ingest")})
+    print(f"Compared with {baseline.get('commit') or 'baseline'} (ratio > 1 is slower):", file=sys.stderr)
+    for key in sorted(set(old) & set(new)):
+        if old[key]:
+            print(f"  {key:70s} {new[key] / old[key]:6.2f}x", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--backend", choices=["folder", "sqlite"], default="folder")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pdf-pages", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--images-per-page", type=int, default=2)
+    parser.add_argument("--ingest-papers", type=int, default=10)
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Seconds the LLM stub waits per call")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["repository", "pdf", "ingest"])
+    parser.add_argument("--keep", help="Generate libraries in this directory and keep them")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    tmp_dir = args.keep or tempfile.mkdtemp(prefix="literature_bench_")
+    results = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    try:
+        if "repository" not in args.skip:
+            results["libraries"] = []
+            for papers in args.sizes:
+                print(f"Library of {papers} papers ({args.backend})...", file=sys.stderr)
+                root = os.path.join(tmp_dir, f"library_{args.backend}_{papers}")
+                shutil.rmtree(root, ignore_errors=True)
+                results["libraries"].append(bench_library(root, papers, args.backend, args.repeat))
+        if "pdf" not in args.skip:
+            print("PDF extraction...", file=sys.stderr)
+            results["pdf_extraction"] = bench_pdf(tmp_dir, args.pdf_pages, args.images_per_page, args.repeat)
+        if "ingest" not in args.skip:
+            print("Ingestion against the LLM stub...", file=sys.stderr)
+            results["ingest"] = bench_ingest(tmp_dir, args.ingest_papers, pages=10, latency=args.stub_latency)
+    finally:
+        if not args.keep:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
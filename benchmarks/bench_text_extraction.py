@@ -0,0 +1,94 @@
+"""
+Compare sequential and page-sharded PDF text extraction.
+
+Usage: python benchmarks/bench_text_extraction.py [--pages 10 50 100 300] [--workers N]
+
+Synthetic PDFs are generated with PyMuPDF in a temporary directory. The
+process pool is warmed up before timing, so the numbers reflect steady-state
+server behaviour rather than worker start-up.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+from analysis_core import AnalysisService
+
+PARAGRAPH = (
+    "Absolute electroluminescence imaging combined with distributed circuit modeling "
+    "allows quantitative diagnosis of solar-cell defects under varying injection currents. "
+)
+
+
+def make_pdf(path: str, pages: int):
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        body = f"Page {page_num + 1}\n" + PARAGRAPH * 30
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), body, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def best_of(func, repeat: int):
+    """
+    Return the (best, median) wall time over ``repeat`` runs.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 100, 300])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sequential = AnalysisService(sharded_text_min_pages=0)
+    sharded = AnalysisService(text_workers=args.workers, sharded_text_min_pages=1)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        warmup = os.path.join(tmp_dir, "warmup.pdf")
+        make_pdf(warmup, args.workers)
+        sharded.extract_text_sharded(warmup)
+
+        for pages in args.pages:
+            pdf_path = os.path.join(tmp_dir, f"doc_{pages}.pdf")
+            make_pdf(pdf_path, pages)
+
+            if sequential.extract_text_from_pdf(pdf_path) != sharded.extract_text_sharded(pdf_path):
+                print(f"Output mismatch for {pages} pages", file=sys.stderr)
+                return 1
+
+            seq_best, seq_median = best_of(lambda: sequential.extract_text_from_pdf(pdf_path), args.repeat)
+            shard_best, shard_median = best_of(lambda: sharded.extract_text_sharded(pdf_path), args.repeat)
+            results.append({
+                "pages": pages,
+                "workers": args.workers,
+                "sequential_s": round(seq_best, 4),
+                "sequential_median_s": round(seq_median, 4),
+                "sharded_s": round(shard_best, 4),
+                "sharded_median_s": round(shard_median, 4),
+                "speedup": round(seq_best / shard_best, 2) if shard_best else None,
+            })
+
+    sharded.close()
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
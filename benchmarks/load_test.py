@@ -0,0 +1,121 @@
+"""
+Measure requests/sec of the read endpoints of a running server.
+
+Usage: python benchmarks/load_test.py [--url http://localhost:5000] [--concurrency 16] [--duration 10]
+
+Start the server first, e.g. ``python app.py serve`` or
+``gunicorn -c gunicorn.conf.py``. Each endpoint is hammered for
+``--duration`` seconds by ``--concurrency`` threads with keep-alive
+sessions; with ``--revalidate`` requests carry the ETag of the first
+response, measuring the 304 path browsers take.
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+
+def discover_endpoints(base_url: str, query: str) -> List[str]:
+    """
+    The read endpoints worth measuring, using a real paper id from the library.
+    """
+    endpoints = [
+        "/api/literature",
+        "/api/literature?limit=50",
+        "/api/tags/stats",
+        f"/api/search?q={query}",
+    ]
+    listing = requests.get(f"{base_url}/api/literature?limit=1", timeout=30).json()
+    items = listing.get("items", []) if isinstance(listing, dict) else listing
+    if items:
+        paper_id = items[0]["id"]
+        endpoints += [f"/api/literature/{paper_id}", f"/api/literature/{paper_id}/images/metadata"]
+    return endpoints
+
+
+def hammer(url: str, concurrency: int, duration: float, revalidate: bool) -> Dict:
+    headers = {}
+    if revalidate:
+        etag = requests.get(url, timeout=30).headers.get("ETag")
+        if etag:
+            headers["If-None-Match"] = etag
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        session = requests.Session()
+        local_latencies, local_statuses, local_errors = [], {}, 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=30)
+                response.content
+                local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+            except requests.RequestException:
+                local_errors += 1
+                continue
+            local_latencies.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2) if latencies else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--query", default="model", help="Search term for /api/search")
+    parser.add_argument("--revalidate", action="store_true", help="Send If-None-Match with the first ETag")
+    parser.add_argument("--endpoint", action="append", help="Only measure these paths (repeatable)")
+    args = parser.parse_args(argv)
+
+    base_url = args.url.rstrip("/")
+    try:
+        endpoints = args.endpoint or discover_endpoints(base_url, args.query)
+    except requests.RequestException as e:
+        print(f"Server not reachable at {base_url}: {e}", file=sys.stderr)
+        return 1
+
+    results = []
+    for path in endpoints:
+        result = {"endpoint": path, **hammer(base_url + path, args.concurrency, args.duration, args.revalidate)}
+        print(f"{path:60s} {result['rps']:>9} req/s  p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms",
+              file=sys.stderr)
+        results.append(result)
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
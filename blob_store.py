@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it only exact duplicates are shared.
+    Image = None
+
+
+def _dhash(path: str, hash_size: int = 8) -> Optional[Tuple[str, int, int]]:
+    """
+    Difference hash of an image plus its pixel size, or None if unavailable.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            gray = img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+            pixels = gray.tobytes()
+    except Exception:
+        return None
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}", width, height
+
+
+def _same_pixels(path: str, other: str) -> bool:
+    """
+    True if both images decode to exactly the same pixels.
+    """
+    if Image is None:
+        return False
+    try:
+        with Image.open(path) as img, Image.open(other) as other_img:
+            if img.size != other_img.size:
+                return False
+            return img.convert("RGBA").tobytes() == other_img.convert("RGBA").tobytes()
+    except Exception:
+        return False
+
+
+class BlobStore:
+    """
+    Content-addressed store for figure files shared between papers.
+
+    Blobs live in ``<root>/<sha[:2]>/<sha>.<ext>``; each paper folder keeps
+    its ``fig<N>.<ext>`` names as hard links to the blob (copies where the
+    filesystem cannot link), so serving code is unchanged. ``blob_refs``
+    records which paper file points at which blob and a blob is deleted
+    when its last reference is released.
+
+    Exact duplicates are matched by SHA-256. When Pillow is available, a
+    re-encoded copy (e.g. a publisher logo saved with other PNG settings)
+    is also mapped onto the existing blob: the difference hash only picks
+    candidates, which must then decode to identical pixels. A dHash match
+    alone is far too coarse for tables and text, so it is never trusted.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS blobs (
+        blob_id TEXT PRIMARY KEY,
+        ext TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        phash TEXT,
+        width INTEGER,
+        height INTEGER,
+        refcount INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_blobs_phash ON blobs (phash, width, height);
+    CREATE TABLE IF NOT EXISTS blob_refs (
+        paper_id TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        blob_id TEXT NOT NULL,
+        PRIMARY KEY (paper_id, filename)
+    );
+    CREATE INDEX IF NOT EXISTS idx_blob_refs_blob ON blob_refs (blob_id);
+    """
+
+    def __init__(self, root_dir: str, db_path: str):
+        self.root_dir = root_dir
+        self.db_path = db_path
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._setup()
+
+    def _setup(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def blob_path(self, blob_id: str, ext: str) -> str:
+        return os.path.join(self.root_dir, blob_id[:2], f"{blob_id}.{ext}")
+
+    # ------------------------------------------------------------------ #
+    # References
+    # ------------------------------------------------------------------ #
+
+    def intern_files(self, paper_id: str, paper_dir: str, filenames: Iterable[str]) -> Dict[str, int]:
+        """
+        Move the given paper files into the store (or onto an existing blob).
+
+        Returns counts of ``stored`` new blobs, ``shared`` files that now
+        point at an existing blob and ``bytes_saved`` by sharing.
+        """
+        stats = {"stored": 0, "shared": 0, "bytes_saved": 0}
+        for filename in filenames:
+            path = os.path.join(paper_dir, filename)
+            if not os.path.isfile(path):
+                continue
+            try:
+                shared, size = self._intern(paper_id, filename, path)
+            except Exception as e:
+                logging.warning(f"Failed to intern {path}: {e}")
+                continue
+            if shared:
+                stats["shared"] += 1
+                stats["bytes_saved"] += size
+            else:
+                stats["stored"] += 1
+        return stats
+
+    def _intern(self, paper_id: str, filename: str, path: str) -> Tuple[bool, int]:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        blob_id = digest.hexdigest()
+        ext = os.path.splitext(filename)[1].lstrip(".").lower() or "bin"
+        size = os.path.getsize(path)
+
+        with self._connect() as conn:
+            existing = conn.execute(
+                "SELECT blob_id FROM blob_refs WHERE paper_id = ? AND filename = ?", (paper_id, filename)
+            ).fetchone()
+            if existing:
+                return False, size
+
+            row = conn.execute("SELECT * FROM blobs WHERE blob_id = ?", (blob_id,)).fetchone()
+            perceptual = None
+            if row is None:
+                perceptual = _dhash(path)
+                if perceptual:
+                    candidates = conn.execute(
+                        "SELECT * FROM blobs WHERE phash = ? AND width = ? AND height = ? AND ext = ?",
+                        (*perceptual, ext),
+                    ).fetchall()
+                    row = next(
+                        (
+                            candidate for candidate in candidates
+                            if _same_pixels(path, self.blob_path(candidate["blob_id"], candidate["ext"]))
+                        ),
+                        None,
+                    )
+
+            if row is not None and os.path.exists(self.blob_path(row["blob_id"], row["ext"])):
+                self._replace_with_link(self.blob_path(row["blob_id"], row["ext"]), path)
+                blob_id = row["blob_id"]
+                shared = True
+            else:
+                target = self.blob_path(blob_id, ext)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if not os.path.exists(target):
+                    self._link_or_copy(path, target)
+                if perceptual is None:
+                    perceptual = _dhash(path)
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO blobs (blob_id, ext, size, phash, width, height, refcount)
+                    VALUES (?, ?, ?, ?, ?, ?, COALESCE((SELECT refcount FROM blobs WHERE blob_id = ?), 0))
+                    """,
+                    (blob_id, ext, size, *(perceptual or (None, None, None)), blob_id),
+                )
+                shared = False
+
+            conn.execute(
+                "INSERT INTO blob_refs (paper_id, filename, blob_id) VALUES (?, ?, ?)",
+                (paper_id, filename, blob_id),
+            )
+            conn.execute("UPDATE blobs SET refcount = refcount + 1 WHERE blob_id = ?", (blob_id,))
+        return shared, size
+
+    def blob_id_for(self, paper_id: str, filename: str) -> Optional[str]:
+        """
+        SHA-256 of the blob a paper file points at, or None if not interned.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT blob_id FROM blob_refs WHERE paper_id = ? AND filename = ?", (paper_id, filename)
+            ).fetchone()
+        return row["blob_id"] if row else None
+
+    def release_paper(self, paper_id: str) -> int:
+        """
+        Drop a paper's references; delete blobs nobody references any more.
+        """
+        with self._connect() as conn:
+            refs = conn.execute(
+                "SELECT blob_id FROM blob_refs WHERE paper_id = ?", (paper_id,)
+            ).fetchall()
+            conn.execute("DELETE FROM blob_refs WHERE paper_id = ?", (paper_id,))
+            for ref in refs:
+                conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE blob_id = ?", (ref["blob_id"],))
+            orphans = conn.execute("SELECT blob_id, ext FROM blobs WHERE refcount <= 0").fetchall()
+            conn.execute("DELETE FROM blobs WHERE refcount <= 0")
+
+        for orphan in orphans:
+            try:
+                os.remove(self.blob_path(orphan["blob_id"], orphan["ext"]))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"Failed to remove blob {orphan['blob_id']}: {e}")
+        return len(orphans)
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT count(*) AS blobs, COALESCE(sum(size), 0) AS stored_bytes, "
+                "COALESCE(sum(size * refcount), 0) AS referenced_bytes FROM blobs"
+            ).fetchone()
+            refs = conn.execute("SELECT count(*) FROM blob_refs").fetchone()[0]
+        return {
+            "blobs": row["blobs"],
+            "references": refs,
+            "stored_bytes": row["stored_bytes"],
+            "bytes_saved": row["referenced_bytes"] - row["stored_bytes"],
+        }
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+
+    def _link_or_copy(self, source: str, target: str):
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+    def _replace_with_link(self, blob: str, path: str):
+        tmp_path = f"{path}.link"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        self._link_or_copy(blob, tmp_path)
+        os.replace(tmp_path, path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point: ``python blob_store.py intern|stats``.
+    """
+    from db_manager import LiteratureRepository
+
+    parser = argparse.ArgumentParser(description="Deduplicate figure files into the shared blob store.")
+    parser.add_argument("command", choices=["intern", "stats"])
+    parser.add_argument("--db", default="literature_db", help="Path to the literature database folder")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    repository = LiteratureRepository(args.db)
+
+    if args.command == "intern":
+        print(json.dumps(repository.intern_all_images(), indent=2))
+    print(json.dumps(repository.blob_store.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
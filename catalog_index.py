@@ -0,0 +1,348 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class CatalogIndex:
+    """
+    Persistent summary catalog stored in SQLite next to the paper folders.
+
+    Each row mirrors the list-view summary of one paper together with the
+    stat signature of its stored record, so listing never has to read the
+    records and drift can be detected with a cheap signature pass.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS papers (
+        paper_id TEXT PRIMARY KEY,
+        title TEXT NOT NULL DEFAULT '',
+        authors TEXT NOT NULL DEFAULT '[]',
+        year TEXT NOT NULL DEFAULT '',
+        custom_tags TEXT NOT NULL DEFAULT '[]',
+        reading_time TEXT,
+        upload_time TEXT,
+        time_label TEXT,
+        sort_mtime REAL NOT NULL DEFAULT 0,
+        file_mtime REAL NOT NULL DEFAULT 0,
+        file_size INTEGER NOT NULL DEFAULT 0,
+        pdf_sha256 TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_papers_sort_mtime ON papers (sort_mtime DESC);
+    CREATE TABLE IF NOT EXISTS paper_tags (
+        paper_id TEXT NOT NULL,
+        tag TEXT NOT NULL,
+        PRIMARY KEY (paper_id, tag)
+    );
+    CREATE INDEX IF NOT EXISTS idx_paper_tags_tag ON paper_tags (tag);
+    CREATE TABLE IF NOT EXISTS catalog_meta (
+        key TEXT PRIMARY KEY,
+        value
+    );
+    INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('epoch', lower(hex(randomblob(8))));
+    INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('generation', 0);
+    """
+
+    # Columns added after the first release; (name, DDL) pairs.
+    MIGRATIONS = [
+        ("pdf_sha256", "ALTER TABLE papers ADD COLUMN pdf_sha256 TEXT"),
+    ]
+    POST_MIGRATION_SCHEMA = """
+    CREATE INDEX IF NOT EXISTS idx_papers_pdf_sha256 ON papers (pdf_sha256);
+    CREATE INDEX IF NOT EXISTS idx_papers_upload_time ON papers (COALESCE(upload_time, ''), paper_id);
+    CREATE INDEX IF NOT EXISTS idx_papers_reading_time ON papers (COALESCE(reading_time, ''), paper_id);
+    CREATE INDEX IF NOT EXISTS idx_papers_year ON papers (year, paper_id);
+    CREATE INDEX IF NOT EXISTS idx_papers_title ON papers (title, paper_id);
+    """
+
+    # Sortable keys -> SQL expressions; each one is covered by an index above.
+    SORT_KEYS = {
+        "mtime": "sort_mtime",
+        "upload_time": "COALESCE(upload_time, '')",
+        "reading_time": "COALESCE(reading_time, '')",
+        "year": "year",
+        "title": "title",
+    }
+    SUMMARY_FIELDS = ("id", "title", "authors", "year", "custom_tags", "reading_time", "upload_time")
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._setup()
+
+    def _setup(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(papers)")}
+            for column, ddl in self.MIGRATIONS:
+                if column not in columns:
+                    conn.execute(ddl)
+            conn.executescript(self.POST_MIGRATION_SCHEMA)
+            if conn.execute("SELECT 1 FROM paper_tags LIMIT 1").fetchone() is None:
+                # Backfill catalogs created before the tag table existed.
+                conn.execute(
+                    """
+                    INSERT OR IGNORE INTO paper_tags (paper_id, tag)
+                    SELECT papers.paper_id, tags.value FROM papers, json_each(papers.custom_tags) AS tags
+                    WHERE tags.type = 'text'
+                    """
+                )
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open a short-lived connection; one transaction per ``with`` block.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------ #
+    # Writes
+    # ------------------------------------------------------------------ #
+
+    def upsert(self, summary: Dict, stat: Tuple[float, float, int]):
+        self.upsert_many([(summary, stat)])
+
+    def upsert_many(self, entries: Iterable[Tuple[Dict, Tuple[float, float, int]]]):
+        rows = [self._to_row(summary, stat) for summary, stat in entries]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO papers (
+                    paper_id, title, authors, year, custom_tags, reading_time,
+                    upload_time, time_label, sort_mtime, file_mtime, file_size, pdf_sha256
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            conn.executemany("DELETE FROM paper_tags WHERE paper_id = ?", [(row[0],) for row in rows])
+            self._insert_tags(conn, rows)
+            self._bump_generation(conn)
+
+    def remove(self, paper_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM papers WHERE paper_id = ?", (paper_id,))
+            conn.execute("DELETE FROM paper_tags WHERE paper_id = ?", (paper_id,))
+            self._bump_generation(conn)
+
+    def replace_all(self, entries: Iterable[Tuple[Dict, Tuple[float, float, int]]]):
+        rows = [self._to_row(summary, stat) for summary, stat in entries]
+        with self._connect() as conn:
+            conn.execute("DELETE FROM papers")
+            conn.execute("DELETE FROM paper_tags")
+            conn.executemany(
+                """
+                INSERT INTO papers (
+                    paper_id, title, authors, year, custom_tags, reading_time,
+                    upload_time, time_label, sort_mtime, file_mtime, file_size, pdf_sha256
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            self._insert_tags(conn, rows)
+            self._bump_generation(conn)
+
+    def _bump_generation(self, conn: sqlite3.Connection):
+        conn.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'generation'")
+
+    def _insert_tags(self, conn: sqlite3.Connection, rows: List[tuple]):
+        conn.executemany(
+            "INSERT OR IGNORE INTO paper_tags (paper_id, tag) VALUES (?, ?)",
+            [
+                (row[0], tag)
+                for row in rows
+                for tag in json.loads(row[4])
+                if isinstance(tag, str)
+            ],
+        )
+
+    # ------------------------------------------------------------------ #
+    # Reads
+    # ------------------------------------------------------------------ #
+
+    def version(self) -> str:
+        """
+        Opaque token that changes whenever any catalog row changes.
+
+        The random epoch keeps tokens unique when the database is recreated.
+        """
+        with self._connect() as conn:
+            meta = dict(conn.execute("SELECT key, value FROM catalog_meta").fetchall())
+        return f"{meta['epoch']}-{meta['generation']}"
+
+    def is_empty(self) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM papers LIMIT 1").fetchone()
+        return row is None
+
+    def list_summaries(self) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM papers ORDER BY sort_mtime DESC, paper_id"
+            ).fetchall()
+        return [self._to_summary(row) for row in rows]
+
+    def tags_by_paper(self) -> Dict[str, List[str]]:
+        tags: Dict[str, List[str]] = {}
+        with self._connect() as conn:
+            for row in conn.execute("SELECT paper_id, tag FROM paper_tags ORDER BY rowid"):
+                tags.setdefault(row["paper_id"], []).append(row["tag"])
+        return tags
+
+    def query_summaries(
+        self,
+        sort: str = "mtime",
+        descending: bool = True,
+        limit: int = 50,
+        after: Optional[Tuple[Any, str]] = None,
+        tag: Optional[str] = None,
+        year: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Tuple[List[Dict], Optional[Tuple[Any, str]], int]:
+        """
+        Return one keyset-paginated page of summaries.
+
+        ``after`` is the ``(sort value, paper_id)`` of the last row of the
+        previous page. Returns ``(summaries, next_after, total)`` where
+        ``next_after`` is None on the last page and ``total`` counts every
+        row matching the filters.
+        """
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Unsupported sort key: {sort}")
+        key = self.SORT_KEYS[sort]
+        direction = "DESC" if descending else "ASC"
+
+        filters, params = [], []
+        if tag:
+            filters.append("paper_id IN (SELECT paper_id FROM paper_tags WHERE tag = ?)")
+            params.append(tag)
+        if year:
+            filters.append("year = ?")
+            params.append(str(year))
+        count_where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+        page_filters, page_params = list(filters), list(params)
+        if after is not None:
+            page_filters.append(f"({key}, paper_id) {'<' if descending else '>'} (?, ?)")
+            page_params.extend(after)
+        page_where = f"WHERE {' AND '.join(page_filters)}" if page_filters else ""
+
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT count(*) FROM papers {count_where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT *, {key} AS sort_value FROM papers {page_where}
+                ORDER BY {key} {direction}, paper_id {direction}
+                LIMIT ?
+                """,
+                (*page_params, limit + 1),
+            ).fetchall()
+
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = (rows[-1]["sort_value"], rows[-1]["paper_id"])
+        return [self._to_summary(row, fields) for row in rows], next_after, total
+
+    def get_summary(self, paper_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM papers WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        return self._to_summary(row) if row else None
+
+    def find_by_pdf_hash(self, pdf_sha256: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT paper_id FROM papers WHERE pdf_sha256 = ? ORDER BY sort_mtime LIMIT 1",
+                (pdf_sha256,),
+            ).fetchone()
+        return row["paper_id"] if row else None
+
+    def get_pdf_hash(self, paper_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT pdf_sha256 FROM papers WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        return row["pdf_sha256"] if row else None
+
+    def get_stat_signatures(self) -> Dict[str, Tuple[float, int]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT paper_id, file_mtime, file_size FROM papers").fetchall()
+        return {row["paper_id"]: (row["file_mtime"], row["file_size"]) for row in rows}
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+
+    def _to_row(self, summary: Dict, stat: Tuple[float, float, int]) -> tuple:
+        sort_mtime, file_mtime, file_size = stat
+        return (
+            summary["id"],
+            summary.get("title") or "",
+            json.dumps(summary.get("authors") or [], ensure_ascii=False),
+            str(summary.get("year") or ""),
+            json.dumps(summary.get("custom_tags") or [], ensure_ascii=False),
+            summary.get("reading_time"),
+            summary.get("upload_time"),
+            summary.get("time_label"),
+            sort_mtime,
+            file_mtime,
+            file_size,
+            summary.get("pdf_sha256"),
+        )
+
+    def _to_summary(self, row: sqlite3.Row, fields: Optional[Iterable[str]] = None) -> Dict:
+        summary = {
+            "id": row["paper_id"],
+            "title": row["title"],
+            "authors": json.loads(row["authors"]),
+            "year": row["year"],
+            "custom_tags": json.loads(row["custom_tags"]),
+            "reading_time": row["reading_time"],
+            "upload_time": row["upload_time"],
+        }
+        if fields is None:
+            return summary
+        wanted = set(fields) | {"id"}
+        return {key: value for key, value in summary.items() if key in wanted}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point: ``python catalog_index.py verify|rebuild``.
+    """
+    from db_manager import LiteratureRepository
+
+    parser = argparse.ArgumentParser(description="Verify or rebuild the literature catalog index.")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--db", default="literature_db", help="Path to the literature database folder")
+    parser.add_argument("--repair", action="store_true", help="Re-index drifted records after verify")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    repository = LiteratureRepository(args.db)
+
+    if args.command == "rebuild":
+        count = repository.rebuild_catalog()
+        print(f"Catalog rebuilt with {count} records")
+        return 0
+
+    report = repository.verify_catalog(repair=args.repair)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    drifted = report["missing"] or report["orphaned"] or report["stale"]
+    return 1 if drifted and not args.repair else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,15 +1,217 @@
+import functools
 import os
-import json
 import logging
 import shutil
-from typing import Callable, Dict, List, Optional, Set
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import metrics
+from atomic_io import StripedFileLocks
+from blob_store import BlobStore
+from catalog_index import CatalogIndex
+from record_store import RecordStore, StatSignature, open_record_store
+from search_index import SearchIndex
+from vector_index import VectorIndex
+
+
+def _scan(operation: str, count_rows: Optional[Callable[[Any], int]] = len):
+    """
+    Time a repository method that scans many records and count the rows it
+    returns (``count_rows`` maps the result to a row count).
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with metrics.REPOSITORY_SCAN_SECONDS.time(operation=operation):
+                result = method(*args, **kwargs)
+            if count_rows is not None:
+                metrics.REPOSITORY_SCAN_ROWS_TOTAL.inc(count_rows(result), operation=operation)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+# What a conditional write expects the record to still be at: its
+# ``version`` counter (int) or the store's version token (str, the token
+# inside the record ETag).
+ExpectedVersion = Optional[Union[int, str]]
+
+
+class RecordVersionConflict(Exception):
+    """
+    Raised when a record changed since the version the caller last read.
+    """
+
+    def __init__(self, paper_id: str, expected: Union[int, str], actual: Union[int, str, None]):
+        super().__init__(f"Record {paper_id} is at version {actual}, expected {expected}")
+        self.paper_id = paper_id
+        self.expected = expected
+        self.actual = actual
+
+
+class TagIndex:
+    """
+    In-memory inverted index of tag -> paper ids, kept in step with the catalog.
+    """
+
+    def __init__(self):
+        self._papers_by_tag: Dict[str, Set[str]] = {}
+        self._tags_by_paper: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, tags_by_paper: Dict[str, List[str]]):
+        with self._lock:
+            self._papers_by_tag = {}
+            self._tags_by_paper = {}
+            for paper_id, tags in tags_by_paper.items():
+                self._set_unlocked(paper_id, tags)
+
+    def set_paper_tags(self, paper_id: str, tags: Iterable):
+        with self._lock:
+            self._set_unlocked(paper_id, tags)
+
+    def remove_paper(self, paper_id: str):
+        with self._lock:
+            self._remove_unlocked(paper_id)
+
+    def papers_with_tag(self, tag: str) -> List[str]:
+        with self._lock:
+            return sorted(self._papers_by_tag.get(tag, ()))
+
+    def tags(self) -> List[str]:
+        with self._lock:
+            return sorted(self._papers_by_tag)
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            stats = [{"tag": tag, "count": len(papers)} for tag, papers in self._papers_by_tag.items()]
+        return sorted(stats, key=lambda x: x["tag"].lower())
+
+    def _set_unlocked(self, paper_id: str, tags: Iterable):
+        self._remove_unlocked(paper_id)
+        normalized = list(dict.fromkeys(t for t in (tags or []) if isinstance(t, str)))
+        if not normalized:
+            return
+        self._tags_by_paper[paper_id] = normalized
+        for tag in normalized:
+            self._papers_by_tag.setdefault(tag, set()).add(paper_id)
+
+    def _remove_unlocked(self, paper_id: str):
+        for tag in self._tags_by_paper.pop(paper_id, []):
+            papers = self._papers_by_tag.get(tag)
+            if papers is None:
+                continue
+            papers.discard(paper_id)
+            if not papers:
+                del self._papers_by_tag[tag]
+
+
+class RecordCache:
+    """
+    Bounded LRU cache of parsed records keyed by paper id.
+
+    Each entry remembers the store's version token it was read at; a lookup
+    only counts as a hit while the token is unchanged, so edits made by
+    other processes or by hand are picked up. Cached dicts are shared:
+    callers must treat them as read-only.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, paper_id: str, token: Optional[str]) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(paper_id)
+            if entry is None or token is None or entry[0] != token:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(paper_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, paper_id: str, token: Optional[str], data: Dict):
+        if token is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[paper_id] = (token, data)
+            self._entries.move_to_end(paper_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, paper_id: str):
+        with self._lock:
+            self._entries.pop(paper_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
 
 class LiteratureRepository:
-    def __init__(self, db_base_path: str = "literature_db"):
+    def __init__(
+        self,
+        db_base_path: str = "literature_db",
+        storage: Optional[str] = None,
+        record_cache_size: int = 256,
+    ):
+        """
+        ``storage`` names the record store backend ("folder" or "sqlite");
+        by default it is detected from the database folder.
+        ``record_cache_size`` bounds the parsed-record cache (0 disables it).
+        """
         self.db_base_path = db_base_path
-        self.analysis_file_name = "analysis.json"
         self.pdf_file_name = "original.pdf"
+        self.catalog_file_name = "catalog.sqlite3"
+        self.search_file_name = "search.sqlite3"
+        self.blob_dir_name = "_blobs"
+        self.lock_dir_name = "_locks"
+        self.vector_dir_name = "_vectors"
         self._setup_database()
+        self.store: RecordStore = open_record_store(self.db_base_path, storage)
+        # Per-paper write locks shared with other processes on the same folder.
+        self.locks = StripedFileLocks(os.path.join(self.db_base_path, self.lock_dir_name))
+        self.catalog = CatalogIndex(os.path.join(self.db_base_path, self.catalog_file_name))
+        self.search_index = SearchIndex(os.path.join(self.db_base_path, self.search_file_name))
+        self.blob_store = BlobStore(
+            os.path.join(self.db_base_path, self.blob_dir_name),
+            os.path.join(self.db_base_path, "blobs.sqlite3"),
+        )
+        # Related-paper vectors need NumPy; without it the feature is off.
+        self.vector_index: Optional[VectorIndex] = None
+        if VectorIndex.available():
+            self.vector_index = VectorIndex(os.path.join(self.db_base_path, self.vector_dir_name))
+        self.tag_index = TagIndex()
+        self.record_cache = RecordCache(record_cache_size)
+        self._tag_index_version = None
+        if self.catalog.is_empty() and self._list_paper_ids():
+            logging.info("Catalog index is empty, building it from paper folders")
+            self.rebuild_catalog()
+        else:
+            self._load_tag_index()
+        if self.search_index.is_empty() and not self.catalog.is_empty():
+            logging.info("Search index is empty, building it from paper folders")
+            self.rebuild_search_index()
+        if self.vector_index is not None and self.vector_index.is_empty() and not self.catalog.is_empty():
+            logging.info("Vector index is empty, building it from paper folders")
+            self.rebuild_vector_index()
 
     def _setup_database(self):
         """Ensure database directory exists."""
@@ -17,131 +219,395 @@ class LiteratureRepository:
             logging.info(f"Creating database directory: {self.db_base_path}")
             os.makedirs(self.db_base_path)
 
+    def _list_paper_ids(self) -> List[str]:
+        return self.store.list_ids()
+
     def get_paper_dir(self, paper_id: str) -> str:
-        return os.path.join(self.db_base_path, paper_id)
+        return self.store.paper_dir(paper_id)
+
+    def _mutate_analysis_file(
+        self,
+        paper_id: str,
+        update_function: Callable[[Dict], Dict],
+        expected_version: ExpectedVersion = None,
+    ) -> Dict:
+        """
+        Read-modify-write a record under its lock and bump its ``version``.
 
-    def get_analysis_filepath(self, paper_id: str) -> str:
-        return os.path.join(self.get_paper_dir(paper_id), self.analysis_file_name)
+        With ``expected_version`` the write only happens if the record is
+        still at that version, otherwise ``RecordVersionConflict`` is raised.
+        A string is compared with the store's version token, so records
+        written before versions existed can be guarded by their ETag too.
+        """
+        with self.locks.lock(paper_id):
+            if isinstance(expected_version, str):
+                current_token = self.store.version_token(paper_id)
+                if current_token is not None and expected_version != current_token:
+                    raise RecordVersionConflict(paper_id, expected_version, current_token)
+            data = self.store.read(paper_id)
+
+            current_version = data.get('version', 0)
+            if isinstance(expected_version, int) and expected_version != current_version:
+                raise RecordVersionConflict(paper_id, expected_version, current_version)
+
+            if 'custom_tags' not in data:
+                data['custom_tags'] = []
+
+            updated_data = update_function(data) or data
+            updated_data['version'] = current_version + 1
+
+            self.store.write(paper_id, updated_data)
+            self._cache_written(paper_id, updated_data)
+            self._index_record(paper_id, updated_data)
+        return updated_data
 
-    def _mutate_analysis_file(self, paper_id: str, update_function: Callable[[Dict], Dict]) -> Dict:
-        filepath = self.get_analysis_filepath(paper_id)
-        if not os.path.exists(filepath):
-            raise FileNotFoundError(f"Record {paper_id} not found")
+    # ------------------------------------------------------------------ #
+    # Catalog index
+    # ------------------------------------------------------------------ #
+
+    def _summarize_record(self, paper_id: str, data: Dict) -> Dict:
+        meta = data.get("文献信息", {})
+        return {
+            "id": paper_id,
+            "title": meta.get("标题", "无标题"),
+            "authors": meta.get("作者", []),
+            "year": meta.get("年份", ""),
+            "custom_tags": data.get("custom_tags", []),
+            "reading_time": data.get("reading_time"),
+            "upload_time": data.get("upload_time"),
+            "time_label": data.get("time_label"),
+            "pdf_sha256": data.get("pdf_sha256"),
+        }
+
+    def _stat_signature(self, paper_id: str) -> StatSignature:
+        return self.store.signature(paper_id)
+
+    def _index_record(self, paper_id: str, data: Dict, full_text: Optional[str] = None):
+        try:
+            self._index_entries([(self._summarize_record(paper_id, data), self._stat_signature(paper_id))])
+        except Exception as e:
+            logging.error(f"Failed to update catalog for {paper_id}: {e}")
+        try:
+            self.search_index.upsert(paper_id, data, full_text)
+        except Exception as e:
+            logging.error(f"Failed to update search index for {paper_id}: {e}")
+        if self.vector_index is not None:
+            try:
+                self.vector_index.upsert(paper_id, data)
+            except Exception as e:
+                logging.error(f"Failed to update vector index for {paper_id}: {e}")
+
+    def _index_entries(self, entries: List[Tuple[Dict, StatSignature]]):
+        self.catalog.upsert_many(entries)
+        for summary, _ in entries:
+            self.tag_index.set_paper_tags(summary["id"], summary.get("custom_tags"))
+
+    def _unindex_record(self, paper_id: str):
+        self.catalog.remove(paper_id)
+        self.tag_index.remove_paper(paper_id)
+        self.search_index.remove(paper_id)
+        if self.vector_index is not None:
+            self.vector_index.remove(paper_id)
+
+    def _load_tag_index(self):
+        # Read the version first: a write racing the load makes it stale again.
+        self._tag_index_version = self.catalog.version()
+        self.tag_index.load(self.catalog.tags_by_paper())
+
+    def _fresh_tag_index(self) -> TagIndex:
+        """
+        The tag index, reloaded if another process changed the catalog.
+        """
+        if self.catalog.version() != self._tag_index_version:
+            self._load_tag_index()
+        return self.tag_index
 
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    def _read_catalog_entry(self, paper_id: str) -> Optional[Tuple[Dict, StatSignature]]:
+        try:
+            data = self.store.read(paper_id)
+            return self._summarize_record(paper_id, data), self._stat_signature(paper_id)
+        except Exception as e:
+            logging.warning(f"Failed to read record {paper_id}: {e}")
+            return None
 
-        if 'custom_tags' not in data:
-            data['custom_tags'] = []
+    @_scan("rebuild_catalog", int)
+    def rebuild_catalog(self) -> int:
+        """
+        Re-read every stored record and replace the catalog contents.
+        """
+        entries = [
+            (self._summarize_record(paper_id, data), signature)
+            for paper_id, data, signature in self.store.iter_records()
+        ]
+        self.catalog.replace_all(entries)
+        self._load_tag_index()
+        logging.info(f"Catalog rebuilt with {len(entries)} records")
+        return len(entries)
+
+    @_scan("rebuild_search_index", int)
+    def rebuild_search_index(self, extract_text: Optional[Callable[[str], str]] = None) -> int:
+        """
+        Re-index every paper's analysis in the full-text search index.
 
-        updated_data = update_function(data) or data
+        Extracted PDF text is only available for papers ingested since the
+        index existed; pass ``extract_text`` (pdf path -> text) to recover it
+        from ``original.pdf`` for the rest.
+        """
+        without_text = set(self.search_index.ids_without_text())
+        indexed = set(self.search_index.paper_ids())
+        items = []
+        for paper_id, data, _ in self.store.iter_records():
+            full_text = None
+            pdf_path = os.path.join(self.get_paper_dir(paper_id), self.pdf_file_name)
+            needs_text = paper_id in without_text or paper_id not in indexed
+            if extract_text and needs_text and os.path.exists(pdf_path):
+                try:
+                    full_text = extract_text(pdf_path)
+                except Exception as e:
+                    logging.warning(f"Failed to extract text from {pdf_path}: {e}")
+            items.append((paper_id, data, full_text))
+
+        self.search_index.upsert_many(items)
+        self.search_index.retain_only(paper_id for paper_id, _, _ in items)
+        logging.info(f"Search index rebuilt with {len(items)} records")
+        return len(items)
+
+    @_scan("rebuild_vector_index", int)
+    def rebuild_vector_index(self) -> int:
+        """
+        Re-vectorize every paper's analysis; unchanged records are skipped.
+        """
+        if self.vector_index is None:
+            return 0
+        items = [(paper_id, data) for paper_id, data, _ in self.store.iter_records()]
+        written = self.vector_index.upsert_many(items)
+        self.vector_index.retain_only(paper_id for paper_id, _ in items)
+        logging.info(f"Vector index rebuilt with {len(items)} records ({written} re-vectorized)")
+        return len(items)
+
+    @_scan("verify_catalog", None)
+    def verify_catalog(self, repair: bool = False) -> Dict[str, List[str]]:
+        """
+        Compare the catalog with the record store using signatures only.
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(updated_data, f, ensure_ascii=False, indent=2)
+        ``missing`` records are not indexed, ``orphaned`` rows have no record
+        and ``stale`` rows no longer match the stored record.
+        """
+        indexed = self.catalog.get_stat_signatures()
+        on_disk = self.store.signatures()
+
+        report = {
+            "missing": sorted(pid for pid in on_disk if pid not in indexed),
+            "orphaned": sorted(pid for pid in indexed if pid not in on_disk),
+            "stale": sorted(
+                pid for pid, signature in on_disk.items()
+                if pid in indexed and tuple(indexed[pid]) != signature
+            ),
+        }
+
+        if repair:
+            for paper_id in report["orphaned"]:
+                self._unindex_record(paper_id)
+            entries = [self._read_catalog_entry(pid) for pid in report["missing"] + report["stale"]]
+            self._index_entries([entry for entry in entries if entry])
+
+        return report
+
+    @_scan("list_summaries")
+    def get_all_literature_summaries(self) -> List[Dict]:
+        return self.catalog.list_summaries()
 
-        return updated_data
+    @_scan("query_summaries", lambda result: len(result[0]))
+    def query_literature_summaries(self, **options) -> Tuple[List[Dict], Optional[Tuple], int]:
+        """
+        Sorted, filtered, keyset-paginated summaries; see ``CatalogIndex.query_summaries``.
+        """
+        return self.catalog.query_summaries(**options)
 
-    def get_all_literature_summaries(self) -> List[Dict]:
-        summaries = []
-        if not os.path.exists(self.db_base_path):
-            return []
-            
-        try:
-            paper_ids = os.listdir(self.db_base_path)
-            sorted_paper_ids = sorted(
-                paper_ids,
-                key=lambda pid: os.path.getmtime(self.get_paper_dir(pid)),
-                reverse=True
-            )
-        except Exception as e:
-            logging.warning(f"Error sorting literature list: {e}, using default order")
-            sorted_paper_ids = paper_ids
+    def find_by_pdf_hash(self, pdf_sha256: str) -> Optional[str]:
+        """
+        Return the id of a paper whose original PDF has this SHA-256 digest.
+        """
+        if not pdf_sha256:
+            return None
+        return self.catalog.find_by_pdf_hash(pdf_sha256)
 
-        for paper_id in sorted_paper_ids:
-            paper_dir = self.get_paper_dir(paper_id)
-            if not os.path.isdir(paper_dir):
-                continue
-            
-            filepath = self.get_analysis_filepath(paper_id)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                summary = {
-                    "id": data.get("paper_id", paper_id),
-                    "title": data.get("文献信息", {}).get("标题", "无标题"),
-                    "authors": data.get("文献信息", {}).get("作者", []),
-                    "year": data.get("文献信息", {}).get("年份", ""),
-                    "custom_tags": data.get("custom_tags", []),
-                    "reading_time": data.get("reading_time"),
-                    "upload_time": data.get("upload_time")
-                }
-                summaries.append(summary)
-                
-            except Exception as e:
-                logging.warning(f"Failed to read {filepath}: {e}")
-                
-        return summaries
+    @_scan("search", lambda result: len(result[1]))
+    def search_literature(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[int, List[Dict]]:
+        return self.search_index.search(query, limit=limit, offset=offset)
+
+    @_scan("related", lambda result: len(result or []))
+    def find_related_literature(self, paper_id: str, k: int = 10) -> Optional[List[Tuple[str, float]]]:
+        """
+        The ``k`` papers whose abstract, conclusions and contributions are
+        most similar to ``paper_id``'s, as ``(paper_id, cosine)``; None if the
+        paper is not indexed or there is no vector index (no NumPy).
+        """
+        if self.vector_index is None:
+            return None
+        return self.vector_index.similar(paper_id, k)
+
+    def group_related_literature(self, paper_ids: List[str], threshold: float = 0.25) -> List[List[str]]:
+        """
+        Partition ``paper_ids`` into groups of related papers; without a
+        vector index every paper is a group of its own.
+        """
+        if self.vector_index is None:
+            return [[paper_id] for paper_id in dict.fromkeys(paper_ids)]
+        return self.vector_index.group(paper_ids, threshold)
+
+    def get_record_version(self, paper_id: str) -> Optional[str]:
+        """
+        Cheap version token of a record that changes on every write.
+        """
+        return self.store.version_token(paper_id)
+
+    def get_catalog_version(self) -> str:
+        return self.catalog.version()
+
+    def get_pdf_hash(self, paper_id: str) -> Optional[str]:
+        return self.catalog.get_pdf_hash(paper_id)
+
+    def get_image_hash(self, paper_id: str, filename: str) -> Optional[str]:
+        return self.blob_store.blob_id_for(paper_id, filename)
 
     def get_literature_by_id(self, paper_id: str) -> Optional[Dict]:
-        filepath = self.get_analysis_filepath(paper_id)
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+        """
+        The parsed record, served from the record cache while unchanged.
+        The returned dict may be shared; do not mutate it.
+        """
+        token = self.store.version_token(paper_id)
+        if token is None:
+            self.record_cache.invalidate(paper_id)
+            return None
+        data = self.record_cache.get(paper_id, token)
+        if data is not None:
             return data
+        try:
+            data = self.store.read(paper_id)
         except FileNotFoundError:
             return None
         except Exception as e:
-            logging.error(f"Error parsing {filepath}: {e}")
+            logging.error(f"Error reading record {paper_id}: {e}")
             return None
+        # Cached under the token read first: a racing write only causes a later miss.
+        self.record_cache.put(paper_id, token, data)
+        return data
 
-    def save_new_literature(self, paper_id: str, temp_pdf_path: str, analysis_data: Dict):
-        paper_dir = self.get_paper_dir(paper_id)
-        if os.path.exists(paper_dir):
-            logging.warning(f"ID {paper_id} exists, overwriting.")
-        else:
-            os.makedirs(paper_dir)
-            
-        filepath = self.get_analysis_filepath(paper_id)
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(analysis_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logging.error(f"Failed to save {filepath}: {e}")
-            
-        pdf_dest_path = os.path.join(paper_dir, self.pdf_file_name)
-        try:
-            shutil.copy(temp_pdf_path, pdf_dest_path)
-        except Exception as e:
-            logging.error(f"Failed to copy PDF to {pdf_dest_path}: {e}")
+    def _cache_written(self, paper_id: str, data: Dict):
+        self.record_cache.put(paper_id, self.store.version_token(paper_id), data)
 
-    def delete_literature_by_id(self, paper_id: str):
+    def get_record_cache_stats(self) -> Dict:
+        return self.record_cache.stats()
+
+    def save_new_literature(self, paper_id: str, pdf_source, analysis_data: Dict, full_text: Optional[str] = None):
+        """
+        Persist a new record; ``pdf_source`` is a path to copy or the PDF bytes.
+        ``full_text`` is the extracted PDF text, indexed for full-text search.
+        """
         paper_dir = self.get_paper_dir(paper_id)
-        if os.path.exists(paper_dir):
+        # The folder itself usually exists already: extraction writes the
+        # figures into it before the record is saved.
+        os.makedirs(paper_dir, exist_ok=True)
+
+        with self.locks.lock(paper_id):
+            if self.store.version_token(paper_id) is not None:
+                logging.warning(f"ID {paper_id} exists, overwriting.")
+                # Keep the version increasing so ETags issued for the old
+                # record cannot match the new one.
+                try:
+                    previous_version = self.store.read(paper_id).get("version", 0)
+                except Exception as e:
+                    logging.warning(f"Failed to read existing record {paper_id}: {e}")
+                    previous_version = 0
+                analysis_data["version"] = max(analysis_data.get("version", 1), previous_version + 1)
+            else:
+                analysis_data.setdefault("version", 1)
+
+            # The PDF goes first so a crash never leaves an indexable
+            # record without its PDF.
+            pdf_dest_path = os.path.join(paper_dir, self.pdf_file_name)
             try:
-                shutil.rmtree(paper_dir)
+                tmp_path = f"{pdf_dest_path}.tmp"
+                if isinstance(pdf_source, (bytes, bytearray)):
+                    with open(tmp_path, 'wb') as f:
+                        f.write(pdf_source)
+                else:
+                    shutil.copy(pdf_source, tmp_path)
+                os.replace(tmp_path, pdf_dest_path)
             except Exception as e:
-                logging.error(f"Failed to delete directory {paper_dir}: {e}")
+                logging.error(f"Failed to copy PDF to {pdf_dest_path}: {e}")
+
+            try:
+                self.store.write(paper_id, analysis_data)
+                self._cache_written(paper_id, analysis_data)
+            except Exception as e:
+                # Indexing a record that was never stored would list a
+                # paper that cannot be opened.
+                logging.error(f"Failed to save record {paper_id}: {e}")
                 raise
-        else:
-            logging.warning(f"Attempted to delete non-existent directory: {paper_dir}")
 
-    def add_tag_to_literature(self, paper_id: str, tag: str) -> List[str]:
+            self._intern_images(paper_id, analysis_data.get("image_files", []))
+            self._index_record(paper_id, analysis_data, full_text)
+
+    def delete_literature_by_id(self, paper_id: str):
+        with self.locks.lock(paper_id):
+            self.store.delete(paper_id)
+            self.record_cache.invalidate(paper_id)
+            self._unindex_record(paper_id)
+        self.blob_store.release_paper(paper_id)
+
+    def _intern_images(self, paper_id: str, image_files: List[str]):
+        try:
+            stats = self.blob_store.intern_files(paper_id, self.get_paper_dir(paper_id), image_files)
+        except Exception as e:
+            logging.error(f"Failed to deduplicate figures of {paper_id}: {e}")
+            return
+        if stats["shared"]:
+            logging.info(
+                f"{paper_id}: {stats['shared']} figures shared with existing blobs, "
+                f"{stats['bytes_saved']} bytes saved"
+            )
+
+    def intern_all_images(self) -> Dict[str, int]:
+        """
+        Move the figures of every existing paper into the blob store.
+        """
+        totals = {"papers": 0, "stored": 0, "shared": 0, "bytes_saved": 0}
+        for paper_id in self._list_paper_ids():
+            data = self.get_literature_by_id(paper_id)
+            if not data:
+                continue
+            stats = self.blob_store.intern_files(paper_id, self.get_paper_dir(paper_id), data.get("image_files", []))
+            totals["papers"] += 1
+            for key, value in stats.items():
+                totals[key] += value
+        return totals
+
+    def discard_paper_dir(self, paper_id: str):
+        """
+        Remove a half-ingested paper folder that was never indexed.
+        """
+        paper_dir = self.get_paper_dir(paper_id)
+        if os.path.isdir(paper_dir):
+            shutil.rmtree(paper_dir, ignore_errors=True)
+
+    def add_tag_to_literature(self, paper_id: str, tag: str, expected_version: ExpectedVersion = None) -> List[str]:
         def _add(data):
             if tag and tag not in data['custom_tags']:
                 data['custom_tags'].append(tag)
             return data
             
-        updated_data = self._mutate_analysis_file(paper_id, _add)
+        updated_data = self._mutate_analysis_file(paper_id, _add, expected_version)
         return updated_data.get('custom_tags', [])
 
-    def remove_tag_from_literature(self, paper_id: str, tag: str) -> List[str]:
+    def remove_tag_from_literature(self, paper_id: str, tag: str, expected_version: ExpectedVersion = None) -> List[str]:
         def _remove(data):
             if tag in data['custom_tags']:
                 data['custom_tags'].remove(tag)
             return data
             
-        updated_data = self._mutate_analysis_file(paper_id, _remove)
+        updated_data = self._mutate_analysis_file(paper_id, _remove, expected_version)
         return updated_data.get('custom_tags', [])
 
     def get_image_metadata(self, paper_id: str) -> List[Dict]:
@@ -150,74 +616,58 @@ class LiteratureRepository:
             raise FileNotFoundError(f"Record {paper_id} not found")
         return data.get('image_metadata', [])
 
-    def update_image_metadata(self, paper_id: str, metadata: List[Dict]) -> List[Dict]:
+    def update_image_metadata(self, paper_id: str, metadata: List[Dict], expected_version: ExpectedVersion = None) -> List[Dict]:
         metadata = metadata or []
         def _update(data):
             data['image_metadata'] = metadata
             return data
             
-        updated_data = self._mutate_analysis_file(paper_id, _update)
+        updated_data = self._mutate_analysis_file(paper_id, _update, expected_version)
         return updated_data.get('image_metadata', [])
 
-    def update_reading_time(self, paper_id: str, reading_time: str) -> str:
+    def update_reading_time(self, paper_id: str, reading_time: str, expected_version: ExpectedVersion = None) -> str:
         def _update(data):
             data['reading_time'] = reading_time
             return data
 
-        updated_data = self._mutate_analysis_file(paper_id, _update)
+        updated_data = self._mutate_analysis_file(paper_id, _update, expected_version)
         return updated_data.get('reading_time', '')
 
     def get_all_tags(self) -> List[str]:
-        all_tags: Set[str] = set()
-        if not os.path.exists(self.db_base_path):
-            return []
-
-        for paper_id in os.listdir(self.db_base_path):
-            paper_dir = self.get_paper_dir(paper_id)
-            if not os.path.isdir(paper_dir):
-                continue
-            
-            filepath = self.get_analysis_filepath(paper_id)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                tags = data.get("custom_tags", [])
-                for tag in tags:
-                    all_tags.add(tag)
-                    
-            except Exception as e:
-                logging.warning(f"Failed to read tags from {filepath}: {e}")
-                
-        return sorted(list(all_tags))
+        return self._fresh_tag_index().tags()
 
+    @_scan("tag_stats")
     def get_tag_stats(self) -> List[Dict]:
         """
         Return aggregated tag usage counts across all papers.
         """
-        tag_counts = {}
-        if not os.path.exists(self.db_base_path):
-            return []
-
-        for paper_id in os.listdir(self.db_base_path):
-            paper_dir = self.get_paper_dir(paper_id)
-            if not os.path.isdir(paper_dir):
-                continue
+        return self._fresh_tag_index().stats()
 
-            filepath = self.get_analysis_filepath(paper_id)
+    def _rewrite_tags_for(self, paper_ids: List[str], transform: Callable[[List[str]], List[str]], action: str):
+        """
+        Apply ``transform`` to the tags of the given papers only and index
+        the rewritten records in a single catalog transaction.
+        """
+        reindexed = []
+        for paper_id in paper_ids:
             try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                for tag in data.get("custom_tags", []):
-                    if not isinstance(tag, str):
-                        continue
-                    tag_counts[tag] = tag_counts.get(tag, 0) + 1
+                with self.locks.lock(paper_id):
+                    data = self.store.read(paper_id)
+                    tags = [t for t in data.get("custom_tags", []) if isinstance(t, str)]
+                    data["custom_tags"] = transform(tags)
+                    data["version"] = data.get("version", 0) + 1
+
+                    self.store.write(paper_id, data)
+                    self._cache_written(paper_id, data)
+                    reindexed.append((self._summarize_record(paper_id, data), self._stat_signature(paper_id)))
+            except FileNotFoundError:
+                self._unindex_record(paper_id)
             except Exception as e:
-                logging.warning(f"Failed to read tags from {filepath}: {e}")
+                logging.warning(f"Failed to {action} tag in record {paper_id}: {e}")
 
-        stats = [{"tag": name, "count": count} for name, count in tag_counts.items()]
-        return sorted(stats, key=lambda x: x["tag"].lower())
+        self._index_entries(reindexed)
 
+    @_scan("rename_tag", None)
     def rename_tag_globally(self, old_tag: str, new_tag: str) -> List[Dict]:
         """
         Rename a tag across every paper and return updated stats.
@@ -225,33 +675,14 @@ class LiteratureRepository:
         if not old_tag or not new_tag:
             return self.get_tag_stats()
 
-        for paper_id in os.listdir(self.db_base_path):
-            paper_dir = self.get_paper_dir(paper_id)
-            if not os.path.isdir(paper_dir):
-                continue
-
-            filepath = self.get_analysis_filepath(paper_id)
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                tags = data.get("custom_tags", [])
-                if not tags or old_tag not in tags:
-                    continue
-
-                updated = [new_tag if t == old_tag else t for t in tags if isinstance(t, str)]
-                # Keep order but remove duplicates after rename
-                deduped = list(dict.fromkeys(updated))
-                data["custom_tags"] = deduped
-
-                with open(filepath, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-            except FileNotFoundError:
-                continue
-            except Exception as e:
-                logging.warning(f"Failed to rename tag in {filepath}: {e}")
+        def _rename(tags):
+            # Keep order but remove duplicates after rename
+            return list(dict.fromkeys(new_tag if t == old_tag else t for t in tags))
 
+        self._rewrite_tags_for(self._fresh_tag_index().papers_with_tag(old_tag), _rename, "rename")
         return self.get_tag_stats()
 
+    @_scan("delete_tag", None)
     def delete_tag_globally(self, tag: str) -> List[Dict]:
         """
         Remove a tag from every paper and return updated stats.
@@ -259,31 +690,14 @@ class LiteratureRepository:
         if not tag:
             return self.get_tag_stats()
 
-        for paper_id in os.listdir(self.db_base_path):
-            paper_dir = self.get_paper_dir(paper_id)
-            if not os.path.isdir(paper_dir):
-                continue
-
-            filepath = self.get_analysis_filepath(paper_id)
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                tags = data.get("custom_tags", [])
-                if not tags or tag not in tags:
-                    continue
-
-                data["custom_tags"] = [t for t in tags if t != tag and isinstance(t, str)]
-
-                with open(filepath, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-            except FileNotFoundError:
-                continue
-            except Exception as e:
-                logging.warning(f"Failed to delete tag in {filepath}: {e}")
-
+        self._rewrite_tags_for(
+            self._fresh_tag_index().papers_with_tag(tag),
+            lambda tags: [t for t in tags if t != tag],
+            "delete",
+        )
         return self.get_tag_stats()
 
-    def update_literature_metadata(self, paper_id: str, metadata: Dict) -> Dict:
+    def update_literature_metadata(self, paper_id: str, metadata: Dict, expected_version: ExpectedVersion = None) -> Dict:
         def _update(data):
             meta = data.setdefault("文献信息", {})
             key_map = {
@@ -302,7 +716,7 @@ class LiteratureRepository:
                     data["time_label"] = value
             return data
 
-        updated_data = self._mutate_analysis_file(paper_id, _update)
+        updated_data = self._mutate_analysis_file(paper_id, _update, expected_version)
         return updated_data.get("文献信息", {})
 
 # Global instance for backward compatibility if needed, 
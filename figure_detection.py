@@ -0,0 +1,164 @@
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+
+# "Fig. 2", "Figure 2:", "FIG 2 |", "图2", "图 2." at the start of a text block.
+CAPTION_RE = re.compile(r"^\s*(?:fig(?:ure)?\.?|图)\s*(\d+)(?=$|[\s.:：|,，、()（）a-zA-Z])", re.IGNORECASE)
+MAX_CAPTION_CHARS = 1500
+
+
+def find_captions(page) -> List[Dict]:
+    """
+    Return the figure caption blocks of a page, top to bottom.
+    """
+    captions = []
+    for block in page.get_text("blocks"):
+        x0, y0, x1, y1, text, _, block_type = block[:7]
+        if block_type != 0:
+            continue
+        match = CAPTION_RE.match(text)
+        if not match or len(text) > MAX_CAPTION_CHARS:
+            continue
+        captions.append({
+            "rect": fitz.Rect(x0, y0, x1, y1),
+            "text": " ".join(text.split()),
+            "label": match.group(1),
+        })
+    return sorted(captions, key=lambda c: c["rect"].y0)
+
+
+def caption_for_rect(captions: List[Dict], rect, max_gap: float = 72) -> Optional[Dict]:
+    """
+    The closest caption starting just below ``rect`` and overlapping it horizontally.
+    """
+    best, best_gap = None, None
+    for caption in captions:
+        crect = caption["rect"]
+        gap = crect.y0 - rect.y1
+        if gap < -8 or gap > max_gap:
+            continue
+        if min(crect.x1, rect.x1) <= max(crect.x0, rect.x0):
+            continue
+        if best_gap is None or gap < best_gap:
+            best, best_gap = caption, gap
+    return best
+
+
+def _column_for(page_rect, caption_rect):
+    """
+    Full width for wide captions, otherwise the half of the page the caption sits in.
+    """
+    if caption_rect.width >= page_rect.width * 0.55:
+        return page_rect.x0, page_rect.x1
+    middle = (page_rect.x0 + page_rect.x1) / 2
+    if (caption_rect.x0 + caption_rect.x1) / 2 < middle:
+        return page_rect.x0, middle
+    return middle, page_rect.x1
+
+
+def detect_vector_figures(
+    page,
+    captions: List[Dict],
+    image_rects: Iterable = (),
+    min_items: int = 8,
+    min_size: float = 40,
+    max_gap: float = 30,
+) -> List[Tuple[Dict, "fitz.Rect"]]:
+    """
+    Locate drawn (vector) figures as the cluster of drawing paths directly
+    above each caption.
+
+    Paths are grown upwards from the caption while consecutive paths are
+    within ``max_gap`` points of each other; clusters with fewer than
+    ``min_items`` drawing commands (rules, table borders) or mostly
+    covered by an embedded raster image are ignored.
+    """
+    page_rect = page.rect
+    paths = []
+    for drawing in page.get_drawings():
+        rect = drawing.get("rect")
+        if rect is None or (rect.width <= 0 and rect.height <= 0):
+            continue
+        if rect.width > page_rect.width * 0.95 and rect.height > page_rect.height * 0.9:
+            continue  # page frame / background
+        paths.append((fitz.Rect(rect), len(drawing.get("items") or ()) or 1))
+    if not paths:
+        return []
+    image_rects = [fitz.Rect(r) for r in image_rects]
+
+    figures = []
+    previous_bottom: Dict[Tuple[float, float], float] = {}
+    for caption in captions:
+        crect = caption["rect"]
+        column = _column_for(page_rect, crect)
+        upper = previous_bottom.get(column, page_rect.y0)
+        previous_bottom[column] = crect.y1
+
+        members = [
+            (r, items) for r, items in paths
+            if r.y1 <= crect.y0 + 2 and r.y0 >= upper - 2
+            and column[0] - 2 <= (r.x0 + r.x1) / 2 <= column[1] + 2
+        ]
+        members.sort(key=lambda member: member[0].y1, reverse=True)
+
+        cluster, count = None, 0
+        for rect, items in members:
+            if cluster is None:
+                if crect.y0 - rect.y1 > max_gap * 2:
+                    break
+                cluster = fitz.Rect(rect)
+            elif rect.y1 < cluster.y0 - max_gap:
+                break
+            else:
+                cluster |= rect
+            count += items
+
+        if cluster is None or count < min_items:
+            continue
+        if cluster.width < min_size or cluster.height < min_size:
+            continue
+        area = cluster.width * cluster.height
+        if any((image & cluster).get_area() >= 0.5 * area for image in image_rects):
+            continue
+
+        clip = fitz.Rect(cluster.x0 - 6, cluster.y0 - 6, cluster.x1 + 6, cluster.y1 + 6) & page_rect
+        figures.append((caption, clip))
+    return figures
+
+
+def render_vector_figures(source: Union[str, bytes], page_numbers: List[int], dpi: int = 150) -> List[Dict]:
+    """
+    Process-pool entry point: rasterize the vector figures of the given
+    pages. Returns one entry per figure with the PNG bytes, page number
+    (1-based), caption text/label and clip rectangle.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        doc = fitz.open(stream=bytes(source), filetype="pdf")
+    else:
+        doc = fitz.open(source)
+    results = []
+    try:
+        for page_num in page_numbers:
+            try:
+                page = doc.load_page(page_num)
+                captions = find_captions(page)
+                if not captions:
+                    continue
+                image_rects = [info["bbox"] for info in page.get_image_info()]
+                for caption, clip in detect_vector_figures(page, captions, image_rects):
+                    pix = page.get_pixmap(dpi=dpi, clip=clip)
+                    results.append({
+                        "page": page_num + 1,
+                        "y": clip.y0,
+                        "caption": caption["text"],
+                        "label": caption["label"],
+                        "bbox": [round(v, 1) for v in clip],
+                        "png": pix.tobytes("png"),
+                    })
+            except Exception as e:
+                logging.warning(f"  [Warning] Vector figure detection failed on page {page_num + 1}: {e}")
+    finally:
+        doc.close()
+    return results
@@ -0,0 +1,23 @@
+"""
+gunicorn settings: ``gunicorn -c gunicorn.conf.py``.
+
+Values come from the same settings as the app (environment variables and
+``$LITERATURE_CONFIG``). Each worker drains its ingestion jobs on exit.
+"""
+from settings import load_settings
+
+_settings = load_settings()
+
+wsgi_app = "wsgi:app"
+bind = f"{_settings['HOST']}:{_settings['PORT']}"
+workers = _settings["WEB_WORKERS"]
+threads = _settings["WEB_THREADS"]
+worker_class = "gthread"
+# Leave room for the job drain before the master kills the worker.
+graceful_timeout = int(_settings["SHUTDOWN_DRAIN_SECONDS"]) + 5
+
+
+def worker_exit(server, worker):
+    from routes.literature_routes import shutdown_services
+
+    shutdown_services(_settings["SHUTDOWN_DRAIN_SECONDS"])
@@ -0,0 +1,113 @@
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow is optional; without it originals are served.
+    Image = None
+    features = None
+
+
+class ImageDerivatives:
+    """
+    Lazily generated, disk-cached resized copies of extracted figures.
+
+    Derivatives live in ``<paper_dir>/derived/<stem>.<size>.<ext>``. They are
+    produced on first request and, like the figures they come from, never
+    change afterwards, so they can be served as immutable. WebP is used when
+    Pillow was built with it, JPEG/PNG otherwise.
+    """
+
+    # size name -> longest edge in pixels
+    SIZES: Dict[str, int] = {"thumb": 320, "medium": 1024}
+    DERIVED_DIR = "derived"
+
+    def __init__(self, quality: int = 80):
+        self.quality = quality
+        # Striped locks so concurrent first requests render a file once.
+        self._locks = [threading.Lock() for _ in range(32)]
+        self.webp = bool(Image and features.check("webp"))
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def resolve(self, image_dir: str, filename: str, size: str) -> Tuple[str, str]:
+        """
+        Return ``(directory, filename)`` of the derivative, creating it if needed.
+
+        Falls back to the original when Pillow is missing, the image cannot
+        be decoded, or it is already smaller than the requested size.
+        """
+        if size not in self.SIZES:
+            raise ValueError(f"Unknown image size: {size}")
+        if not self.available:
+            return image_dir, filename
+
+        derived_dir = os.path.join(image_dir, self.DERIVED_DIR)
+        stem = os.path.splitext(filename)[0]
+        for ext in ("webp", "jpg", "png", "orig"):
+            candidate = f"{stem}.{size}.{ext}"
+            if os.path.exists(os.path.join(derived_dir, candidate)):
+                return self._existing(image_dir, filename, derived_dir, candidate)
+
+        source = os.path.join(image_dir, filename)
+        with self._lock_for(source + size):
+            # Another request may have produced it while we waited.
+            for ext in ("webp", "jpg", "png", "orig"):
+                candidate = f"{stem}.{size}.{ext}"
+                if os.path.exists(os.path.join(derived_dir, candidate)):
+                    return self._existing(image_dir, filename, derived_dir, candidate)
+            derived_name = self._render(source, derived_dir, stem, size)
+        if derived_name is None:
+            return image_dir, filename
+        return self._existing(image_dir, filename, derived_dir, derived_name)
+
+    def _existing(self, image_dir: str, filename: str, derived_dir: str, derived_name: str) -> Tuple[str, str]:
+        # A ".orig" marker records that the original is already small enough.
+        if derived_name.endswith(".orig"):
+            return image_dir, filename
+        return derived_dir, derived_name
+
+    def _render(self, source: str, derived_dir: str, stem: str, size: str) -> Optional[str]:
+        max_edge = self.SIZES[size]
+        try:
+            with Image.open(source) as img:
+                os.makedirs(derived_dir, exist_ok=True)
+                if max(img.size) <= max_edge and os.path.getsize(source) < 64 * 1024:
+                    derived_name = f"{stem}.{size}.orig"
+                    self._write_atomic(derived_dir, derived_name, lambda f: None)
+                    return derived_name
+
+                img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+                has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+                img = img.convert("RGBA" if has_alpha else "RGB")
+
+                if self.webp:
+                    derived_name, fmt, options = f"{stem}.{size}.webp", "WEBP", {"quality": self.quality, "method": 4}
+                elif has_alpha:
+                    derived_name, fmt, options = f"{stem}.{size}.png", "PNG", {"optimize": True}
+                else:
+                    derived_name, fmt, options = f"{stem}.{size}.jpg", "JPEG", {"quality": self.quality, "optimize": True}
+                self._write_atomic(derived_dir, derived_name, lambda f: img.save(f, fmt, **options))
+                return derived_name
+        except Exception as e:
+            logging.warning(f"Failed to build {size} derivative of {source}: {e}")
+            return None
+
+    def _write_atomic(self, directory: str, name: str, write):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, os.path.join(directory, name))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        return self._locks[hash(key) % len(self._locks)]
@@ -0,0 +1,236 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+
+class LLMClientError(Exception):
+    """
+    Raised when a chat completion request ultimately fails.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMAuthError(LLMClientError):
+    pass
+
+
+class CircuitOpenError(LLMClientError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and calls
+    fail immediately for ``reset_timeout`` seconds; then a single trial call
+    is let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_unlocked()
+
+    def _state_unlocked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self._state_unlocked()
+            if state == "open" or (state == "half_open" and self._trial_in_flight):
+                remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+                raise CircuitOpenError(f"LLM backend unavailable, retry in {max(0, int(remaining))}s", 503)
+            if state == "half_open":
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logging.warning(f"LLM circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """
+        End a half-open trial that never reached the backend, leaving the
+        state as it was so the next call can try again.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LLMClient:
+    """
+    Shared, keep-alive HTTP client for the chat completions backend.
+
+    Retries connection errors, timeouts, 429 and 5xx responses with jittered
+    exponential backoff, honouring ``Retry-After``. Other 4xx responses fail
+    immediately. A circuit breaker makes calls fail fast during an outage;
+    rate limiting (429) is retried but never counts towards it.
+    """
+
+    RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        pool_size: int = 16,
+        connect_timeout: float = 10,
+        read_timeout: float = 300,
+        max_attempts: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post_json(self, url: str, headers: Dict, payload: Dict, max_attempts: Optional[int] = None) -> Dict:
+        """
+        POST ``payload`` and return the decoded JSON body.
+        """
+        response = self._post(url, headers, payload, stream=False, max_attempts=max_attempts)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise LLMClientError(f"LLM backend returned invalid JSON: {e}", response.status_code)
+        finally:
+            response.close()
+
+    def open_stream(self, url: str, headers: Dict, payload: Dict, max_attempts: Optional[int] = None) -> requests.Response:
+        """
+        POST a streaming request; retries only apply until the response
+        headers arrive. The caller must close the returned response.
+        """
+        return self._post(url, headers, payload, stream=True, max_attempts=max_attempts)
+
+    def _post(self, url: str, headers: Dict, payload: Dict, stream: bool, max_attempts: Optional[int]) -> requests.Response:
+        attempts = max_attempts or self.max_attempts
+        last_error: Optional[LLMClientError] = None
+
+        for attempt in range(1, attempts + 1):
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                metrics.LLM_REQUESTS_TOTAL.inc(outcome="circuit_open")
+                raise
+            retry_after = None
+            started = time.perf_counter()
+            try:
+                response = self.session.post(
+                    url,
+                    headers=headers,
+                    json=payload,
+                    timeout=(self.connect_timeout, self.read_timeout),
+                    stream=stream,
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._observe(started, "connection_error")
+                self.breaker.record_failure()
+                last_error = LLMClientError(f"LLM request failed: {e}")
+                logging.error(f"  [Error] LLM request failed (Attempt {attempt}/{attempts}): {e}")
+            except requests.exceptions.RequestException as e:
+                # Invalid URL, redirect loop, broken response: retrying will
+                # not help, but it is still a failed call (and may have been
+                # the half-open trial, which must not stay in flight).
+                self._observe(started, "request_error")
+                self.breaker.record_failure()
+                logging.error(f"  [Error] LLM request failed: {e}")
+                raise LLMClientError(f"LLM request failed: {e}")
+            except BaseException:
+                self.breaker.release_trial()
+                raise
+            else:
+                status = response.status_code
+                self._observe(started, "ok" if status < 400 else f"http_{status}")
+                if status < 400:
+                    self.breaker.record_success()
+                    return response
+
+                retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+                response.close()
+                logging.error(f"  [Error] HTTP {status} from LLM backend (Attempt {attempt}/{attempts})")
+
+                if status == 401:
+                    # The backend is healthy; the caller's key is wrong.
+                    self.breaker.record_success()
+                    raise LLMAuthError("401 Unauthorized - Invalid API Key", status)
+                if status not in self.RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    raise LLMClientError(f"LLM backend rejected the request (HTTP {status})", status)
+
+                if status == 429:
+                    # Throttling, not an outage: back off without moving the
+                    # breaker either way (but end a half-open trial).
+                    self.breaker.release_trial()
+                else:
+                    self.breaker.record_failure()
+                last_error = LLMClientError(f"LLM backend error (HTTP {status})", status)
+
+            if attempt < attempts:
+                metrics.LLM_RETRIES_TOTAL.inc()
+                time.sleep(self._backoff(attempt, retry_after))
+
+        raise last_error or LLMClientError("LLM request failed")
+
+    def _observe(self, started: float, outcome: str):
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+        metrics.LLM_REQUESTS_TOTAL.inc(outcome=outcome)
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter: uniform in [0, base * 2^(attempt-1)], capped.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _parse_retry_after(self, value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
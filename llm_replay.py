@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from llm_client import LLMClient, LLMClientError
+
+REPLAY_MODES = ("record", "replay", "auto")
+
+
+def request_key(url: str, payload: Dict) -> str:
+    """
+    Digest of a chat completion request: endpoint plus the canonical JSON
+    payload. Headers (and so the API key) are deliberately left out.
+    """
+    material = json.dumps({"url": url, "payload": payload}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ReplayStore:
+    """
+    SQLite store of raw LLM responses keyed by ``request_key``.
+
+    Plain responses are stored as their JSON body, streamed responses as
+    the list of SSE lines, so both can be served again byte for byte.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_responses (
+        request_key TEXT PRIMARY KEY,
+        url TEXT NOT NULL,
+        stream INTEGER NOT NULL,
+        response TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._setup()
+
+    def _setup(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str, stream: bool):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response FROM llm_responses WHERE request_key = ? AND stream = ?",
+                (key, int(stream)),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, url: str, stream: bool, response):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_responses (request_key, url, stream, response, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    key,
+                    url,
+                    int(stream),
+                    json.dumps(response, ensure_ascii=False),
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+
+class ReplayedStream:
+    """
+    Stands in for a streaming ``requests.Response`` with recorded SSE lines.
+    """
+
+    status_code = 200
+
+    def __init__(self, lines: List[str]):
+        self._lines = lines
+
+    def iter_lines(self, decode_unicode: bool = False, **kwargs) -> Iterator:
+        for line in self._lines:
+            yield line if decode_unicode else line.encode("utf-8")
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RecordingStream:
+    """
+    Wraps a live streaming response and stores its lines once the stream
+    has been read to ``[DONE]`` (or to its end); abandoned streams are not
+    recorded.
+    """
+
+    def __init__(self, response, on_complete):
+        self._response = response
+        self._on_complete = on_complete
+        self._lines: List[str] = []
+        self._recorded = False
+        self.status_code = response.status_code
+
+    def iter_lines(self, decode_unicode: bool = False, **kwargs) -> Iterator:
+        for line in self._response.iter_lines(decode_unicode=decode_unicode, **kwargs):
+            text = line.decode("utf-8") if isinstance(line, bytes) else line
+            self._lines.append(text)
+            if text.strip() == "data: [DONE]":
+                self._complete()
+            yield line
+        self._complete()
+
+    def _complete(self):
+        if not self._recorded:
+            self._recorded = True
+            self._on_complete(self._lines)
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayingLLMClient(LLMClient):
+    """
+    ``LLMClient`` with a record/replay layer in front of the backend.
+
+    - ``record``: always call the backend and store every response.
+    - ``replay``: only serve stored responses; a request never seen before
+      fails with ``LLMClientError`` instead of reaching the network.
+    - ``auto``: serve stored responses and record the misses.
+
+    Re-analyzing a corpus with unchanged prompts then runs at disk speed,
+    and fully offline in ``replay`` mode.
+    """
+
+    def __init__(self, store: ReplayStore, mode: str = "auto", **client_options):
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Replay mode must be one of: {', '.join(REPLAY_MODES)}")
+        super().__init__(**client_options)
+        self.store = store
+        self.mode = mode
+
+    def post_json(self, url: str, headers: Dict, payload: Dict, max_attempts: Optional[int] = None) -> Dict:
+        key = request_key(url, payload)
+        recorded = self._lookup(key, stream=False)
+        if recorded is not None:
+            return recorded
+        result = super().post_json(url, headers, payload, max_attempts=max_attempts)
+        self.store.put(key, url, False, result)
+        return result
+
+    def open_stream(self, url: str, headers: Dict, payload: Dict, max_attempts: Optional[int] = None):
+        key = request_key(url, payload)
+        recorded = self._lookup(key, stream=True)
+        if recorded is not None:
+            return ReplayedStream(recorded)
+        response = super().open_stream(url, headers, payload, max_attempts=max_attempts)
+        return RecordingStream(response, lambda lines: self.store.put(key, url, True, lines))
+
+    def _lookup(self, key: str, stream: bool):
+        recorded = self.store.get(key, stream) if self.mode != "record" else None
+        if recorded is None and self.mode == "replay":
+            logging.error(f"  [Error] No recorded LLM response for request {key[:12]}")
+            raise LLMClientError(f"No recorded LLM response for request {key[:12]} (replay mode)")
+        return recorded
@@ -0,0 +1,229 @@
+"""
+Local stand-in for the DeepSeek chat completions API.
+
+Usage: python llm_stub.py [--port 8001] [--latency 2.0] [--jitter 0.5] [--error-rate 0.05] [--rate-limit-rate 0.02]
+
+Then point the app at it, e.g.
+``LLM_API_URL=http://127.0.0.1:8001/chat/completions python app.py serve``
+(any API key starting with ``sk-`` is accepted).
+
+Analysis prompts get a schema-valid analysis derived deterministically
+from the submitted text; other prompts (the weekly report) get markdown.
+Streaming requests are answered as Server-Sent Events like the real API.
+``--error-rate`` answers that fraction of requests with a 500/503 and
+``--rate-limit-rate`` with a 429, to exercise retries and the circuit breaker.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+FIGURE_PATTERN = re.compile(r"(?:Fig(?:ure)?\.?|图)\s*(\d+)", re.IGNORECASE)
+SENTENCE_PATTERN = re.compile(r"[^。！？.!?\n]{20,200}[。！？.!?]")
+
+
+def _sentences(text: str, rng: random.Random, count: int) -> List[str]:
+    candidates = SENTENCE_PATTERN.findall(text) or [text[:120] or "无"]
+    return [candidates[rng.randrange(len(candidates))].strip() for _ in range(count)]
+
+
+def stub_analysis(text: str) -> Dict:
+    """
+    An analysis in the ``json_prompt_template`` schema built from ``text``;
+    the same text always yields the same analysis.
+    """
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).hexdigest())
+    lines = [line.strip() for line in text.splitlines() if len(line.strip()) > 10]
+    figures = sorted({int(number) for number in FIGURE_PATTERN.findall(text)})[:5]
+    return {
+        "文献信息": {
+            "标题": (lines[0] if lines else "Untitled")[:150],
+            "作者": [f"Stub Author {rng.randint(1, 999)}" for _ in range(rng.randint(1, 5))],
+            "期刊": "Stub Journal of Testing",
+            "年份": str(rng.randint(2015, 2025)),
+        },
+        "内容提取": {
+            "摘要": " ".join(_sentences(text, rng, 2)),
+            "关键图表": [
+                {"图序号": f"图{number}", "图表类型": "曲线图", "核心内容": sentence, "支撑结论": sentence}
+                for number, sentence in zip(figures, _sentences(text, rng, len(figures)))
+            ],
+            "实验": [f"实验方法：{s}" for s in _sentences(text, rng, 2)],
+            "结论": _sentences(text, rng, 3),
+            "创新点": _sentences(text, rng, 2),
+            "不足": _sentences(text, rng, 2),
+        },
+    }
+
+
+def stub_answer(payload: Dict) -> str:
+    messages = payload.get("messages") or [{}]
+    system = messages[0].get("content") or ""
+    user = messages[-1].get("content") or ""
+    if "JSON" in system:
+        # The document text follows the instruction line in the user message.
+        text = user.split("\n\n", 1)[-1]
+        return "```json\n" + json.dumps(stub_analysis(text), ensure_ascii=False, indent=2) + "\n```"
+    titles = re.findall(r"^\[\d+\] (.+)$", user, flags=re.MULTILINE)
+    items = "\n".join(f"- {title}" for title in titles) or "- （无）"
+    return (
+        "# 本周研究进展汇报\n\n## 1. 本周研究进展概述\n本周阅读了以下文献。\n\n"
+        f"## 2. 文献阅读与理解\n{items}\n\n## 3. 主要工作完成情况\n按计划推进。\n\n"
+        "## 4. 存在的问题与挑战\n暂无。\n\n## 5. 下周计划与展望\n继续阅读相关文献。\n"
+    )
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    rate_limit_rate = 0.0
+    stream_delay = 0.01
+    rng = random.Random()
+    rng_lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": "Not found"}})
+        if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+            return self._send_json(401, {"error": {"message": "Authentication Fails"}})
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._send_json(400, {"error": {"message": "Invalid JSON"}})
+
+        with self.rng_lock:
+            roll = self.rng.random()
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if roll < self.error_rate:
+            return self._send_json(self.rng.choice([500, 503]), {"error": {"message": "Injected server error"}})
+        if roll < self.error_rate + self.rate_limit_rate:
+            return self._send_json(429, {"error": {"message": "Injected rate limit"}}, {"Retry-After": "1"})
+
+        answer = stub_answer(payload)
+        prompt_chars = sum(len(message.get("content") or "") for message in payload.get("messages") or [])
+        usage = {
+            "prompt_tokens": prompt_chars // 3,
+            "completion_tokens": len(answer) // 3,
+            "total_tokens": prompt_chars // 3 + len(answer) // 3,
+        }
+        if payload.get("stream"):
+            return self._send_stream(answer, usage)
+        self._send_json(200, {
+            "id": f"stub-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def _send_json(self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, answer: str, usage: Dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        pieces = [answer[i:i + 40] for i in range(0, len(answer), 40)]
+        for piece in pieces:
+            event = {"choices": [{"index": 0, "delta": {"content": piece}}]}
+            self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.stream_delay)
+        self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        logging.debug(f"stub: {format % args}")
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = 8001,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    stream_delay: float = 0.01,
+    seed: Optional[int] = None,
+) -> ThreadingHTTPServer:
+    """
+    Build (but do not start) a stub server; ``port=0`` picks a free port.
+    """
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "latency": latency,
+        "jitter": jitter,
+        "error_rate": error_rate,
+        "rate_limit_rate": rate_limit_rate,
+        "stream_delay": stream_delay,
+        "rng": random.Random(seed),
+        "rng_lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(**options) -> ThreadingHTTPServer:
+    """
+    Start a stub server in a daemon thread; its URL is ``completions_url(server)``.
+    Stop it with ``server.shutdown()``.
+    """
+    server = make_server(**{"port": 0, **options})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def completions_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/chat/completions"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500/503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--stream-delay", type=float, default=0.01, help="Seconds between streamed chunks")
+    parser.add_argument("--seed", type=int, help="Seed for latency and error injection")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    server = make_server(
+        args.host, args.port, args.latency, args.jitter, args.error_rate,
+        args.rate_limit_rate, args.stream_delay, args.seed,
+    )
+    logging.info(f"LLM stub listening on {completions_url(server)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,239 @@
+"""
+In-process counters and histograms rendered in the Prometheus text format.
+
+Metrics are module-level objects that the code under measurement updates
+directly; ``render()`` produces the ``/metrics`` response. Values are per
+process: under gunicorn every worker keeps its own, so scrape each worker
+(or run a single worker with threads) for complete figures.
+
+With ``configure(timing_log=True)`` every histogram observation is also
+written to the ``timing`` logger as one JSON object per line.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus' default buckets, for request handling and storage operations.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# For LLM calls and ingest stages, which take seconds to minutes.
+SLOW_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+_timing_log = False
+_timing_logger = logging.getLogger("timing")
+
+
+# Every metric registers itself here on creation, in definition order.
+REGISTRY: List["_Metric"] = []
+
+
+def configure(timing_log: bool = False):
+    global _timing_log
+    _timing_log = timing_log
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram of durations in seconds.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket], sum.
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, seconds: float, **labels):
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + seconds)
+        if _timing_log:
+            _timing_logger.info(json.dumps(
+                {"metric": self.name, **{k: str(v) for k, v in labels.items()}, "seconds": round(seconds, 6)},
+                ensure_ascii=False,
+            ))
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Observe the duration of the ``with`` block, also when it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def total(self, **labels) -> float:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return entry[1] if entry else 0.0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_labels(pairs + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# ---------------------------------------------------------------------- #
+# Application metrics
+# ---------------------------------------------------------------------- #
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "literature_http_request_duration_seconds",
+    "Time to produce a response, by route template, method and status.",
+    ("route", "method", "status"),
+)
+
+INGEST_STAGE_SECONDS = Histogram(
+    "literature_ingest_stage_seconds",
+    "Time spent per ingest pipeline stage: text_extraction, image_extraction, llm_analysis, save.",
+    ("stage",),
+    buckets=SLOW_BUCKETS,
+)
+INGEST_TOTAL = Counter(
+    "literature_ingest_total",
+    "Finished ingestions by outcome (completed, duplicate, failed).",
+    ("outcome",),
+)
+ANALYSIS_CACHE_TOTAL = Counter(
+    "literature_analysis_cache_total",
+    "Analysis cache lookups during ingestion by result (hit, miss).",
+    ("result",),
+)
+
+LLM_REQUEST_SECONDS = Histogram(
+    "literature_llm_request_duration_seconds",
+    "Time until the LLM backend answered (response headers for streams), per attempt.",
+    ("outcome",),
+    buckets=SLOW_BUCKETS,
+)
+LLM_REQUESTS_TOTAL = Counter(
+    "literature_llm_requests_total",
+    "LLM HTTP attempts by outcome (ok, http_<status>, connection_error, request_error, circuit_open).",
+    ("outcome",),
+)
+LLM_RETRIES_TOTAL = Counter(
+    "literature_llm_retries_total",
+    "LLM attempts that were retried after a retryable failure.",
+)
+LLM_TOKENS_TOTAL = Counter(
+    "literature_llm_tokens_total",
+    "Tokens reported by the LLM backend, by call mode and kind (prompt, completion).",
+    ("mode", "kind"),
+)
+
+REPOSITORY_SCAN_SECONDS = Histogram(
+    "literature_repository_scan_seconds",
+    "Duration of repository operations that scan many records, by operation.",
+    ("operation",),
+)
+REPOSITORY_SCAN_ROWS_TOTAL = Counter(
+    "literature_repository_scan_rows_total",
+    "Records returned or visited by repository scans, by operation.",
+    ("operation",),
+)
+
+
+def observe_tokens(usage: Optional[Dict], mode: str):
+    for kind in ("prompt", "completion"):
+        tokens = int((usage or {}).get(f"{kind}_tokens") or 0)
+        if tokens:
+            LLM_TOKENS_TOTAL.inc(tokens, mode=mode, kind=kind)
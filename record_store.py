@@ -0,0 +1,356 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from atomic_io import write_json_atomic
+
+# (sort time, modification time, size) of a stored record, as kept by the catalog.
+StatSignature = Tuple[float, float, int]
+
+
+class RecordStore(ABC):
+    """
+    Storage backend for paper records and their files.
+
+    A record is the parsed analysis dict of a paper. Its files (original
+    PDF, figures, derivatives) always live in a per-paper directory given by
+    ``paper_dir``. The repository serializes writes to one paper with its
+    own locks; a store only has to make each ``write`` atomic.
+    """
+
+    @abstractmethod
+    def list_ids(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def paper_dir(self, paper_id: str) -> str:
+        ...
+
+    @abstractmethod
+    def read(self, paper_id: str) -> Dict:
+        """
+        Return the record; raises FileNotFoundError if there is none.
+        """
+
+    @abstractmethod
+    def write(self, paper_id: str, data: Dict):
+        ...
+
+    @abstractmethod
+    def delete(self, paper_id: str):
+        """
+        Remove the record together with its files directory.
+        """
+
+    @abstractmethod
+    def signature(self, paper_id: str) -> StatSignature:
+        ...
+
+    @abstractmethod
+    def signatures(self) -> Dict[str, Tuple[float, int]]:
+        """
+        ``{paper_id: (modification time, size)}`` for every record, cheaply.
+        """
+
+    @abstractmethod
+    def version_token(self, paper_id: str) -> Optional[str]:
+        """
+        Opaque token that changes whenever the record is written.
+        """
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict, StatSignature]]:
+        """
+        Yield ``(paper_id, record, signature)`` for every readable record.
+        """
+        for paper_id in self.list_ids():
+            try:
+                yield paper_id, self.read(paper_id), self.signature(paper_id)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logging.warning(f"Failed to read record {paper_id}: {e}")
+
+
+class FolderRecordStore(RecordStore):
+    """
+    The original layout: ``<root>/<paper_id>/analysis.json`` next to the
+    paper's files. Entries starting with an underscore are reserved for
+    shared stores (``_blobs``, ``_locks``, ``_files``).
+    """
+
+    ANALYSIS_FILE = "analysis.json"
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def list_ids(self) -> List[str]:
+        if not os.path.exists(self.root_dir):
+            return []
+        return [
+            entry for entry in os.listdir(self.root_dir)
+            if not entry.startswith("_") and os.path.isdir(self.paper_dir(entry))
+        ]
+
+    def paper_dir(self, paper_id: str) -> str:
+        return os.path.join(self.root_dir, paper_id)
+
+    def analysis_path(self, paper_id: str) -> str:
+        return os.path.join(self.paper_dir(paper_id), self.ANALYSIS_FILE)
+
+    def read(self, paper_id: str) -> Dict:
+        with open(self.analysis_path(paper_id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def write(self, paper_id: str, data: Dict):
+        paper_dir = self.paper_dir(paper_id)
+        os.makedirs(paper_dir, exist_ok=True)
+        # The folder mtime orders the list by when the paper was added.
+        write_json_atomic(self.analysis_path(paper_id), data, keep_dir_mtime=True)
+
+    def delete(self, paper_id: str):
+        paper_dir = self.paper_dir(paper_id)
+        if not os.path.exists(paper_dir):
+            logging.warning(f"Attempted to delete non-existent directory: {paper_dir}")
+            return
+        try:
+            shutil.rmtree(paper_dir)
+        except Exception as e:
+            logging.error(f"Failed to delete directory {paper_dir}: {e}")
+            raise
+
+    def signature(self, paper_id: str) -> StatSignature:
+        file_stat = os.stat(self.analysis_path(paper_id))
+        dir_mtime = os.path.getmtime(self.paper_dir(paper_id))
+        return dir_mtime, file_stat.st_mtime, file_stat.st_size
+
+    def signatures(self) -> Dict[str, Tuple[float, int]]:
+        signatures = {}
+        for paper_id in self.list_ids():
+            try:
+                file_stat = os.stat(self.analysis_path(paper_id))
+            except OSError:
+                continue
+            signatures[paper_id] = (file_stat.st_mtime, file_stat.st_size)
+        return signatures
+
+    def version_token(self, paper_id: str) -> Optional[str]:
+        try:
+            file_stat = os.stat(self.analysis_path(paper_id))
+        except FileNotFoundError:
+            return None
+        return f"{file_stat.st_ino:x}-{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}"
+
+
+class SQLiteRecordStore(RecordStore):
+    """
+    Records as JSON rows in ``records.sqlite3``; PDFs and figures in
+    ``<root>/_files/<paper_id>/``.
+
+    Listing ids, reading every record and checking signatures are single
+    queries instead of one directory entry and file open per paper.
+    """
+
+    DB_FILE = "records.sqlite3"
+    FILES_DIR = "_files"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS records (
+        paper_id TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        updated_ns INTEGER NOT NULL
+    );
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.db_path = os.path.join(root_dir, self.DB_FILE)
+        self.files_dir = os.path.join(root_dir, self.FILES_DIR)
+        os.makedirs(self.files_dir, exist_ok=True)
+        self._setup()
+
+    def _setup(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def list_ids(self) -> List[str]:
+        with self._connect() as conn:
+            return [row["paper_id"] for row in conn.execute("SELECT paper_id FROM records")]
+
+    def paper_dir(self, paper_id: str) -> str:
+        return os.path.join(self.files_dir, paper_id)
+
+    def read(self, paper_id: str) -> Dict:
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM records WHERE paper_id = ?", (paper_id,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Record {paper_id} not found")
+        return json.loads(row["data"])
+
+    def write(self, paper_id: str, data: Dict):
+        self.write_many([(paper_id, data, None, None)])
+
+    def write_many(self, rows: List[Tuple[str, Dict, Optional[float], Optional[int]]]):
+        """
+        Upsert ``(paper_id, record, created_at, updated_ns)`` rows in one
+        transaction; None times mean now.
+        """
+        now_ns = time.time_ns()
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO records (paper_id, data, size, created_at, updated_ns)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(paper_id) DO UPDATE SET
+                    data = excluded.data, size = excluded.size, updated_ns = excluded.updated_ns
+                """,
+                [
+                    self._row(paper_id, data, created_at, updated_ns or now_ns)
+                    for paper_id, data, created_at, updated_ns in rows
+                ],
+            )
+
+    def _row(self, paper_id: str, data: Dict, created_at: Optional[float], updated_ns: int):
+        text = json.dumps(data, ensure_ascii=False)
+        created_at = created_at if created_at is not None else updated_ns / 1e9
+        return paper_id, text, len(text.encode("utf-8")), created_at, updated_ns
+
+    def delete(self, paper_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM records WHERE paper_id = ?", (paper_id,))
+        paper_dir = self.paper_dir(paper_id)
+        if os.path.exists(paper_dir):
+            shutil.rmtree(paper_dir)
+
+    def signature(self, paper_id: str) -> StatSignature:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT created_at, updated_ns, size FROM records WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Record {paper_id} not found")
+        return row["created_at"], row["updated_ns"] / 1e9, row["size"]
+
+    def signatures(self) -> Dict[str, Tuple[float, int]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT paper_id, updated_ns, size FROM records").fetchall()
+        return {row["paper_id"]: (row["updated_ns"] / 1e9, row["size"]) for row in rows}
+
+    def version_token(self, paper_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT updated_ns, size FROM records WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return f"{row['updated_ns']:x}-{row['size']:x}"
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict, StatSignature]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM records").fetchall()
+        for row in rows:
+            try:
+                data = json.loads(row["data"])
+            except ValueError as e:
+                logging.warning(f"Failed to parse record {row['paper_id']}: {e}")
+                continue
+            yield row["paper_id"], data, (row["created_at"], row["updated_ns"] / 1e9, row["size"])
+
+
+STORES = {"folder": FolderRecordStore, "sqlite": SQLiteRecordStore}
+
+
+def open_record_store(root_dir: str, backend: Optional[str] = None) -> RecordStore:
+    """
+    Open the named backend; by default SQLite once a migration created its
+    database, the folder layout otherwise.
+    """
+    if backend is None:
+        backend = "sqlite" if os.path.exists(os.path.join(root_dir, SQLiteRecordStore.DB_FILE)) else "folder"
+    if backend not in STORES:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    return STORES[backend](root_dir)
+
+
+def migrate_folders_to_sqlite(root_dir: str) -> Dict[str, int]:
+    """
+    Import every ``<root>/<paper_id>/analysis.json`` into the SQLite store
+    and move the paper's files under ``_files``.
+
+    Records are imported in one transaction before any folder moves, and a
+    folder is only moved once its row exists, so an interrupted migration
+    can simply be re-run. Run it with the server stopped.
+    """
+    folders = FolderRecordStore(root_dir)
+    target = SQLiteRecordStore(root_dir)
+
+    rows, failed = [], 0
+    for paper_id in folders.list_ids():
+        try:
+            data = folders.read(paper_id)
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            logging.warning(f"Skipping {paper_id}: {e}")
+            failed += 1
+            continue
+        created_at = os.path.getmtime(folders.paper_dir(paper_id))
+        updated_ns = os.stat(folders.analysis_path(paper_id)).st_mtime_ns
+        rows.append((paper_id, data, created_at, updated_ns))
+    target.write_many(rows)
+
+    for paper_id, _, _, _ in rows:
+        source = folders.paper_dir(paper_id)
+        destination = target.paper_dir(paper_id)
+        if os.path.exists(destination):
+            shutil.rmtree(destination)
+        # A rename keeps inodes, so figures hard-linked into the blob store stay shared.
+        os.replace(source, destination)
+        os.remove(os.path.join(destination, folders.ANALYSIS_FILE))
+
+    logging.info(f"Migrated {len(rows)} records to {target.db_path}")
+    return {"migrated": len(rows), "failed": failed}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point: ``python record_store.py migrate``.
+    """
+    parser = argparse.ArgumentParser(description="Migrate paper folders into the SQLite record store.")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--db", default="literature_db", help="Path to the literature database folder")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    report = migrate_folders_to_sqlite(args.db)
+
+    from db_manager import LiteratureRepository
+
+    # Record signatures changed with the backend; re-derive the catalog from the new store.
+    repository = LiteratureRepository(args.db, storage="sqlite")
+    repository.rebuild_catalog()
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,21 +1,108 @@
+import json
 import logging
 import os
+from typing import Any, Dict
 
-from flask import Blueprint, jsonify, request, send_from_directory
+from flask import Blueprint, Response, jsonify, request, send_from_directory, stream_with_context
 
 from services.literature_service import LiteratureService, LiteratureServiceError
 from db_manager import LiteratureRepository
 from analysis_core import AnalysisService
+from llm_client import LLMClient
+from llm_replay import ReplayingLLMClient, ReplayStore
+from analysis_cache import AnalysisCache
+from image_derivatives import ImageDerivatives
+from services.job_queue import JobQueue
+from services.bulk_ingest import BulkIngestor
 
 literature_bp = Blueprint("literature", __name__)
 
-# Dependency Injection Wiring
-repository = LiteratureRepository()
-analyzer = AnalysisService()
-service = LiteratureService(analyzer=analyzer, repository=repository)
+# Dependency Injection Wiring: populated by ``init_services`` from settings.
+repository: LiteratureRepository = None
+analyzer: AnalysisService = None
+jobs: JobQueue = None
+analysis_cache: AnalysisCache = None
+service: LiteratureService = None
+bulk_ingestor: BulkIngestor = None
+
+
+def init_services(settings: Dict[str, Any]):
+    """
+    Build the repository, queues and services behind the blueprint.
+    """
+    global repository, analyzer, jobs, analysis_cache, service, bulk_ingestor, PDF_MAX_AGE
+
+    repository = LiteratureRepository(
+        settings["LITERATURE_DB"],
+        storage=settings["STORAGE_BACKEND"] or None,
+        record_cache_size=settings["RECORD_CACHE_SIZE"],
+    )
+    analyzer = AnalysisService(
+        llm_client=_build_llm_client(settings, repository.db_base_path),
+        figure_mode=settings["FIGURE_MODE"],
+        figure_dpi=settings["FIGURE_DPI"],
+        api_url=settings["LLM_API_URL"],
+        model=settings["LLM_MODEL"],
+    )
+    jobs = JobQueue(
+        os.path.join(repository.db_base_path, "jobs.sqlite3"),
+        max_workers=settings["INGEST_WORKERS"],
+        max_pending=settings["INGEST_MAX_PENDING"],
+    )
+    analysis_cache = AnalysisCache(
+        os.path.join(repository.db_base_path, "analysis_cache.sqlite3"),
+        fingerprint=analyzer.analysis_fingerprint(),
+    )
+    report_cache = AnalysisCache(
+        os.path.join(repository.db_base_path, "report_cache.sqlite3"),
+        fingerprint=analyzer.report_fingerprint(),
+    )
+    service = LiteratureService(
+        analyzer=analyzer,
+        repository=repository,
+        jobs=jobs,
+        analysis_cache=analysis_cache,
+        image_derivatives=ImageDerivatives(quality=settings["IMAGE_DERIVATIVE_QUALITY"]),
+        report_cache=report_cache,
+    )
+    bulk_ingestor = BulkIngestor(
+        service,
+        jobs,
+        extract_workers=settings["BULK_EXTRACT_WORKERS"] or None,
+        llm_concurrency=settings["LLM_CONCURRENCY"],
+        llm_rate_per_minute=settings["LLM_RATE_PER_MINUTE"],
+    )
+    PDF_MAX_AGE = settings["PDF_CACHE_MAX_AGE"]
+
+
+def _build_llm_client(settings: Dict[str, Any], db_path: str) -> LLMClient:
+    mode = settings["LLM_REPLAY_MODE"]
+    if not mode:
+        return LLMClient(pool_size=settings["LLM_POOL_SIZE"])
+    store = ReplayStore(settings["LLM_REPLAY_DB"] or os.path.join(db_path, "llm_replay.sqlite3"))
+    logger.info("LLM replay store %s in %s mode (%d responses)", store.db_path, mode, store.count())
+    return ReplayingLLMClient(store, mode, pool_size=settings["LLM_POOL_SIZE"])
+
+
+def shutdown_services(drain_timeout: float):
+    """
+    Stop accepting jobs, let running ingestions finish for up to
+    ``drain_timeout`` seconds and release worker pools.
+    """
+    if jobs is not None:
+        jobs.drain(drain_timeout)
+    if analyzer is not None:
+        analyzer.close()
+
 
 logger = logging.getLogger(__name__)
 
+# JSON views may change at any time: cache, but revalidate with the ETag.
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Figure files are written once at ingestion and never modified in place.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PDF_MAX_AGE = 86400
+
 
 def _execute(operation, default_status=200):
     try:
@@ -32,14 +119,81 @@ def _execute(operation, default_status=200):
         return jsonify({"error": "Internal Server Error"}), 500
 
 
+def _execute_conditional(compute_etag, operation, cache_control=REVALIDATE_CACHE_CONTROL):
+    """
+    Like ``_execute`` but answers ``If-None-Match`` with 304 before doing
+    the (more expensive) work of building the payload.
+    """
+    try:
+        etag = compute_etag()
+    except LiteratureServiceError as exc:
+        return jsonify({"error": str(exc)}), exc.status_code
+    except Exception:
+        logger.exception("Unexpected error")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response, status_code = _execute(operation)
+        if status_code != 200:
+            return response, status_code
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
 @literature_bp.route("/api/literature", methods=["GET"])
 def list_literature():
-    return _execute(lambda: service.list_literature())
+    return _execute_conditional(
+        lambda: service.list_etag(request.args),
+        lambda: service.list_literature(request.args),
+    )
+
+
+@literature_bp.route("/api/search", methods=["GET"])
+def search_literature():
+    query = request.args.get("q")
+    page = request.args.get("page")
+    page_size = request.args.get("page_size")
+    return _execute(lambda: service.search_literature(query, page, page_size))
+
+
+@literature_bp.route("/api/literature/batch", methods=["POST"])
+def get_literature_batch():
+    payload = request.get_json(silent=True) or {}
+    return _execute(lambda: service.get_literature_batch(payload.get("ids"), payload.get("fields")))
+
+
+@literature_bp.route("/api/literature/groups", methods=["POST"])
+def group_literature():
+    payload = request.get_json(silent=True) or {}
+    return _execute(lambda: service.group_literature(payload.get("ids"), payload.get("threshold")))
+
+
+@literature_bp.route("/api/reports/weekly", methods=["POST"])
+def generate_weekly_report():
+    payload = request.get_json(silent=True) or {}
+    return _execute(
+        lambda: service.submit_weekly_report(
+            payload.get("ids"),
+            payload.get("additional_work"),
+            service.parse_api_key(request.headers.get("Authorization")),
+        )
+    )
 
 
 @literature_bp.route("/api/literature/<paper_id>", methods=["GET"])
 def get_literature(paper_id):
-    return _execute(lambda: service.get_literature(paper_id))
+    return _execute_conditional(
+        lambda: service.literature_etag(paper_id),
+        lambda: service.get_literature(paper_id),
+    )
+
+
+@literature_bp.route("/api/literature/<paper_id>/related", methods=["GET"])
+def related_literature(paper_id):
+    return _execute(lambda: service.related_literature(paper_id, request.args.get("limit")))
 
 
 @literature_bp.route("/api/literature/<paper_id>", methods=["DELETE"])
@@ -51,18 +205,60 @@ def delete_literature(paper_id):
 def upload_literature():
     api_key = service.parse_api_key(request.headers.get("Authorization"))
     file = request.files.get("file")
-    return _execute(lambda: (service.process_upload(file, api_key), 201))
+    return _execute(lambda: (service.submit_upload(file, api_key), 202))
+
+
+@literature_bp.route("/api/upload/stream", methods=["POST"])
+def upload_literature_stream():
+    """
+    Ingest one PDF and stream progress plus LLM tokens as Server-Sent Events.
+    """
+    try:
+        api_key = service.parse_api_key(request.headers.get("Authorization"))
+        events = service.stream_upload(request.files.get("file"), api_key)
+    except LiteratureServiceError as exc:
+        return jsonify({"error": str(exc)}), exc.status_code
+
+    def _format_events():
+        for event in events:
+            payload = json.dumps(event["data"], ensure_ascii=False)
+            yield f"event: {event['event']}\ndata: {payload}\n\n"
+
+    return Response(
+        stream_with_context(_format_events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@literature_bp.route("/api/upload/batch", methods=["POST"])
+def upload_literature_batch():
+    api_key = service.parse_api_key(request.headers.get("Authorization"))
+    files = request.files.getlist("files")
+    return _execute(lambda: (bulk_ingestor.submit(files, api_key), 202))
+
+
+@literature_bp.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    return _execute(lambda: service.get_job(job_id))
 
 
 @literature_bp.route("/api/literature/<paper_id>/tags", methods=["POST"])
 def add_tag(paper_id):
     tag = request.json.get("tag")
-    return _execute(lambda: service.add_tag(paper_id, tag))
+    if_match = request.headers.get("If-Match")
+    return _execute(lambda: service.add_tag(paper_id, tag, if_match))
 
 
 @literature_bp.route("/api/literature/<paper_id>/tags/<tag>", methods=["DELETE"])
 def remove_tag(paper_id, tag):
-    return _execute(lambda: service.remove_tag(paper_id, tag))
+    if_match = request.headers.get("If-Match")
+    return _execute(lambda: service.remove_tag(paper_id, tag, if_match))
+
+
+@literature_bp.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return _execute(lambda: service.cache_stats())
 
 
 @literature_bp.route("/api/tags", methods=["GET"])
@@ -96,20 +292,25 @@ def get_image_metadata(paper_id):
 @literature_bp.route("/api/literature/<paper_id>/images/metadata", methods=["PUT"])
 def update_image_metadata(paper_id):
     payload = request.json.get("metadata")
-    return _execute(lambda: {"metadata": service.update_image_metadata(paper_id, payload)})
+    if_match = request.headers.get("If-Match")
+    return _execute(lambda: {"metadata": service.update_image_metadata(paper_id, payload, if_match)})
 
 
 @literature_bp.route("/api/literature/<paper_id>/reading_time", methods=["POST"])
 def update_reading_time(paper_id):
     reading_time = request.json.get("reading_time")
-    return _execute(lambda: service.update_reading_time(paper_id, reading_time))
+    if_match = request.headers.get("If-Match")
+    return _execute(lambda: service.update_reading_time(paper_id, reading_time, if_match))
 
 
 @literature_bp.route("/api/literature/<paper_id>/images/<filename>", methods=["GET"])
 def serve_image(paper_id, filename):
     try:
-        directory, safe_filename = service.resolve_image_request(paper_id, filename)
-        return send_from_directory(directory, safe_filename)
+        directory, safe_filename = service.resolve_image_request(paper_id, filename, request.args.get("size"))
+        etag = service.image_etag(paper_id, filename, os.path.join(directory, safe_filename))
+        response = send_from_directory(directory, safe_filename, conditional=True, etag=etag)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
     except LiteratureServiceError as exc:
         return jsonify({"error": str(exc)}), exc.status_code
     except Exception as exc:
@@ -123,7 +324,15 @@ def serve_pdf(paper_id):
         pdf_path = service.get_pdf_path(paper_id)
         directory = os.path.dirname(pdf_path)
         filename = os.path.basename(pdf_path)
-        return send_from_directory(directory, filename)
+        # conditional=True handles If-None-Match and Range (206) requests,
+        # so the PDF viewer can fetch pages incrementally.
+        return send_from_directory(
+            directory,
+            filename,
+            conditional=True,
+            etag=service.pdf_etag(paper_id) or True,
+            max_age=PDF_MAX_AGE,
+        )
     except LiteratureServiceError as exc:
         return jsonify({"error": str(exc)}), exc.status_code
     except Exception as exc:
@@ -133,4 +342,5 @@ def serve_pdf(paper_id):
 @literature_bp.route("/api/literature/<paper_id>/metadata", methods=["PUT"])
 def update_basic_metadata(paper_id):
     metadata = request.json
-    return _execute(lambda: service.update_basic_metadata(paper_id, metadata))
+    if_match = request.headers.get("If-Match")
+    return _execute(lambda: service.update_basic_metadata(paper_id, metadata, if_match))
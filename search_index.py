@@ -0,0 +1,322 @@
+import argparse
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Kana, CJK ideographs (incl. extension A and compatibility) and Hangul.
+CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+TOKEN_RE = re.compile(rf"[{CJK_CHARS}]+|[^\W_{CJK_CHARS}]+")
+CJK_RUN_RE = re.compile(rf"^[{CJK_CHARS}]+$")
+
+# Column order of the FTS table and its bm25 weights.
+FIELDS = ("title", "authors", "abstract", "conclusions", "innovations", "full_text")
+FIELD_WEIGHTS = (10.0, 4.0, 5.0, 3.0, 3.0, 1.0)
+SNIPPET_FIELDS = ("abstract", "conclusions", "innovations", "full_text", "title")
+
+
+def _tokens(text: str) -> List[str]:
+    """
+    Split text into index tokens.
+
+    Latin/digit runs become lowercase words. CJK runs have no word
+    boundaries, so they are indexed as overlapping character bigrams (a
+    lone character stays a unigram); a query for any Chinese word of two or
+    more characters is then a phrase of consecutive bigrams.
+    """
+    tokens: List[str] = []
+    for run in TOKEN_RE.findall(text.lower()):
+        if CJK_RUN_RE.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def tokenize(text: str) -> str:
+    return " ".join(_tokens(text or ""))
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Translate free text into an FTS5 MATCH expression.
+
+    Whitespace-separated terms are ANDed; each term is a phrase of its
+    tokens and the last token is prefix-matched, so ``graph`` finds
+    ``graphene`` and ``神`` finds ``神经``.
+    """
+    phrases = []
+    for term in query.split():
+        tokens = _tokens(term)
+        if not tokens:
+            continue
+        quoted = [f'"{token}"' for token in tokens]
+        quoted[-1] += "*"
+        phrases.append(" + ".join(quoted))
+    return " AND ".join(phrases) if phrases else None
+
+
+def _join(value) -> str:
+    if isinstance(value, list):
+        return "\n".join(str(item) for item in value if item)
+    return str(value or "")
+
+
+class SearchIndex:
+    """
+    Full-text index over paper analyses and extracted PDF text (SQLite FTS5).
+
+    ``search_fts`` holds the tokenized columns used for matching and bm25
+    ranking; ``search_docs`` keeps the raw fields for result snippets, with
+    the full text zlib-compressed. A digest of the indexed fields lets
+    metadata-only writes (tags, reading time) skip re-tokenizing.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS search_docs (
+        id INTEGER PRIMARY KEY,
+        paper_id TEXT NOT NULL UNIQUE,
+        title TEXT NOT NULL DEFAULT '',
+        abstract TEXT NOT NULL DEFAULT '',
+        conclusions TEXT NOT NULL DEFAULT '',
+        innovations TEXT NOT NULL DEFAULT '',
+        full_text BLOB,
+        digest TEXT NOT NULL DEFAULT ''
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        title, authors, abstract, conclusions, innovations, full_text,
+        tokenize = 'unicode61 remove_diacritics 2'
+    );
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._setup()
+
+    def _setup(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------ #
+    # Writes
+    # ------------------------------------------------------------------ #
+
+    def upsert(self, paper_id: str, record: Dict, full_text: Optional[str] = None):
+        self.upsert_many([(paper_id, record, full_text)])
+
+    def upsert_many(self, items: Iterable[Tuple[str, Dict, Optional[str]]]):
+        """
+        Index ``(paper_id, record, full_text)`` triples in one transaction.
+
+        A ``full_text`` of None keeps whatever text is already indexed.
+        """
+        with self._connect() as conn:
+            for paper_id, record, full_text in items:
+                self._upsert_unlocked(conn, paper_id, record, full_text)
+
+    def remove(self, paper_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT id FROM search_docs WHERE paper_id = ?", (paper_id,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM search_fts WHERE rowid = ?", (row["id"],))
+                conn.execute("DELETE FROM search_docs WHERE id = ?", (row["id"],))
+
+    def retain_only(self, paper_ids: Iterable[str]) -> int:
+        """
+        Drop every document whose paper is not in ``paper_ids``.
+        """
+        keep = set(paper_ids)
+        removed = [pid for pid in self.paper_ids() if pid not in keep]
+        for paper_id in removed:
+            self.remove(paper_id)
+        return len(removed)
+
+    def _upsert_unlocked(self, conn: sqlite3.Connection, paper_id: str, record: Dict, full_text: Optional[str]):
+        fields = self._extract_fields(record)
+        row = conn.execute(
+            "SELECT id, full_text, digest FROM search_docs WHERE paper_id = ?", (paper_id,)
+        ).fetchone()
+
+        if full_text is None:
+            if row and row["full_text"]:
+                full_text = zlib.decompress(row["full_text"]).decode("utf-8")
+            else:
+                full_text = ""
+        fields["full_text"] = full_text
+
+        digest = hashlib.sha256(json.dumps(fields, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+        if row and row["digest"] == digest:
+            return
+
+        compressed = zlib.compress(full_text.encode("utf-8")) if full_text else None
+        if row:
+            doc_id = row["id"]
+            conn.execute("DELETE FROM search_fts WHERE rowid = ?", (doc_id,))
+            conn.execute(
+                """
+                UPDATE search_docs SET title = ?, abstract = ?, conclusions = ?,
+                    innovations = ?, full_text = ?, digest = ?
+                WHERE id = ?
+                """,
+                (fields["title"], fields["abstract"], fields["conclusions"],
+                 fields["innovations"], compressed, digest, doc_id),
+            )
+        else:
+            doc_id = conn.execute(
+                """
+                INSERT INTO search_docs (paper_id, title, abstract, conclusions, innovations, full_text, digest)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (paper_id, fields["title"], fields["abstract"], fields["conclusions"],
+                 fields["innovations"], compressed, digest),
+            ).lastrowid
+
+        conn.execute(
+            f"INSERT INTO search_fts (rowid, {', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (doc_id, *(tokenize(fields[name]) for name in FIELDS)),
+        )
+
+    # ------------------------------------------------------------------ #
+    # Reads
+    # ------------------------------------------------------------------ #
+
+    def is_empty(self) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM search_docs LIMIT 1").fetchone()
+        return row is None
+
+    def paper_ids(self) -> List[str]:
+        with self._connect() as conn:
+            return [row["paper_id"] for row in conn.execute("SELECT paper_id FROM search_docs")]
+
+    def ids_without_text(self) -> List[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT paper_id FROM search_docs WHERE full_text IS NULL").fetchall()
+        return [row["paper_id"] for row in rows]
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[int, List[Dict]]:
+        """
+        Return ``(total, hits)`` ranked by weighted bm25; each hit carries
+        ``paper_id``, ``score`` (higher is better) and a ``snippet``.
+        """
+        match = build_match_query(query)
+        if not match:
+            return 0, []
+
+        weights = ", ".join(str(weight) for weight in FIELD_WEIGHTS)
+        with self._connect() as conn:
+            total = conn.execute(
+                "SELECT count(*) FROM search_fts WHERE search_fts MATCH ?", (match,)
+            ).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT d.*, bm25(search_fts, {weights}) AS rank
+                FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid
+                WHERE search_fts MATCH ?
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+                """,
+                (match, limit, offset),
+            ).fetchall()
+
+        terms = [term for term in query.lower().split() if _tokens(term)]
+        hits = []
+        for row in rows:
+            field, snippet = self._snippet(row, terms)
+            hits.append({
+                "paper_id": row["paper_id"],
+                "score": round(-row["rank"], 4),
+                "matched_field": field,
+                "snippet": snippet,
+            })
+        return total, hits
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+
+    def _extract_fields(self, record: Dict) -> Dict[str, str]:
+        meta = record.get("文献信息") or {}
+        content = record.get("内容提取") or {}
+        return {
+            "title": _join(meta.get("标题")),
+            "authors": _join(meta.get("作者")),
+            "abstract": _join(content.get("摘要")),
+            "conclusions": _join(content.get("结论")),
+            "innovations": _join(content.get("创新点")),
+        }
+
+    def _snippet(self, row: sqlite3.Row, terms: List[str], width: int = 60) -> Tuple[Optional[str], str]:
+        """
+        Cut a window around the first literal occurrence of a query term.
+        """
+        for field in SNIPPET_FIELDS:
+            value = row[field]
+            if field == "full_text":
+                value = zlib.decompress(value).decode("utf-8") if value else ""
+            lowered = value.lower()
+            positions = [lowered.find(term) for term in terms]
+            positions = [pos for pos in positions if pos >= 0]
+            if not positions:
+                continue
+            pos = min(positions)
+            start = max(0, pos - width)
+            end = min(len(value), pos + width * 2)
+            snippet = " ".join(value[start:end].split())
+            return field, ("…" if start else "") + snippet + ("…" if end < len(value) else "")
+        return None, " ".join((row["abstract"] or "")[:width * 2].split())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point: ``python search_index.py rebuild|query``.
+    """
+    from db_manager import LiteratureRepository
+
+    parser = argparse.ArgumentParser(description="Rebuild or query the full-text search index.")
+    parser.add_argument("command", choices=["rebuild", "query"])
+    parser.add_argument("text", nargs="?", default="", help="Query text for the query command")
+    parser.add_argument("--db", default="literature_db", help="Path to the literature database folder")
+    parser.add_argument(
+        "--extract-pdf-text",
+        action="store_true",
+        help="Re-extract full text from original.pdf for papers indexed without it",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    repository = LiteratureRepository(args.db)
+
+    if args.command == "query":
+        total, hits = repository.search_index.search(args.text, limit=20)
+        print(json.dumps({"total": total, "hits": hits}, ensure_ascii=False, indent=2))
+        return 0
+
+    extract_text = None
+    if args.extract_pdf_text:
+        from analysis_core import AnalysisService
+
+        analyzer = AnalysisService()
+        extract_text = lambda pdf_path: analyzer.extract_document(pdf_path)["text"]
+    count = repository.rebuild_search_index(extract_text=extract_text)
+    print(f"Search index rebuilt with {count} records")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
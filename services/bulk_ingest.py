@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from werkzeug.datastructures import FileStorage
+
+import metrics
+from services.job_queue import JobQueueFullError
+from services.literature_service import (
+    InvalidUploadError,
+    LiteratureServiceError,
+    ServiceUnavailableError,
+)
+
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from services.job_queue import JobQueue
+    from services.literature_service import LiteratureService
+
+
+def _extract_document_worker(
+    pdf_path: str, output_dir: str, figure_mode: str = "raster", figure_dpi: int = 150
+) -> Optional[Dict[str, Any]]:
+    """
+    Process-pool entry point; each worker builds its own AnalysisService.
+    Files are already spread across processes, so page sharding is off.
+    """
+    from analysis_core import AnalysisService
+
+    analyzer = AnalysisService(
+        sharded_text_min_pages=0,
+        figure_mode=figure_mode,
+        figure_dpi=figure_dpi,
+        figure_parallel_min_pages=0,
+    )
+    return analyzer.extract_document(pdf_path, output_dir)
+
+
+class RateLimiter:
+    """
+    Spaces calls so that at most ``rate_per_minute`` start in any minute.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class BulkIngestor:
+    """
+    Ingest many PDFs in one background job.
+
+    Single-pass PDF extraction runs in a process pool, while DeepSeek calls
+    fan out over a thread pool. Every LLM request, including each chunk of
+    a long paper, takes one of ``llm_concurrency`` slots and is paced by a
+    rate limiter. Files whose PDF digest is already in the library (or
+    earlier in the same batch) are reported as duplicates without analysis.
+    Every file gets its own result entry; one failure never aborts the rest
+    of the batch.
+    """
+
+    def __init__(
+        self,
+        service: LiteratureService,
+        jobs: JobQueue,
+        extract_workers: int | None = None,
+        llm_concurrency: int = 4,
+        llm_rate_per_minute: float = 60,
+        max_files: int = 200,
+    ):
+        self._log = logging.getLogger(self.__class__.__name__)
+        self.service = service
+        self.jobs = jobs
+        self.extract_workers = extract_workers or os.cpu_count() or 2
+        self.llm_concurrency = max(1, llm_concurrency)
+        self.rate_limiter = RateLimiter(llm_rate_per_minute)
+        # Papers fan out into chunk requests, so the cap is per request.
+        self.request_slots = threading.BoundedSemaphore(self.llm_concurrency)
+        self.max_files = max_files
+
+    def submit(self, file_storages: List[FileStorage], api_key: str) -> Dict[str, Any]:
+        if not file_storages:
+            raise InvalidUploadError("No files provided")
+        if len(file_storages) > self.max_files:
+            raise InvalidUploadError(f"一次最多导入 {self.max_files} 个文件")
+
+        items: List[Tuple[str, str]] = []
+        try:
+            for file_storage in file_storages:
+                items.append(self.service.spool_upload(file_storage))
+        except LiteratureServiceError:
+            self._cleanup(items)
+            raise
+
+        try:
+            return self.jobs.submit(
+                "bulk_upload",
+                f"{len(items)} files",
+                lambda report_stage: self.run(items, api_key, report_stage),
+                on_finish=lambda: self._cleanup(items),
+            )
+        except JobQueueFullError as exc:
+            self._cleanup(items)
+            raise ServiceUnavailableError(f"导入队列已满，请稍后重试 ({exc})")
+
+    def run(
+        self,
+        items: List[Tuple[str, str]],
+        api_key: str,
+        report_stage: Callable[..., None] | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Process ``(pdf_path, filename)`` pairs and return per-file results.
+        """
+        report_stage = report_stage or (lambda stage, progress=None: None)
+        results: List[Dict[str, Any]] = [
+            {"filename": filename, "status": "pending"} for _, filename in items
+        ]
+        total = len(items)
+        done = 0
+
+        def _fail(index: int, exc: Exception):
+            nonlocal done
+            message = str(exc) if isinstance(exc, LiteratureServiceError) else f"{exc.__class__.__name__}: {exc}"
+            results[index].update({"status": "failed", "error": message})
+            metrics.INGEST_TOTAL.inc(outcome="failed")
+            done += 1
+            self._log.warning("Bulk item %s failed: %s", results[index]["filename"], message)
+
+        digests: Dict[int, str] = {}
+        seen: Dict[str, int] = {}
+        for index, (pdf_path, filename) in enumerate(items):
+            try:
+                digest = self.service.hash_pdf(pdf_path)
+            except Exception as exc:
+                _fail(index, exc)
+                continue
+            if digest in seen:
+                results[index].update({"status": "duplicate", "duplicate_of": items[seen[digest]][1]})
+                metrics.INGEST_TOTAL.inc(outcome="duplicate")
+                done += 1
+                continue
+            duplicate = self.service.find_duplicate(digest)
+            if duplicate:
+                results[index].update({"status": "duplicate", "paper_id": duplicate["id"], "summary": duplicate})
+                done += 1
+                continue
+            seen[digest] = index
+            digests[index] = digest
+
+        context = multiprocessing.get_context("spawn")
+        pool_size = max(1, min(self.extract_workers, len(digests)))
+        with ProcessPoolExecutor(max_workers=pool_size, mp_context=context) as extract_pool, \
+                ThreadPoolExecutor(max_workers=self.llm_concurrency, thread_name_prefix="llm") as llm_pool:
+            report_stage("extracting_text", 5)
+            extract_futures = {}
+            for index in digests:
+                paper_id = self.service.new_paper_id()
+                paper_dir = self.service.repository.get_paper_dir(paper_id)
+                future = extract_pool.submit(
+                    _extract_document_worker,
+                    items[index][0],
+                    paper_dir,
+                    self.service.analyzer.figure_mode,
+                    self.service.analyzer.figure_dpi,
+                )
+                extract_futures[future] = (index, paper_id)
+
+            analysis_futures = {}
+            for future in as_completed(extract_futures):
+                index, paper_id = extract_futures[future]
+                try:
+                    document = future.result()
+                    if not document or not document["text"]:
+                        raise InvalidUploadError("Failed to extract text from PDF")
+                    self.service.observe_extraction(document)
+                except Exception as exc:
+                    self.service.repository.discard_paper_dir(paper_id)
+                    _fail(index, exc)
+                    continue
+                analysis_future = llm_pool.submit(self._analyze, document["text"], api_key)
+                analysis_futures[analysis_future] = (index, paper_id, document)
+
+            report_stage("analyzing", 20)
+            for future in as_completed(analysis_futures):
+                index, paper_id, document = analysis_futures[future]
+                pdf_path, filename = items[index]
+                try:
+                    analysis_result = future.result()
+                    summary = self.service.save_ingested(
+                        paper_id, pdf_path, filename, analysis_result, document["image_files"],
+                        pdf_sha256=digests[index], full_text=document["text"],
+                        figures=document.get("figures"),
+                    )
+                except Exception as exc:
+                    self.service.repository.discard_paper_dir(paper_id)
+                    _fail(index, exc)
+                    continue
+                results[index].update({"status": "completed", "paper_id": paper_id, "summary": summary})
+                done += 1
+                report_stage("analyzing", 20 + int(80 * done / total))
+
+        succeeded = sum(1 for item in results if item["status"] == "completed")
+        duplicates = sum(1 for item in results if item["status"] == "duplicate")
+        self._log.info(
+            "Bulk ingestion finished: %d/%d succeeded, %d duplicates", succeeded, total, duplicates
+        )
+        return {
+            "total": total,
+            "succeeded": succeeded,
+            "duplicates": duplicates,
+            "failed": total - succeeded - duplicates,
+            "results": results,
+        }
+
+    def _analyze(self, full_text: str, api_key: str) -> Dict[str, Any]:
+        return self.service.analyze_text(full_text, api_key, throttle=self._llm_request)
+
+    @contextmanager
+    def _llm_request(self) -> Iterator[None]:
+        with self.request_slots:
+            self.rate_limiter.acquire()
+            yield
+
+    def _cleanup(self, items: List[Tuple[str, str]]):
+        for pdf_path, _ in items:
+            self.service.remove_spooled(pdf_path)
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+StageReporter = Callable[..., None]
+
+
+class JobQueueFullError(Exception):
+    """
+    Raised when the number of pending jobs reaches ``max_pending``.
+    """
+
+
+class JobQueue:
+    """
+    Bounded background worker pool whose job state is persisted in SQLite.
+
+    Tasks receive a ``report_stage(stage, progress=None)`` callback and return
+    a JSON-serialisable result. Jobs that were still queued or running when
+    their process stopped are marked ``interrupted`` (by ``drain`` or on the
+    next start), because their inputs (uploaded file, API key) only lived in
+    that process. Several server processes may share the database; each job
+    records the pid of the process that runs it.
+    """
+
+    STAGE_PROGRESS = {
+        "queued": 0,
+        "extracting_text": 10,
+        "analyzing": 30,
+        "generating_report": 30,
+        "extracting_images": 80,
+        "saving": 90,
+        "completed": 100,
+    }
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        label TEXT NOT NULL DEFAULT '',
+        status TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        progress INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        result TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at DESC);
+    """
+
+    # Columns added after the first release; (name, DDL) pairs.
+    MIGRATIONS = [
+        ("owner_pid", "ALTER TABLE jobs ADD COLUMN owner_pid INTEGER"),
+    ]
+
+    INTERRUPTED_MESSAGE = "服务重启，任务已中断，请重新上传"
+
+    def __init__(self, db_path: str, max_workers: int = 2, max_pending: int = 50):
+        self._log = logging.getLogger(self.__class__.__name__)
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._pending = 0
+        # Futures not yet done with their cleanup callback, so that drain
+        # can run the cleanup of jobs it cancels before they start.
+        self._futures: Dict[str, Tuple[Future, Optional[Callable[[], None]]]] = {}
+        self._closing = False
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._setup()
+
+    def _setup(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, ddl in self.MIGRATIONS:
+                if column not in columns:
+                    conn.execute(ddl)
+            rows = conn.execute(
+                "SELECT job_id, owner_pid FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            orphaned = [row["job_id"] for row in rows if not _process_alive(row["owner_pid"])]
+            conn.executemany(
+                "UPDATE jobs SET status = 'interrupted', error = ?, updated_at = ? WHERE job_id = ?",
+                [(self.INTERRUPTED_MESSAGE, self._now(), job_id) for job_id in orphaned],
+            )
+        if orphaned:
+            self._log.warning("Marked %d unfinished jobs as interrupted", len(orphaned))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+
+    def submit(
+        self,
+        kind: str,
+        label: str,
+        task: Callable[[StageReporter], Any],
+        on_finish: Optional[Callable[[], None]] = None,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            if self._closing:
+                raise JobQueueFullError("Job queue is shutting down")
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError(f"Too many pending jobs ({self._pending})")
+            self._pending += 1
+
+        job_id = str(uuid.uuid4())
+        now = self._now()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (job_id, kind, label, status, stage, progress, created_at, updated_at, owner_pid)
+                VALUES (?, ?, ?, 'queued', 'queued', 0, ?, ?, ?)
+                """,
+                (job_id, kind, label, now, now, os.getpid()),
+            )
+
+        try:
+            future = self._executor.submit(self._run, job_id, task, on_finish)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+                self._idle.notify_all()
+            self._finish(job_id, "failed", error="Job queue is shutting down")
+            raise JobQueueFullError("Job queue is shutting down")
+        with self._lock:
+            self._futures[job_id] = (future, on_finish)
+        # Runs at once if the job already finished.
+        future.add_done_callback(lambda _: self._forget(job_id))
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def drain(self, timeout: float) -> int:
+        """
+        Refuse new jobs and wait up to ``timeout`` seconds for this process's
+        jobs to finish. Jobs still queued or running afterwards are cancelled
+        or abandoned and marked ``interrupted``; returns how many.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._closing = True
+            if self._pending:
+                self._log.info("Draining %d ingestion jobs (up to %.0fs)", self._pending, timeout)
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._idle.wait(remaining)
+            left = self._pending
+            queued = list(self._futures.items())
+
+        # Cancel queued jobs one by one rather than through the executor,
+        # so each one's cleanup (e.g. removing its spooled upload) still runs.
+        for job_id, (future, on_finish) in queued:
+            if future.cancel():
+                self._finish(job_id, "interrupted", error=self.INTERRUPTED_MESSAGE)
+                with self._lock:
+                    self._pending -= 1
+                self._cleanup(job_id, on_finish)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if left:
+            with self._connect() as conn:
+                conn.execute(
+                    """
+                    UPDATE jobs SET status = 'interrupted', error = ?, updated_at = ?
+                    WHERE status IN ('queued', 'running') AND owner_pid = ?
+                    """,
+                    (self.INTERRUPTED_MESSAGE, self._now(), os.getpid()),
+                )
+            self._log.warning("Shutdown interrupted %d unfinished jobs", left)
+        return left
+
+    # ------------------------------------------------------------------ #
+    # Worker side
+    # ------------------------------------------------------------------ #
+
+    def _run(self, job_id: str, task: Callable[[StageReporter], Any], on_finish):
+        self._log.info("Job %s started", job_id)
+        self._set_stage(job_id, "queued")
+        try:
+            result = task(lambda stage, progress=None: self._set_stage(job_id, stage, progress))
+            self._finish(job_id, "completed", result=result)
+            self._log.info("Job %s completed", job_id)
+        except Exception as exc:
+            self._log.exception("Job %s failed", job_id)
+            self._finish(job_id, "failed", error=str(exc) or exc.__class__.__name__)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._idle.notify_all()
+            self._cleanup(job_id, on_finish)
+
+    def _cleanup(self, job_id: str, on_finish: Optional[Callable[[], None]]):
+        if on_finish:
+            try:
+                on_finish()
+            except Exception:
+                self._log.exception("Cleanup for job %s failed", job_id)
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _set_stage(self, job_id: str, stage: str, progress: Optional[int] = None):
+        if progress is None:
+            progress = self.STAGE_PROGRESS.get(stage, 0)
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', stage = ?, progress = ?, updated_at = ? WHERE job_id = ?",
+                (stage, int(progress), self._now(), job_id),
+            )
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self._connect() as conn:
+            if status == "completed":
+                conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, stage = 'completed', progress = 100,
+                        result = ?, updated_at = ? WHERE job_id = ?
+                    """,
+                    (status, json.dumps(result, ensure_ascii=False), self._now(), job_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                    (status, error, self._now(), job_id),
+                )
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+
+    def _now(self) -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["job_id"],
+            "kind": row["kind"],
+            "label": row["label"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "progress": row["progress"],
+            "error": row["error"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """
+    Whether the process that owns a job is still running.
+
+    Rows without a pid predate ownership tracking, and a job carrying our
+    own pid was left by an earlier process that had the same pid. Windows
+    has no cheap liveness probe, so there every unfinished job counts as
+    orphaned, as it did before multi-process serving.
+    """
+    if not pid or pid == os.getpid() or os.name == "nt":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -1,20 +1,30 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
 import logging
 import os
 import tempfile
 import uuid
-from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Mapping, Tuple
 
 from werkzeug.datastructures import FileStorage
 
+import metrics
+from db_manager import ExpectedVersion, RecordVersionConflict
+from services.job_queue import JobQueueFullError
+
 # Type checking imports only
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
+    from analysis_cache import AnalysisCache
     from analysis_core import AnalysisService
     from db_manager import LiteratureRepository
+    from image_derivatives import ImageDerivatives
+    from services.job_queue import JobQueue
 
 class LiteratureServiceError(Exception):
     """
@@ -47,6 +57,27 @@ class TagOperationError(LiteratureServiceError):
     default_status = 400
 
 
+class ServiceUnavailableError(LiteratureServiceError):
+    default_status = 503
+
+
+class InvalidRequestError(LiteratureServiceError):
+    default_status = 400
+
+
+class ConflictError(LiteratureServiceError):
+    default_status = 409
+
+
+@lru_cache(maxsize=4096)
+def _file_sha256(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 class LiteratureService:
     """
     Encapsulates all business logic around PDF ingestion, analysis,
@@ -54,18 +85,115 @@ class LiteratureService:
     """
 
     ALLOWED_IMAGE_CATEGORIES = {"figure", "subfigure", "cover", "ignore"}
-
-    def __init__(self, analyzer: AnalysisService, repository: LiteratureRepository):
+    FIGURE_DETAIL_KEYS = ("caption", "page", "source")
+    MAX_PAGE_SIZE = 100
+    LIST_QUERY_PARAMS = ("limit", "cursor", "sort", "order", "tag", "year", "fields")
+    LIST_SORT_KEYS = ("mtime", "upload_time", "reading_time", "year", "title")
+    LIST_FIELDS = ("id", "title", "authors", "year", "custom_tags", "reading_time", "upload_time")
+    # Only what the weekly report prompt needs, as batch projection paths.
+    REPORT_FIELDS = (
+        "文献信息.标题", "文献信息.作者", "文献信息.期刊", "文献信息.年份",
+        "内容提取.摘要", "内容提取.结论", "内容提取.创新点",
+    )
+    # Minimum cosine similarity for two papers to share a topic group.
+    GROUP_THRESHOLD = 0.25
+    RECORD_ETAG_PREFIX = "rec-"
+
+    def __init__(
+        self,
+        analyzer: AnalysisService,
+        repository: LiteratureRepository,
+        jobs: JobQueue | None = None,
+        analysis_cache: AnalysisCache | None = None,
+        image_derivatives: ImageDerivatives | None = None,
+        report_cache: AnalysisCache | None = None,
+    ):
         self._log = logging.getLogger(self.__class__.__name__)
         self.analyzer = analyzer
         self.repository = repository
+        self.jobs = jobs
+        self.analysis_cache = analysis_cache
+        self.image_derivatives = image_derivatives
+        self.report_cache = report_cache
 
     # ------------------------------------------------------------------ #
     # Public API for routes
     # ------------------------------------------------------------------ #
 
-    def list_literature(self):
-        return self.repository.get_all_literature_summaries()
+    def list_literature(self, params: Mapping[str, Any] | None = None):
+        """
+        Without any paging/sorting/filter parameters, return the plain array
+        of every summary (what the current frontend expects). Otherwise
+        return one page: ``{"items", "next_cursor", "total"}``.
+        """
+        params = params or {}
+        if not any(key in params for key in self.LIST_QUERY_PARAMS):
+            return self.repository.get_all_literature_summaries()
+
+        sort = params.get("sort") or "mtime"
+        if sort not in self.LIST_SORT_KEYS:
+            raise InvalidRequestError(f"sort must be one of: {', '.join(self.LIST_SORT_KEYS)}")
+        order = params.get("order") or ("asc" if sort == "title" else "desc")
+        if order not in ("asc", "desc"):
+            raise InvalidRequestError("order must be asc or desc")
+        limit = min(self._parse_positive_int(params.get("limit"), "limit", default=50), self.MAX_PAGE_SIZE)
+
+        fields = None
+        if params.get("fields"):
+            fields = [name.strip() for name in params["fields"].split(",") if name.strip()]
+            unknown = [name for name in fields if name not in self.LIST_FIELDS]
+            if unknown:
+                raise InvalidRequestError(f"Unknown fields: {', '.join(unknown)}")
+
+        after = self._decode_cursor(params.get("cursor"), sort, order)
+        items, next_after, total = self.repository.query_literature_summaries(
+            sort=sort,
+            descending=order == "desc",
+            limit=limit,
+            after=after,
+            tag=params.get("tag") or None,
+            year=params.get("year") or None,
+            fields=fields,
+        )
+        return {
+            "items": items,
+            "next_cursor": self._encode_cursor(sort, order, next_after) if next_after else None,
+            "total": total,
+        }
+
+    def list_etag(self, params: Mapping[str, Any] | None = None) -> str:
+        """
+        ETag for a list response: catalog version plus the query parameters.
+        """
+        query = json.dumps(sorted((params or {}).items()), ensure_ascii=False)
+        digest = hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+        return f"list-{self.repository.get_catalog_version()}-{digest}"
+
+    def literature_etag(self, paper_id: str) -> str:
+        version = self.repository.get_record_version(paper_id)
+        if not version:
+            raise NotFoundError(f"Record {paper_id} not found")
+        return f"{self.RECORD_ETAG_PREFIX}{version}"
+
+    def pdf_etag(self, paper_id: str) -> str | None:
+        """
+        The original PDF never changes, so its SHA-256 is a strong validator.
+        """
+        return self.repository.get_pdf_hash(paper_id)
+
+    def image_etag(self, paper_id: str, filename: str, served_path: str) -> str:
+        """
+        Strong ETag for a figure or one of its derivatives. Neither changes
+        once written, so the content SHA-256 is used: for interned originals
+        it is the blob id, otherwise the file is hashed once per version.
+        """
+        original = os.path.join(os.path.abspath(self.repository.get_paper_dir(paper_id)), filename)
+        if os.path.abspath(served_path) == original:
+            blob_id = self.repository.get_image_hash(paper_id, filename)
+            if blob_id:
+                return blob_id
+        stat = os.stat(served_path)
+        return _file_sha256(served_path, stat.st_mtime_ns, stat.st_size)
 
     def get_literature(self, paper_id: str):
         data = self.repository.get_literature_by_id(paper_id)
@@ -73,20 +201,176 @@ class LiteratureService:
             raise NotFoundError(f"Record {paper_id} not found")
         return data
 
+    def get_literature_batch(self, paper_ids: Any, fields: Any = None) -> Dict[str, Any]:
+        """
+        Several records in one call, optionally projected to ``fields``
+        (top-level keys or dotted paths such as ``内容提取.摘要``).
+        Returns ``{"items", "missing"}``; items keep the requested order.
+        """
+        if not isinstance(paper_ids, list) or not paper_ids or not all(isinstance(pid, str) for pid in paper_ids):
+            raise InvalidRequestError("ids must be a non-empty list of paper ids")
+        if len(paper_ids) > self.MAX_PAGE_SIZE:
+            raise InvalidRequestError(f"At most {self.MAX_PAGE_SIZE} ids per batch")
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields)):
+            raise InvalidRequestError("fields must be a list of field paths")
+
+        items, missing = [], []
+        for paper_id in dict.fromkeys(paper_ids):
+            record = self.repository.get_literature_by_id(paper_id)
+            if record is None:
+                missing.append(paper_id)
+                continue
+            items.append(self._project_record(paper_id, record, fields))
+        return {"items": items, "missing": missing}
+
+    def submit_weekly_report(self, paper_ids: Any, additional_work: Any, api_key: str):
+        """
+        Return a cached report, or queue its generation and return the job.
+        """
+        papers = self.get_literature_batch(paper_ids, list(self.REPORT_FIELDS))
+        if papers["missing"]:
+            raise NotFoundError(f"Records not found: {', '.join(papers['missing'])}")
+        additional_work = str(additional_work or "").strip()
+        papers["items"] = self._order_by_topic(papers["items"])
+
+        cache_key = self.analyzer.report_cache_key(papers["items"], additional_work)
+        cached = self.report_cache.get(cache_key) if self.report_cache else None
+        if cached:
+            self._log.info("Weekly report cache hit for %d papers", len(papers["items"]))
+            return {"result": {**cached, "cached": True}}, 200
+
+        if self.jobs is None:
+            raise ServiceUnavailableError("Background report generation is not configured")
+        try:
+            job = self.jobs.submit(
+                "report",
+                f"周报 ({len(papers['items'])} 篇)",
+                lambda report_stage: self._generate_report(
+                    papers["items"], additional_work, api_key, cache_key, report_stage
+                ),
+            )
+        except JobQueueFullError as exc:
+            raise ServiceUnavailableError(f"任务队列已满，请稍后重试 ({exc})")
+        return job, 202
+
+    def _generate_report(self, papers, additional_work: str, api_key: str, cache_key: str, report_stage):
+        report_stage("generating_report")
+        result = self.analyzer.generate_report(papers, additional_work, api_key)
+        if "error" in result:
+            raise AnalysisFailure(result["error"])
+        if self.report_cache:
+            self.report_cache.put(cache_key, result)
+        return {**result, "cached": False}
+
+    def related_literature(self, paper_id: str, limit: Any = 10) -> Dict[str, Any]:
+        """
+        Papers whose abstract, conclusions and contributions read most like
+        ``paper_id``'s, best first, each with a cosine ``score``.
+        """
+        self._require_vector_index()
+        limit = min(self._parse_positive_int(limit, "limit", default=10), self.MAX_PAGE_SIZE)
+        hits = self.repository.find_related_literature(paper_id, limit)
+        if hits is None:
+            if not self.repository.get_record_version(paper_id):
+                raise NotFoundError(f"Record {paper_id} not found")
+            hits = []
+        results = []
+        for related_id, score in hits:
+            summary = self.repository.catalog.get_summary(related_id)
+            if summary:
+                summary["score"] = score
+                results.append(summary)
+        return {"id": paper_id, "results": results}
+
+    def group_literature(self, paper_ids: Any, threshold: Any = None) -> Dict[str, Any]:
+        """
+        Partition papers into groups of related work (largest first).
+        """
+        self._require_vector_index()
+        if not isinstance(paper_ids, list) or not paper_ids or not all(isinstance(pid, str) for pid in paper_ids):
+            raise InvalidRequestError("ids must be a non-empty list of paper ids")
+        if len(paper_ids) > self.MAX_PAGE_SIZE:
+            raise InvalidRequestError(f"At most {self.MAX_PAGE_SIZE} ids per request")
+        try:
+            threshold = self.GROUP_THRESHOLD if threshold in (None, "") else float(threshold)
+        except (TypeError, ValueError):
+            raise InvalidRequestError("threshold must be a number")
+        if not 0 < threshold <= 1:
+            raise InvalidRequestError("threshold must be in (0, 1]")
+        groups = self.repository.group_related_literature(list(dict.fromkeys(paper_ids)), threshold)
+        return {"threshold": threshold, "groups": groups}
+
+    def _order_by_topic(self, papers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Reorder report papers so related ones are adjacent and label each
+        with its ``topic_group``; unrelated papers go last under "其他文献".
+        Unchanged without a vector index or when nothing is related.
+        """
+        if self.repository.vector_index is None or len(papers) < 3:
+            return papers
+        by_id = {paper["id"]: paper for paper in papers}
+        groups = self.repository.group_related_literature(list(by_id), self.GROUP_THRESHOLD)
+        related = [group for group in groups if len(group) > 1]
+        if not related:
+            return papers
+        ordered = [
+            {**by_id[paper_id], "topic_group": f"主题组 {number}"}
+            for number, group in enumerate(related, start=1)
+            for paper_id in group
+        ]
+        ordered += [{**by_id[group[0]], "topic_group": "其他文献"} for group in groups if len(group) == 1]
+        return ordered
+
+    def _require_vector_index(self):
+        if self.repository.vector_index is None:
+            raise ServiceUnavailableError("相关文献功能需要安装 NumPy")
+
+    def search_literature(self, query: str | None, page: Any = 1, page_size: Any = 20) -> Dict[str, Any]:
+        """
+        Rank papers against ``query`` over titles, authors, abstracts,
+        conclusions, innovation points and the extracted PDF text.
+        """
+        query = (query or "").strip()
+        if not query:
+            raise InvalidRequestError("搜索关键词不能为空")
+        page = self._parse_positive_int(page, "page", default=1)
+        page_size = min(self._parse_positive_int(page_size, "page_size", default=20), self.MAX_PAGE_SIZE)
+
+        total, hits = self.repository.search_literature(query, limit=page_size, offset=(page - 1) * page_size)
+        results = []
+        for hit in hits:
+            summary = self.repository.catalog.get_summary(hit["paper_id"])
+            if not summary:
+                continue
+            summary.update({key: hit[key] for key in ("score", "matched_field", "snippet")})
+            results.append(summary)
+        return {
+            "query": query,
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "results": results,
+        }
+
     def delete_literature(self, paper_id: str):
         self.repository.delete_literature_by_id(paper_id)
 
-    def add_tag(self, paper_id: str, tag: str):
-        try:
-            return self.repository.add_tag_to_literature(paper_id, tag)
-        except FileNotFoundError:
-            raise NotFoundError(f"Record {paper_id} not found")
+    def add_tag(self, paper_id: str, tag: str, if_match: str | None = None):
+        return self._write_record(
+            paper_id,
+            if_match,
+            lambda version: self.repository.add_tag_to_literature(paper_id, tag, version),
+        )
 
-    def remove_tag(self, paper_id: str, tag: str):
-        try:
-            return self.repository.remove_tag_from_literature(paper_id, tag)
-        except FileNotFoundError:
-            raise NotFoundError(f"Record {paper_id} not found")
+    def remove_tag(self, paper_id: str, tag: str, if_match: str | None = None):
+        return self._write_record(
+            paper_id,
+            if_match,
+            lambda version: self.repository.remove_tag_from_literature(paper_id, tag, version),
+        )
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {"records": self.repository.get_record_cache_stats()}
 
     def list_tags(self):
         return self.repository.get_all_tags()
@@ -117,7 +401,7 @@ class LiteratureService:
             self.repository.update_image_metadata(paper_id, metadata)
         return metadata
 
-    def update_image_metadata(self, paper_id: str, metadata_payload):
+    def update_image_metadata(self, paper_id: str, metadata_payload, if_match: str | None = None):
         record = self.get_literature(paper_id)
         image_files = record.get("image_files", [])
         existing_metadata = record.get("image_metadata", [])
@@ -126,24 +410,40 @@ class LiteratureService:
             image_files,
             existing_metadata,
         )
-        self.repository.update_image_metadata(paper_id, normalized)
+        self._write_record(
+            paper_id,
+            if_match,
+            lambda version: self.repository.update_image_metadata(paper_id, normalized, version),
+        )
         return normalized
 
-    def update_reading_time(self, paper_id: str, reading_time: str):
+    def update_reading_time(self, paper_id: str, reading_time: str, if_match: str | None = None):
         normalized = self._normalize_reading_time(reading_time)
-        self.repository.update_reading_time(paper_id, normalized)
+        self._write_record(
+            paper_id,
+            if_match,
+            lambda version: self.repository.update_reading_time(paper_id, normalized, version),
+        )
         return {"reading_time": normalized}
 
-    def resolve_image_request(self, paper_id: str, filename: str) -> Tuple[str, str]:
+    def resolve_image_request(self, paper_id: str, filename: str, size: str | None = None) -> Tuple[str, str]:
+        """
+        Locate a figure file; ``size`` ("thumb", "medium") selects a cached
+        resized derivative, anything else ("full" or empty) the original.
+        """
         if not filename or ".." in filename or filename.startswith("/"):
             raise InvalidUploadError("Invalid filename")
 
-        image_dir = self.repository.get_paper_dir(paper_id)
+        image_dir = os.path.abspath(self.repository.get_paper_dir(paper_id))
         image_path = os.path.join(image_dir, filename)
         if not os.path.exists(image_path):
             raise NotFoundError(f"Image {filename} not found for {paper_id}")
 
-        return image_dir, filename
+        if not size or size == "full" or self.image_derivatives is None:
+            return image_dir, filename
+        if size not in self.image_derivatives.SIZES:
+            raise InvalidRequestError(f"size must be one of: full, {', '.join(self.image_derivatives.SIZES)}")
+        return self.image_derivatives.resolve(image_dir, filename, size)
 
     def parse_api_key(self, auth_header: str | None) -> str:
         if not auth_header or not auth_header.startswith("Bearer "):
@@ -155,51 +455,288 @@ class LiteratureService:
 
     def process_upload(self, file_storage: FileStorage | None, api_key: str) -> Dict[str, Any]:
         file_storage = self._validate_pdf(file_storage)
+        return self.ingest_pdf(file_storage.read(), file_storage.filename, api_key)
 
-        with self._temporary_pdf(file_storage) as tmp_pdf_path:
-            full_text = self.analyzer.extract_text_from_pdf(tmp_pdf_path)
-            if not full_text:
-                raise AnalysisFailure("Failed to extract text from PDF")
+    def submit_upload(self, file_storage: FileStorage | None, api_key: str) -> Dict[str, Any]:
+        """
+        Spool the upload to disk and queue it for background ingestion.
+        """
+        if self.jobs is None:
+            raise ServiceUnavailableError("Background ingestion is not configured")
 
-            analysis_result = self.analyzer.analyze_text_with_deepseek(full_text, api_key)
-            if not analysis_result or "error" in analysis_result:
-                message = analysis_result.get("error") if isinstance(analysis_result, dict) else None
-                raise AnalysisFailure(message or "Analysis failed")
-
-            paper_id = str(uuid.uuid4())
-            paper_dir = self.repository.get_paper_dir(paper_id)
-            image_files = self.analyzer.extract_images_from_pdf(tmp_pdf_path, paper_dir)
-
-            reading_time = self._current_timestamp()
-            analysis_payload = self._enrich_analysis_payload(
-                analysis_result,
-                paper_id,
-                image_files,
-                reading_time=reading_time,
+        spool_path, filename = self.spool_upload(file_storage)
+
+        try:
+            return self.jobs.submit(
+                "upload",
+                filename,
+                lambda report_stage: self.ingest_pdf(spool_path, filename, api_key, report_stage),
+                on_finish=lambda: self._remove_file(spool_path),
             )
+        except JobQueueFullError as exc:
+            self._remove_file(spool_path)
+            raise ServiceUnavailableError(f"导入队列已满，请稍后重试 ({exc})")
 
-            self.repository.save_new_literature(paper_id, tmp_pdf_path, analysis_payload)
+    def stream_upload(self, file_storage: FileStorage | None, api_key: str) -> Iterator[Dict[str, Any]]:
+        """
+        Validate and read the upload now, then return a generator of
+        progress events (``stage``, ``delta``, ``done``, ``error``) that
+        streams the LLM output while the analysis is produced.
+        """
+        file_storage = self._validate_pdf(file_storage)
+        pdf_bytes = file_storage.read()
+        return self._stream_ingest(pdf_bytes, file_storage.filename, api_key)
 
-            return self._build_summary(
-                analysis_payload,
-                fallback_title=file_storage.filename or "未命名文献",
+    def _stream_ingest(self, pdf_bytes: bytes, filename: str | None, api_key: str) -> Iterator[Dict[str, Any]]:
+        paper_id = None
+        finished = False
+        try:
+            pdf_sha256 = self.hash_pdf(pdf_bytes)
+            duplicate = self.find_duplicate(pdf_sha256)
+            if duplicate:
+                finished = True
+                yield {"event": "done", "data": duplicate}
+                return
+
+            yield {"event": "stage", "data": {"stage": "extracting_text"}}
+            paper_id = self.new_paper_id()
+            document = self.analyzer.extract_document(pdf_bytes, self.repository.get_paper_dir(paper_id))
+            if not document or not document["text"]:
+                raise AnalysisFailure("Failed to extract text from PDF")
+            self.observe_extraction(document)
+
+            yield {"event": "stage", "data": {"stage": "analyzing"}}
+            cache_key, analysis_result = self._lookup_cached_analysis(document["text"])
+            if analysis_result is None:
+                # Includes the time spent relaying tokens to the client.
+                with metrics.INGEST_STAGE_SECONDS.time(stage="llm_analysis"):
+                    if self.analyzer.needs_chunking(document["text"]):
+                        # Long papers go through map-reduce, which cannot stream tokens.
+                        analysis_result = self.analyzer.analyze_text_chunked(
+                            self.analyzer.prepare_text(document["text"]), api_key
+                        )
+                    else:
+                        for kind, value in self.analyzer.stream_analysis_with_deepseek(document["text"], api_key):
+                            if kind == "delta":
+                                yield {"event": "delta", "data": {"text": value}}
+                            elif kind == "error":
+                                raise AnalysisFailure(value)
+                            else:
+                                analysis_result = value
+                if not analysis_result or "error" in analysis_result:
+                    message = analysis_result.get("error") if isinstance(analysis_result, dict) else None
+                    raise AnalysisFailure(message or "Analysis failed")
+                self._store_cached_analysis(cache_key, analysis_result)
+
+            yield {"event": "stage", "data": {"stage": "saving"}}
+            summary = self.save_ingested(
+                paper_id, pdf_bytes, filename, analysis_result, document["image_files"],
+                pdf_sha256=pdf_sha256, full_text=document["text"], figures=document.get("figures"),
             )
+            finished = True
+            yield {"event": "done", "data": summary}
+        except Exception as exc:
+            if not isinstance(exc, LiteratureServiceError):
+                self._log.exception("Streaming ingestion failed")
+            message = str(exc) if isinstance(exc, LiteratureServiceError) else "Internal Server Error"
+            yield {"event": "error", "data": {"error": message}}
+        finally:
+            # Also reached through GeneratorExit when the client disconnects
+            # mid-stream, which the except clause above never sees.
+            if not finished:
+                metrics.INGEST_TOTAL.inc(outcome="failed")
+                if paper_id:
+                    self.repository.discard_paper_dir(paper_id)
+
+    def spool_upload(self, file_storage: FileStorage | None) -> Tuple[str, str]:
+        """
+        Validate an upload and persist it beyond the request.
+
+        Returns the spooled path and the display filename; the caller owns
+        the file and must remove it once processing is done.
+        """
+        file_storage = self._validate_pdf(file_storage)
+        return self._spool_pdf(file_storage), file_storage.filename or "未命名文献"
+
+    def remove_spooled(self, path: str):
+        self._remove_file(path)
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        job = self.jobs.get(job_id) if self.jobs else None
+        if not job:
+            raise NotFoundError(f"Job {job_id} not found")
+        return job
+
+    def ingest_pdf(
+        self,
+        pdf_source: str | bytes,
+        filename: str | None,
+        api_key: str,
+        report_stage: Callable[..., None] | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the full ingestion pipeline for a PDF given as a path or bytes.
+
+        The document is parsed once for text and figures; the figures land in
+        the new paper folder, which is discarded again if analysis fails.
+        """
+        report_stage = report_stage or (lambda stage, progress=None: None)
+
+        pdf_sha256 = self.hash_pdf(pdf_source)
+        duplicate = self.find_duplicate(pdf_sha256)
+        if duplicate:
+            return duplicate
+
+        report_stage("extracting_text")
+        paper_id = self.new_paper_id()
+        paper_dir = self.repository.get_paper_dir(paper_id)
+        try:
+            document = self.analyzer.extract_document(pdf_source, paper_dir)
+            if not document or not document["text"]:
+                raise AnalysisFailure("Failed to extract text from PDF")
+            self.observe_extraction(document)
+
+            report_stage("analyzing")
+            analysis_result = self.analyze_text(document["text"], api_key)
+        except Exception:
+            metrics.INGEST_TOTAL.inc(outcome="failed")
+            self.repository.discard_paper_dir(paper_id)
+            raise
+
+        report_stage("saving")
+        return self.save_ingested(
+            paper_id, pdf_source, filename, analysis_result, document["image_files"],
+            pdf_sha256=pdf_sha256, full_text=document["text"], figures=document.get("figures"),
+        )
+
+    def new_paper_id(self) -> str:
+        return str(uuid.uuid4())
+
+    def hash_pdf(self, pdf_source: str | bytes) -> str:
+        if isinstance(pdf_source, (bytes, bytearray)):
+            return hashlib.sha256(pdf_source).hexdigest()
+        digest = hashlib.sha256()
+        with open(pdf_source, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def find_duplicate(self, pdf_sha256: str) -> Dict[str, Any] | None:
+        """
+        Return the summary of an existing record with the same PDF, if any.
+        """
+        paper_id = self.repository.find_by_pdf_hash(pdf_sha256)
+        if not paper_id:
+            return None
+        record = self.repository.get_literature_by_id(paper_id)
+        if not record:
+            return None
+        self._log.info("Upload matches existing record %s, skipping analysis", paper_id)
+        metrics.INGEST_TOTAL.inc(outcome="duplicate")
+        summary = self._build_summary(record, fallback_title="未命名文献")
+        summary["duplicate"] = True
+        return summary
+
+    def analyze_text(
+        self,
+        full_text: str,
+        api_key: str,
+        throttle: Callable[[], ContextManager] | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Analyze text via the LLM, consulting the analysis cache first.
+
+        ``throttle()`` is entered around every LLM request (none on a cache
+        hit, several for a chunked analysis).
+        """
+        cache_key, cached = self._lookup_cached_analysis(full_text)
+        if cached is not None:
+            return cached
+
+        with metrics.INGEST_STAGE_SECONDS.time(stage="llm_analysis"):
+            analysis_result = self.analyzer.analyze_full_text(full_text, api_key, throttle=throttle)
+        if not analysis_result or "error" in analysis_result:
+            message = analysis_result.get("error") if isinstance(analysis_result, dict) else None
+            raise AnalysisFailure(message or "Analysis failed")
+
+        self._store_cached_analysis(cache_key, analysis_result)
+        return analysis_result
+
+    def _lookup_cached_analysis(self, full_text: str) -> Tuple[str | None, Dict[str, Any] | None]:
+        if self.analysis_cache is None:
+            return None, None
+        cache_key = self.analyzer.analysis_cache_key(full_text)
+        cached = self.analysis_cache.get(cache_key)
+        metrics.ANALYSIS_CACHE_TOTAL.inc(result="hit" if cached else "miss")
+        if cached:
+            self._log.info("Analysis cache hit for %s", cache_key[:12])
+            cached["token_usage"] = self.analyzer.usage_summary([], mode="cached", chunks=0)
+        return cache_key, cached
+
+    def _store_cached_analysis(self, cache_key: str | None, analysis_result: Dict[str, Any]):
+        if cache_key and self.analysis_cache is not None:
+            self.analysis_cache.put(cache_key, analysis_result)
+
+    def observe_extraction(self, document: Dict[str, Any]):
+        """
+        Record the text/image extraction timings reported by ``extract_document``.
+        """
+        for stage, seconds in (document.get("timings") or {}).items():
+            metrics.INGEST_STAGE_SECONDS.observe(seconds, stage=stage)
+
+    def save_ingested(
+        self,
+        paper_id: str,
+        pdf_source: str | bytes,
+        filename: str | None,
+        analysis_result: Dict[str, Any],
+        image_files: List[str],
+        pdf_sha256: str | None = None,
+        full_text: str | None = None,
+        figures: List[Dict[str, Any]] | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Enrich an analysis result and persist it as a new record.
+        ``figures`` (from ``extract_document``) seeds captions in image_metadata.
+        """
+        reading_time = self._current_timestamp()
+        analysis_payload = self._enrich_analysis_payload(
+            analysis_result,
+            paper_id,
+            image_files,
+            reading_time=reading_time,
+            figures=figures,
+        )
+        analysis_payload["pdf_sha256"] = pdf_sha256 or self.hash_pdf(pdf_source)
+
+        with metrics.INGEST_STAGE_SECONDS.time(stage="save"):
+            self.repository.save_new_literature(paper_id, pdf_source, analysis_payload, full_text=full_text)
+        metrics.INGEST_TOTAL.inc(outcome="completed")
+
+        return self._build_summary(
+            analysis_payload,
+            fallback_title=filename or "未命名文献",
+        )
 
     def get_pdf_path(self, paper_id: str) -> str:
         """
         Get the absolute path to the original PDF file.
         """
-        paper_dir = self.repository.get_paper_dir(paper_id)
+        paper_dir = os.path.abspath(self.repository.get_paper_dir(paper_id))
         pdf_path = os.path.join(paper_dir, "original.pdf")
         if not os.path.exists(pdf_path):
             raise NotFoundError(f"PDF for {paper_id} not found")
         return pdf_path
 
-    def update_basic_metadata(self, paper_id: str, metadata: Dict[str, Any]):
+    def update_basic_metadata(self, paper_id: str, metadata: Dict[str, Any], if_match: str | None = None):
         """
         Update basic metadata for a literature record.
         """
-        return self.repository.update_literature_metadata(paper_id, metadata)
+        return self._write_record(
+            paper_id,
+            if_match,
+            lambda version: self.repository.update_literature_metadata(paper_id, metadata, version),
+        )
 
     # ------------------------------------------------------------------ #
     # Helpers
@@ -214,18 +751,18 @@ class LiteratureService:
             raise InvalidUploadError("Invalid file (must be a PDF)")
         return file_storage
 
-    @contextmanager
-    def _temporary_pdf(self, file_storage: FileStorage):
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+    def _spool_pdf(self, file_storage: FileStorage) -> str:
+        """
+        Persist an upload beyond the request so a worker can pick it up.
+        """
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf", prefix="upload_") as tmp:
             file_storage.save(tmp.name)
-            tmp_pdf_path = tmp.name
+            return tmp.name
 
-        try:
-            yield tmp_pdf_path
-        finally:
-            if os.path.exists(tmp_pdf_path):
-                os.remove(tmp_pdf_path)
-                self._log.debug("Removed temp file %s", tmp_pdf_path)
+    def _remove_file(self, path: str):
+        if os.path.exists(path):
+            os.remove(path)
+            self._log.debug("Removed temp file %s", path)
 
     def _current_timestamp(self) -> str:
         return datetime.now(timezone.utc).isoformat()
@@ -236,6 +773,7 @@ class LiteratureService:
         paper_id: str,
         image_files: list[str],
         reading_time: str,
+        figures: List[Dict[str, Any]] | None = None,
     ) -> Dict[str, Any]:
         analysis_data = dict(analysis_data)
         analysis_data["paper_id"] = paper_id
@@ -251,7 +789,9 @@ class LiteratureService:
 
         metadata = analysis_data.get("image_metadata")
         if not metadata:
-            metadata = self._default_image_metadata(image_files, existing_metadata=None)
+            metadata = self._default_image_metadata(
+                image_files, existing_metadata=self._metadata_from_figures(figures)
+            )
         analysis_data["image_metadata"] = metadata
         return analysis_data
 
@@ -288,6 +828,28 @@ class LiteratureService:
             for idx, filename in enumerate(image_files)
         ]
 
+    def _metadata_from_figures(self, figures: List[Dict[str, Any]] | None) -> List[Dict[str, Any]] | None:
+        """
+        Turn detected figures into metadata seeds: the caption number becomes
+        the figure id and further images under the same caption are subfigures.
+        """
+        if not figures:
+            return None
+        seeds = []
+        previous_label = None
+        for figure in figures:
+            label = figure.get("figure_label") or ""
+            seeds.append({
+                "filename": figure.get("filename"),
+                "figure_id": label,
+                "category": "subfigure" if label and label == previous_label else "figure",
+                "caption": figure.get("caption") or "",
+                "page": figure.get("page"),
+                "source": figure.get("source"),
+            })
+            previous_label = label or previous_label
+        return seeds
+
     def _make_metadata_entry(
         self,
         filename: str,
@@ -313,12 +875,17 @@ class LiteratureService:
         if normalized_category in {"cover", "ignore"}:
             figure_id = figure_id if normalized_category == "cover" else ""
 
-        return {
+        entry = {
             "filename": filename,
             "figure_id": figure_id,
             "label": label,
             "category": normalized_category,
         }
+        # Detection details are kept as-is when metadata is edited.
+        for key in self.FIGURE_DETAIL_KEYS:
+            if existing and existing.get(key) not in (None, ""):
+                entry[key] = existing[key]
+        return entry
 
     def _normalize_image_metadata_payload(
         self,
@@ -349,7 +916,8 @@ class LiteratureService:
         cover_seen = False
 
         for idx, filename in enumerate(image_files):
-            base = provided_map.get(filename) or existing_lookup.get(filename)
+            base = dict(existing_lookup.get(filename) or {})
+            base.update(provided_map.get(filename) or {})
             entry = self._make_metadata_entry(filename, idx, base)
 
             if entry["category"] == "cover":
@@ -404,3 +972,81 @@ class LiteratureService:
             raise InvalidUploadError("reading_time must be ISO format")
         utc = parsed.astimezone(timezone.utc)
         return utc.isoformat()
+
+    def _encode_cursor(self, sort: str, order: str, after: Tuple[Any, str]) -> str:
+        raw = json.dumps([sort, order, after[0], after[1]], ensure_ascii=False)
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def _decode_cursor(self, cursor: str | None, sort: str, order: str) -> Tuple[Any, str] | None:
+        """
+        Cursors are opaque to clients and only valid for the sort they came from.
+        """
+        if not cursor:
+            return None
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            cursor_sort, cursor_order, value, paper_id = json.loads(base64.urlsafe_b64decode(padded))
+        except (ValueError, TypeError):
+            raise InvalidRequestError("Invalid cursor")
+        if (cursor_sort, cursor_order) != (sort, order):
+            raise InvalidRequestError("Cursor does not match the requested sort order")
+        return value, paper_id
+
+    def _project_record(self, paper_id: str, record: Dict[str, Any], fields: List[str] | None) -> Dict[str, Any]:
+        if not fields:
+            return {**record, "id": paper_id}
+        projected: Dict[str, Any] = {}
+        for path in fields:
+            keys = path.split(".")
+            value: Any = record
+            for key in keys:
+                value = value.get(key) if isinstance(value, dict) else None
+                if value is None:
+                    break
+            if value is None:
+                continue
+            target = projected
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+        projected["id"] = paper_id
+        return projected
+
+    def _write_record(self, paper_id: str, if_match: str | None, write: Callable[[ExpectedVersion], Any]):
+        """
+        Run a repository write, optionally conditional on the record version.
+
+        ``if_match`` is the raw ``If-Match`` header: the record's ETag as
+        returned by ``GET /api/literature/<id>`` or its ``version`` number,
+        optionally quoted; absent or ``*`` means unconditional.
+        """
+        expected_version: ExpectedVersion = None
+        if if_match and if_match.strip() != "*":
+            value = if_match.strip()
+            if value.startswith("W/"):
+                value = value[2:]
+            value = value.strip('"')
+            if value.startswith(self.RECORD_ETAG_PREFIX):
+                expected_version = value[len(self.RECORD_ETAG_PREFIX):]
+            else:
+                try:
+                    expected_version = int(value)
+                except ValueError:
+                    raise InvalidRequestError("If-Match must be the record ETag or version number")
+        try:
+            return write(expected_version)
+        except FileNotFoundError:
+            raise NotFoundError(f"Record {paper_id} not found")
+        except RecordVersionConflict as exc:
+            raise ConflictError(str(exc))
+
+    def _parse_positive_int(self, value: Any, name: str, default: int) -> int:
+        if value in (None, ""):
+            return default
+        try:
+            parsed = int(value)
+        except (TypeError, ValueError):
+            raise InvalidRequestError(f"{name} must be an integer")
+        if parsed < 1:
+            raise InvalidRequestError(f"{name} must be at least 1")
+        return parsed
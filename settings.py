@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Mapping, Optional
+
+# Every setting with its default; the type of the default is the type the
+# value is converted to. Names double as environment variable names.
+DEFAULTS: Dict[str, Any] = {
+    # Storage
+    "LITERATURE_DB": "literature_db",
+    "STORAGE_BACKEND": "",
+    "RECORD_CACHE_SIZE": 256,
+    # Ingestion
+    # "raster" saves the embedded images only. "captions" also links figures
+    # to their captions and renders drawn (vector) figures, which costs a
+    # page render per figure region (about 3x the extraction time on the
+    # benchmark PDFs).
+    "FIGURE_MODE": "raster",
+    "FIGURE_DPI": 150,
+    "INGEST_WORKERS": 2,
+    "INGEST_MAX_PENDING": 50,
+    "BULK_EXTRACT_WORKERS": 0,
+    "SHUTDOWN_DRAIN_SECONDS": 25.0,
+    # LLM backend
+    "LLM_CONCURRENCY": 4,
+    "LLM_RATE_PER_MINUTE": 60.0,
+    "LLM_POOL_SIZE": 16,
+    "LLM_API_URL": "https://api.deepseek.com/chat/completions",
+    "LLM_MODEL": "deepseek-chat",
+    # "record", "replay" or "auto" to put the response replay store in front
+    # of the endpoint; empty disables it. LLM_REPLAY_DB defaults to the db folder.
+    "LLM_REPLAY_MODE": "",
+    "LLM_REPLAY_DB": "",
+    # HTTP
+    "IMAGE_DERIVATIVE_QUALITY": 80,
+    "PDF_CACHE_MAX_AGE": 86400,
+    "HOST": "0.0.0.0",
+    "PORT": 5000,
+    "WEB_WORKERS": 2,
+    "WEB_THREADS": 8,
+    # Observability: log every timed operation as a JSON line
+    "TIMING_LOG": False,
+}
+
+CONFIG_FILE_ENV = "LITERATURE_CONFIG"
+
+
+def _convert(name: str, value: Any) -> Any:
+    default = DEFAULTS[name]
+    if isinstance(default, bool):
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+    try:
+        return type(default)(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value for {name}: {value!r}")
+
+
+def load_settings(
+    config_file: Optional[str] = None,
+    overrides: Optional[Mapping[str, Any]] = None,
+    environ: Optional[Mapping[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Resolve settings from, in increasing priority: ``DEFAULTS``, a JSON
+    config file (``config_file`` or ``$LITERATURE_CONFIG``), environment
+    variables and explicit ``overrides``.
+    """
+    environ = os.environ if environ is None else environ
+    settings = dict(DEFAULTS)
+
+    config_file = config_file or environ.get(CONFIG_FILE_ENV)
+    if config_file:
+        with open(config_file, "r", encoding="utf-8") as f:
+            from_file = json.load(f)
+        unknown = sorted(set(from_file) - set(DEFAULTS))
+        if unknown:
+            logging.warning(f"Ignoring unknown settings in {config_file}: {', '.join(unknown)}")
+        settings.update({k: v for k, v in from_file.items() if k in DEFAULTS})
+
+    settings.update({name: environ[name] for name in DEFAULTS if name in environ})
+    settings.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return {name: _convert(name, value) for name, value in settings.items() if name in DEFAULTS}
@@ -0,0 +1,49 @@
+import os
+import sys
+from typing import Dict, List, Optional
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_manager import LiteratureRepository
+
+
+def make_record(
+    title: str,
+    year: str = "2024",
+    tags: Optional[List[str]] = None,
+    upload_time: Optional[str] = None,
+) -> Dict:
+    """
+    A minimal analysis record as ingestion would save it.
+    """
+    return {
+        "文献信息": {"标题": title, "作者": ["A. Author"], "期刊": "Journal", "年份": year},
+        "内容提取": {"摘要": f"Abstract of {title}.", "结论": [], "创新点": []},
+        "custom_tags": list(tags or []),
+        "upload_time": upload_time,
+    }
+
+
+def add_paper(repository: LiteratureRepository, paper_id: str, title: str, **fields) -> Dict:
+    record = make_record(title, **fields)
+    repository.save_new_literature(paper_id, b"%PDF-1.4 test", record)
+    return record
+
+
+@pytest.fixture
+def repository(tmp_path) -> LiteratureRepository:
+    return LiteratureRepository(str(tmp_path / "literature_db"))
+
+
+@pytest.fixture(scope="module")
+def llm_stub_url():
+    """
+    URL of a local ``llm_stub`` server answering without delay or errors.
+    """
+    import llm_stub
+
+    server = llm_stub.start_in_thread()
+    yield llm_stub.completions_url(server)
+    server.shutdown()
@@ -0,0 +1,69 @@
+import metrics
+import pytest
+
+from analysis_cache import AnalysisCache
+from analysis_core import AnalysisService
+from services.literature_service import LiteratureService
+
+TEXT = (
+    "Sparse attention for long documents.\n"
+    "We propose a sparse attention scheme that scales linearly with length.\n"
+    "Experiments on three benchmarks show consistent gains over dense baselines.\n"
+)
+
+
+def _llm_requests():
+    return metrics.LLM_REQUESTS_TOTAL.value(outcome="ok")
+
+
+@pytest.fixture
+def service(tmp_path, repository, llm_stub_url):
+    analyzer = AnalysisService(sharded_text_min_pages=0, api_url=llm_stub_url)
+    cache = AnalysisCache(str(tmp_path / "analysis_cache.sqlite3"), analyzer.analysis_fingerprint())
+    yield LiteratureService(analyzer, repository, analysis_cache=cache)
+    analyzer.close()
+
+
+def test_cache_only_serves_entries_of_the_current_fingerprint(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    cache = AnalysisCache(db_path, "prompt-v1")
+    cache.put("key", {"文献信息": {"标题": "Cached"}})
+    assert AnalysisCache(db_path, "prompt-v1").get("key") == {"文献信息": {"标题": "Cached"}}
+
+    # A new prompt purges the old entries; going back does not revive them.
+    assert AnalysisCache(db_path, "prompt-v2").get("key") is None
+    assert AnalysisCache(db_path, "prompt-v1").get("key") is None
+
+
+def test_same_text_is_analyzed_once(service):
+    before = _llm_requests()
+    first = service.analyze_text(TEXT, "sk-test")
+    assert _llm_requests() == before + 1
+
+    second = service.analyze_text(TEXT, "sk-test")
+    assert _llm_requests() == before + 1
+    assert second["文献信息"] == first["文献信息"]
+    assert second["token_usage"]["mode"] == "cached"
+
+    service.analyze_text(TEXT + "One more sentence that changes the digest.\n", "sk-test")
+    assert _llm_requests() == before + 2
+
+
+def test_reuploading_the_same_pdf_returns_the_existing_record(service, repository):
+    fitz = pytest.importorskip("fitz")
+    document = fitz.open()
+    for line_number, line in enumerate(TEXT.splitlines()):
+        if line_number == 0:
+            page = document.new_page()
+        page.insert_text((72, 72 + 20 * line_number), line)
+    pdf_bytes = document.tobytes()
+    document.close()
+
+    first = service.ingest_pdf(pdf_bytes, "paper.pdf", "sk-test")
+    before = _llm_requests()
+    second = service.ingest_pdf(pdf_bytes, "copy of paper.pdf", "sk-test")
+
+    assert second["duplicate"] is True
+    assert second["id"] == first["id"]
+    assert _llm_requests() == before
+    assert repository.search_literature("sparse")[0] == 1
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from blob_store import BlobStore, _dhash
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path / "blobs"), str(tmp_path / "blobs.sqlite3"))
+
+
+def _paper_dir(tmp_path, paper_id):
+    path = tmp_path / paper_id
+    path.mkdir(exist_ok=True)
+    return str(path)
+
+
+def _write(paper_dir, filename, content):
+    with open(os.path.join(paper_dir, filename), "wb") as f:
+        f.write(content)
+
+
+def test_exact_duplicates_share_one_blob_until_released(tmp_path, store):
+    logo = b"\x89PNG\r\n\x1a\n" + b"publisher logo" * 100
+    first, second = _paper_dir(tmp_path, "p1"), _paper_dir(tmp_path, "p2")
+    _write(first, "img_1.png", logo)
+    _write(second, "img_7.png", logo)
+
+    assert store.intern_files("p1", first, ["img_1.png"]) == {"stored": 1, "shared": 0, "bytes_saved": 0}
+    assert store.intern_files("p2", second, ["img_7.png", "missing.png"]) == {
+        "stored": 0, "shared": 1, "bytes_saved": len(logo),
+    }
+    # Interning the same file again does not add a reference.
+    store.intern_files("p2", second, ["img_7.png"])
+    assert store.stats() == {"blobs": 1, "references": 2, "stored_bytes": len(logo), "bytes_saved": len(logo)}
+    blob_id = store.blob_id_for("p1", "img_1.png")
+    assert store.blob_id_for("p2", "img_7.png") == blob_id
+
+    assert store.release_paper("p1") == 0
+    with open(os.path.join(second, "img_7.png"), "rb") as f:
+        assert f.read() == logo
+    assert store.release_paper("p2") == 1
+    assert not os.path.exists(store.blob_path(blob_id, "png"))
+    assert store.stats()["blobs"] == 0
+
+
+def _image(pattern):
+    Image = pytest.importorskip("PIL.Image")
+    image = Image.new("L", (64, 48), 255)
+    for x, y, value in pattern:
+        image.putpixel((x, y), value)
+    return image
+
+
+def test_reencoded_image_is_shared(tmp_path, store):
+    image = _image([(x, x % 48, 0) for x in range(64)])
+    first, second = _paper_dir(tmp_path, "p1"), _paper_dir(tmp_path, "p2")
+    image.save(os.path.join(first, "fig.png"), compress_level=0)
+    image.save(os.path.join(second, "fig.png"), compress_level=9)
+
+    store.intern_files("p1", first, ["fig.png"])
+    stats = store.intern_files("p2", second, ["fig.png"])
+
+    assert stats["shared"] == 1
+    assert store.blob_id_for("p1", "fig.png") == store.blob_id_for("p2", "fig.png")
+
+
+def test_similar_looking_images_with_different_pixels_are_kept_apart(tmp_path, store):
+    # Two tables differing in a single digit: same difference hash, different content.
+    table = [(x, y, 0) for x in range(64) for y in (0, 16, 32, 47)]
+    first_image = _image(table + [(10, 8, 0)])
+    second_image = _image(table + [(11, 8, 0)])
+    first, second = _paper_dir(tmp_path, "p1"), _paper_dir(tmp_path, "p2")
+    first_image.save(os.path.join(first, "table.png"))
+    second_image.save(os.path.join(second, "table.png"))
+    assert _dhash(os.path.join(first, "table.png")) == _dhash(os.path.join(second, "table.png"))
+
+    store.intern_files("p1", first, ["table.png"])
+    stats = store.intern_files("p2", second, ["table.png"])
+
+    assert stats == {"stored": 1, "shared": 0, "bytes_saved": 0}
+    assert store.blob_id_for("p1", "table.png") != store.blob_id_for("p2", "table.png")
@@ -0,0 +1,65 @@
+import json
+import os
+
+from conftest import add_paper
+from db_manager import LiteratureRepository
+
+
+def _ids(summaries):
+    return sorted(summary["id"] for summary in summaries)
+
+
+def test_summaries_follow_saves_and_deletes(repository):
+    add_paper(repository, "p1", "First paper", year="2021", tags=["ml"])
+    add_paper(repository, "p2", "Second paper", year="2022")
+
+    summaries = {summary["id"]: summary for summary in repository.get_all_literature_summaries()}
+    assert set(summaries) == {"p1", "p2"}
+    assert summaries["p1"]["title"] == "First paper"
+    assert summaries["p1"]["year"] == "2021"
+    assert summaries["p1"]["custom_tags"] == ["ml"]
+
+    repository.delete_literature_by_id("p1")
+    assert _ids(repository.get_all_literature_summaries()) == ["p2"]
+
+
+def test_catalog_persists_across_instances(repository):
+    add_paper(repository, "p1", "First paper")
+    add_paper(repository, "p2", "Second paper")
+
+    reopened = LiteratureRepository(repository.db_base_path)
+    assert reopened.get_all_literature_summaries() == repository.get_all_literature_summaries()
+
+
+def test_missing_catalog_is_rebuilt_from_records(repository):
+    add_paper(repository, "p1", "First paper")
+    add_paper(repository, "p2", "Second paper")
+    expected = repository.get_all_literature_summaries()
+
+    catalog_path = os.path.join(repository.db_base_path, repository.catalog_file_name)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(catalog_path + suffix):
+            os.remove(catalog_path + suffix)
+
+    reopened = LiteratureRepository(repository.db_base_path)
+    assert reopened.get_all_literature_summaries() == expected
+
+
+def test_verify_catalog_detects_and_repairs_drift(repository):
+    add_paper(repository, "p1", "First paper")
+    add_paper(repository, "p2", "Second paper")
+    assert repository.verify_catalog() == {"missing": [], "orphaned": [], "stale": []}
+
+    # Edit one record behind the repository's back.
+    path = os.path.join(repository.get_paper_dir("p1"), "analysis.json")
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["文献信息"]["标题"] = "Edited by hand, with a longer title"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+    assert repository.verify_catalog()["stale"] == ["p1"]
+    repository.verify_catalog(repair=True)
+    assert repository.verify_catalog() == {"missing": [], "orphaned": [], "stale": []}
+    titles = {summary["id"]: summary["title"] for summary in repository.get_all_literature_summaries()}
+    assert titles["p1"] == "Edited by hand, with a longer title"
@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from services.job_queue import JobQueue, JobQueueFullError
+
+
+def _wait_for(jobs, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} still {job['status']}")
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), max_workers=1, max_pending=3)
+    yield queue
+    queue.drain(0)
+
+
+def test_completed_job_reports_stages_and_result(jobs):
+    seen = threading.Event()
+    release = threading.Event()
+
+    def task(report_stage):
+        report_stage("analyzing")
+        seen.set()
+        release.wait(5)
+        return {"id": "p1"}
+
+    job = jobs.submit("upload", "paper.pdf", task)
+    assert job["status"] == "queued"
+    assert seen.wait(5)
+    running = jobs.get(job["job_id"])
+    assert (running["status"], running["stage"], running["progress"]) == ("running", "analyzing", 30)
+
+    release.set()
+    finished = _wait_for(jobs, job["job_id"])
+    assert finished["status"] == "completed"
+    assert finished["progress"] == 100
+    assert finished["result"] == {"id": "p1"}
+    assert [item["job_id"] for item in jobs.list_recent()] == [job["job_id"]]
+
+
+def test_failed_job_keeps_the_error_and_runs_cleanup(jobs):
+    cleaned = []
+
+    def task(report_stage):
+        raise ValueError("broken PDF")
+
+    job = jobs.submit("upload", "paper.pdf", task, on_finish=lambda: cleaned.append(True))
+    finished = _wait_for(jobs, job["job_id"])
+    assert (finished["status"], finished["error"]) == ("failed", "broken PDF")
+    assert cleaned == [True]
+
+
+def test_submit_refuses_more_than_max_pending(jobs):
+    release = threading.Event()
+    for _ in range(3):
+        jobs.submit("upload", "paper.pdf", lambda report_stage: release.wait(5))
+    with pytest.raises(JobQueueFullError):
+        jobs.submit("upload", "paper.pdf", lambda report_stage: None)
+    release.set()
+
+
+def test_drain_waits_for_running_jobs_and_refuses_new_ones(jobs):
+    job = jobs.submit("upload", "paper.pdf", lambda report_stage: time.sleep(0.2))
+
+    assert jobs.drain(5) == 0
+    assert jobs.get(job["job_id"])["status"] == "completed"
+    with pytest.raises(JobQueueFullError):
+        jobs.submit("upload", "paper.pdf", lambda report_stage: None)
+
+
+def test_drain_interrupts_jobs_that_outlive_the_timeout(jobs):
+    release = threading.Event()
+    job = jobs.submit("upload", "paper.pdf", lambda report_stage: release.wait(5))
+
+    assert jobs.drain(0.05) == 1
+    interrupted = jobs.get(job["job_id"])
+    assert (interrupted["status"], interrupted["error"]) == ("interrupted", JobQueue.INTERRUPTED_MESSAGE)
+    release.set()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="Windows treats every unfinished job as orphaned")
+def test_restart_marks_jobs_of_dead_processes_interrupted(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    JobQueue(db_path).drain(0)
+
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    owners = {"dead": exited.pid, "alive": os.getppid(), "legacy": None}
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO jobs (job_id, kind, label, status, stage, created_at, updated_at, owner_pid)
+            VALUES (?, 'upload', '', 'running', 'analyzing', '2024-01-01', '2024-01-01', ?)
+            """,
+            list(owners.items()),
+        )
+    conn.close()
+
+    jobs = JobQueue(db_path)
+    try:
+        assert jobs.get("dead")["status"] == "interrupted"
+        assert jobs.get("legacy")["status"] == "interrupted"
+        # Another server process sharing the database is still working on it.
+        assert jobs.get("alive")["status"] == "running"
+    finally:
+        jobs.drain(0)
+
+
+def test_drain_runs_cleanup_of_jobs_it_cancels(jobs):
+    release = threading.Event()
+    cleaned = []
+    running = jobs.submit("upload", "a.pdf", lambda report_stage: release.wait(5))
+    queued = [
+        jobs.submit("upload", name, lambda report_stage: None, on_finish=lambda name=name: cleaned.append(name))
+        for name in ("b.pdf", "c.pdf")
+    ]
+
+    assert jobs.drain(0.05) == 3
+    # The spooled uploads of jobs that never started are removed at once.
+    assert sorted(cleaned) == ["b.pdf", "c.pdf"]
+    assert all(jobs.get(job["job_id"])["status"] == "interrupted" for job in queued + [running])
+    release.set()
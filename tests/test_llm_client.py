@@ -0,0 +1,118 @@
+import time
+
+import pytest
+
+import llm_stub
+import metrics
+from llm_client import CircuitBreaker, CircuitOpenError, LLMAuthError, LLMClient, LLMClientError
+
+HEADERS = {"Authorization": "Bearer sk-test"}
+PAYLOAD = {"model": "deepseek-chat", "messages": [{"role": "user", "content": "Hello"}]}
+
+
+@pytest.fixture
+def stub_url():
+    """
+    Start stub servers with the given options; all are stopped afterwards.
+    """
+    servers = []
+
+    def start(**options):
+        servers.append(llm_stub.start_in_thread(**options))
+        return llm_stub.completions_url(servers[-1])
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def _client(failure_threshold=5, reset_timeout=60.0, max_attempts=3):
+    return LLMClient(
+        max_attempts=max_attempts,
+        backoff_max=0.01,
+        breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout),
+    )
+
+
+def _requests(outcome):
+    return metrics.LLM_REQUESTS_TOTAL.value(outcome=outcome)
+
+
+def test_successful_request_returns_the_completion(stub_url):
+    client = _client()
+    result = client.post_json(stub_url(), HEADERS, PAYLOAD)
+    assert result["choices"][0]["message"]["content"]
+    assert client.breaker.state == "closed"
+
+
+def test_server_errors_are_retried_and_open_the_circuit(stub_url):
+    url = stub_url(error_rate=1.0)
+    client = _client(failure_threshold=3)
+    retries = metrics.LLM_RETRIES_TOTAL.value()
+
+    with pytest.raises(LLMClientError) as excinfo:
+        client.post_json(url, HEADERS, PAYLOAD)
+    assert excinfo.value.status_code in (500, 503)
+    assert metrics.LLM_RETRIES_TOTAL.value() == retries + 2
+    assert client.breaker.state == "open"
+
+    # Fails fast without reaching the backend.
+    sent = _requests("http_500") + _requests("http_503")
+    with pytest.raises(CircuitOpenError):
+        client.post_json(url, HEADERS, PAYLOAD)
+    assert _requests("http_500") + _requests("http_503") == sent
+
+
+def test_rate_limiting_is_retried_without_opening_the_circuit(stub_url):
+    client = _client(failure_threshold=1)
+    before = _requests("http_429")
+
+    with pytest.raises(LLMClientError) as excinfo:
+        client.post_json(stub_url(rate_limit_rate=1.0), HEADERS, PAYLOAD)
+    assert excinfo.value.status_code == 429
+    assert _requests("http_429") == before + 3
+    assert client.breaker.state == "closed"
+
+
+def test_client_errors_are_not_retried(stub_url):
+    client = _client(failure_threshold=1)
+    url = stub_url().replace("/chat/completions", "/missing")
+    before = _requests("http_404")
+
+    with pytest.raises(LLMClientError) as excinfo:
+        client.post_json(url, HEADERS, PAYLOAD)
+    assert excinfo.value.status_code == 404
+    assert _requests("http_404") == before + 1
+    assert client.breaker.state == "closed"
+    # A conflict is the caller's problem too, not a transient failure.
+    assert 409 not in LLMClient.RETRYABLE_STATUS
+
+    with pytest.raises(LLMAuthError):
+        client.post_json(stub_url(), {}, PAYLOAD)
+    assert client.breaker.state == "closed"
+
+
+def test_half_open_trial_closes_or_reopens_the_circuit(stub_url):
+    failing, rate_limited, healthy = stub_url(error_rate=1.0), stub_url(rate_limit_rate=1.0), stub_url()
+    client = _client(failure_threshold=1, reset_timeout=0.05, max_attempts=1)
+
+    with pytest.raises(LLMClientError):
+        client.post_json(failing, HEADERS, PAYLOAD)
+    assert client.breaker.state == "open"
+
+    time.sleep(0.06)
+    assert client.breaker.state == "half_open"
+    with pytest.raises(LLMClientError):
+        client.post_json(failing, HEADERS, PAYLOAD)
+    assert client.breaker.state == "open"
+
+    time.sleep(0.06)
+    # A throttled trial says nothing about the backend's health: the next
+    # call may try again.
+    with pytest.raises(LLMClientError) as excinfo:
+        client.post_json(rate_limited, HEADERS, PAYLOAD)
+    assert excinfo.value.status_code == 429
+    assert client.breaker.state == "half_open"
+
+    client.post_json(healthy, HEADERS, PAYLOAD)
+    assert client.breaker.state == "closed"
@@ -0,0 +1,90 @@
+import pytest
+
+import llm_stub
+import metrics
+from analysis_core import AnalysisService
+from llm_client import LLMClientError
+from llm_replay import ReplayingLLMClient, ReplayStore
+
+TEXT = (
+    "Sparse attention for long documents.\n\n"
+    "We propose a sparse attention scheme that scales linearly with sequence length.\n"
+    "As Fig. 2 shows, accuracy matches dense attention on three benchmarks.\n"
+)
+
+
+def _analyzer(store, mode, url):
+    return AnalysisService(sharded_text_min_pages=0, api_url=url, llm_client=ReplayingLLMClient(store, mode))
+
+
+def _backend_requests():
+    return metrics.LLM_REQUESTS_TOTAL.value(outcome="ok")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ReplayStore(str(tmp_path / "llm_replay.sqlite3"))
+
+
+def test_recorded_analysis_replays_without_the_backend(store, llm_stub_url):
+    recorded = _analyzer(store, "record", llm_stub_url).analyze_text_with_deepseek(TEXT, "sk-test")
+    assert "error" not in recorded
+    assert store.count() == 1
+
+    before = _backend_requests()
+    replayed = _analyzer(store, "replay", llm_stub_url).analyze_text_with_deepseek(TEXT, "sk-other")
+    assert _backend_requests() == before
+    # The API key is not part of the request key.
+    assert replayed["文献信息"] == recorded["文献信息"]
+    assert replayed["内容提取"] == recorded["内容提取"]
+
+
+def test_replay_mode_fails_on_unknown_requests(store, llm_stub_url):
+    client = ReplayingLLMClient(store, "replay")
+    with pytest.raises(LLMClientError, match="replay mode"):
+        client.post_json(llm_stub_url, {"Authorization": "Bearer sk-test"}, {"messages": []})
+
+    result = _analyzer(store, "replay", llm_stub_url).analyze_text_with_deepseek(TEXT, "sk-test")
+    assert "replay mode" in result["error"]
+    with pytest.raises(ValueError):
+        ReplayingLLMClient(store, "sometimes")
+
+
+def test_auto_mode_records_misses_and_serves_hits(store, llm_stub_url):
+    analyzer = _analyzer(store, "auto", llm_stub_url)
+    before = _backend_requests()
+    first = analyzer.analyze_text_with_deepseek(TEXT, "sk-test")
+    second = analyzer.analyze_text_with_deepseek(TEXT, "sk-test")
+
+    assert _backend_requests() == before + 1
+    assert second["文献信息"] == first["文献信息"]
+
+
+def _stream(analyzer):
+    events = list(analyzer.stream_analysis_with_deepseek(TEXT, "sk-test"))
+    deltas = "".join(value for kind, value in events if kind == "delta")
+    return deltas, events[-1]
+
+
+def test_streamed_responses_replay_token_by_token(store, llm_stub_url):
+    recorded_deltas, (kind, recorded) = _stream(_analyzer(store, "record", llm_stub_url))
+    assert kind == "result"
+
+    before = _backend_requests()
+    replayed_deltas, (kind, replayed) = _stream(_analyzer(store, "replay", llm_stub_url))
+    assert _backend_requests() == before
+    assert kind == "result"
+    assert replayed_deltas == recorded_deltas
+    assert replayed["文献信息"] == recorded["文献信息"]
+
+
+def test_stub_analysis_is_deterministic_and_follows_the_prompt_schema():
+    analysis = llm_stub.stub_analysis(TEXT)
+
+    assert analysis == llm_stub.stub_analysis(TEXT)
+    assert set(analysis["文献信息"]) == {"标题", "作者", "期刊", "年份"}
+    assert analysis["文献信息"]["标题"] == "Sparse attention for long documents."
+    assert set(analysis["内容提取"]) == {"摘要", "关键图表", "实验", "结论", "创新点", "不足"}
+    assert [figure["图序号"] for figure in analysis["内容提取"]["关键图表"]] == ["图2"]
+    for key in ("实验", "结论", "创新点", "不足"):
+        assert all(isinstance(item, str) and item for item in analysis["内容提取"][key])
@@ -0,0 +1,73 @@
+import pytest
+
+from analysis_core import AnalysisService
+from conftest import add_paper
+from services.literature_service import InvalidRequestError, LiteratureService
+
+PAPER_COUNT = 23
+
+
+@pytest.fixture
+def service(repository):
+    # Few distinct years and titles, some missing upload times: many ties.
+    for number in range(PAPER_COUNT):
+        add_paper(
+            repository,
+            f"p{number:02d}",
+            f"Title {number % 4}",
+            year=str(2020 + number % 3),
+            tags=["even"] if number % 2 == 0 else [],
+            upload_time=None if number % 5 == 0 else f"2024-01-{number % 7 + 1:02d}T00:00:00+00:00",
+        )
+    return LiteratureService(AnalysisService(), repository)
+
+
+def _walk(service, **params):
+    pages, cursor = [], None
+    while True:
+        page = service.list_literature({**params, **({"cursor": cursor} if cursor else {})})
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if not cursor:
+            return pages
+
+
+@pytest.mark.parametrize("sort", LiteratureService.LIST_SORT_KEYS)
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_cursor_pages_neither_skip_nor_repeat(service, sort, order):
+    pages = _walk(service, sort=sort, order=order, limit="4")
+    ids = [item["id"] for page in pages for item in page["items"]]
+
+    assert len(ids) == len(set(ids)) == PAPER_COUNT
+    assert all(page["total"] == PAPER_COUNT for page in pages)
+    assert all(len(page["items"]) == 4 for page in pages[:-1])
+    whole = service.list_literature({"sort": sort, "order": order, "limit": "100"})
+    assert ids == [item["id"] for item in whole["items"]]
+
+
+def test_filters_apply_to_every_page(service):
+    pages = _walk(service, tag="even", year="2020", limit="2")
+    ids = [item["id"] for page in pages for item in page["items"]]
+    expected = [f"p{n:02d}" for n in range(PAPER_COUNT) if n % 2 == 0 and n % 3 == 0]
+
+    assert sorted(ids) == expected
+    assert pages[0]["total"] == len(expected)
+
+
+def test_field_projection(service):
+    page = service.list_literature({"fields": "id,title", "limit": "3"})
+    assert all(set(item) == {"id", "title"} for item in page["items"])
+
+
+def test_without_parameters_returns_every_summary(service):
+    assert len(service.list_literature({})) == PAPER_COUNT
+
+
+def test_rejects_foreign_or_malformed_cursors(service):
+    cursor = service.list_literature({"sort": "year", "limit": "5"})["next_cursor"]
+    with pytest.raises(InvalidRequestError):
+        service.list_literature({"sort": "title", "cursor": cursor})
+    with pytest.raises(InvalidRequestError):
+        service.list_literature({"cursor": "not a cursor"})
+    with pytest.raises(InvalidRequestError):
+        service.list_literature({"sort": "size"})
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from conftest import add_paper, make_record
+from db_manager import LiteratureRepository
+from record_store import FolderRecordStore, SQLiteRecordStore, migrate_folders_to_sqlite, open_record_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteRecordStore(str(tmp_path / "literature_db"))
+
+
+def test_sqlite_store_round_trips_records(store):
+    record = make_record("图神经网络综述")
+    store.write("p1", record)
+
+    assert store.list_ids() == ["p1"]
+    assert store.read("p1") == record
+    token = store.version_token("p1")
+    created_at, _, size = store.signature("p1")
+    assert size > 0
+
+    record["custom_tags"] = ["gnn"]
+    store.write("p1", record)
+    assert store.read("p1")["custom_tags"] == ["gnn"]
+    assert store.version_token("p1") != token
+    # Rewriting keeps the creation time the list is sorted by.
+    assert store.signature("p1")[0] == created_at
+    assert [paper_id for paper_id, _, _ in store.iter_records()] == ["p1"]
+
+
+def test_sqlite_store_delete_removes_the_files_directory(store):
+    store.write("p1", make_record("Paper"))
+    os.makedirs(store.paper_dir("p1"))
+
+    store.delete("p1")
+
+    assert store.version_token("p1") is None
+    assert not os.path.exists(store.paper_dir("p1"))
+    with pytest.raises(FileNotFoundError):
+        store.read("p1")
+
+
+def test_migration_moves_records_and_files_into_sqlite(tmp_path):
+    root = str(tmp_path / "literature_db")
+    folders = LiteratureRepository(root, storage="folder")
+    add_paper(folders, "p1", "First paper", tags=["ml"])
+    add_paper(folders, "p2", "Second paper")
+    os.makedirs(os.path.join(root, "broken"))
+    with open(os.path.join(root, "broken", FolderRecordStore.ANALYSIS_FILE), "w", encoding="utf-8") as f:
+        f.write("{not json")
+
+    assert migrate_folders_to_sqlite(root) == {"migrated": 2, "failed": 1}
+    # An interrupted or repeated run has nothing left to do.
+    assert migrate_folders_to_sqlite(root) == {"migrated": 0, "failed": 1}
+    assert isinstance(open_record_store(root), SQLiteRecordStore)
+
+    repository = LiteratureRepository(root)
+    repository.rebuild_catalog()
+    assert repository.get_literature_by_id("p1")["custom_tags"] == ["ml"]
+    assert sorted(summary["id"] for summary in repository.get_all_literature_summaries()) == ["p1", "p2"]
+    assert os.path.exists(os.path.join(repository.get_paper_dir("p1"), "original.pdf"))
+    assert not os.path.exists(os.path.join(root, "p1"))
+    # The unreadable folder is left for the user to inspect.
+    assert os.path.exists(os.path.join(root, "broken"))
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import time
+
+import pytest
+
+from app import create_app
+from conftest import add_paper
+from routes import literature_routes
+from settings import load_settings
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app(load_settings(environ={"LITERATURE_DB": str(tmp_path / "literature_db")}))
+    yield app.test_client()
+    literature_routes.shutdown_services(0)
+
+
+@pytest.fixture
+def repository(client):
+    return literature_routes.repository
+
+
+def _add_tag(client, paper_id, tag, if_match=None):
+    headers = {"If-Match": if_match} if if_match else {}
+    return client.post(f"/api/literature/{paper_id}/tags", json={"tag": tag}, headers=headers)
+
+
+def test_record_etag_round_trips_through_if_match(client, repository):
+    add_paper(repository, "p1", "First paper")
+    etag = client.get("/api/literature/p1").headers["ETag"]
+
+    response = _add_tag(client, "p1", "ml", if_match=etag)
+    assert response.status_code == 200
+    assert response.get_json() == ["ml"]
+
+    # The record changed since that ETag was issued.
+    assert _add_tag(client, "p1", "nlp", if_match=etag).status_code == 409
+
+    fresh = client.get("/api/literature/p1").headers["ETag"]
+    assert fresh != etag
+    response = client.delete("/api/literature/p1/tags/ml", headers={"If-Match": fresh})
+    assert response.status_code == 200
+    assert client.get("/api/literature/p1").get_json()["custom_tags"] == []
+
+
+def test_record_etag_supports_conditional_get(client, repository):
+    add_paper(repository, "p1", "First paper")
+    etag = client.get("/api/literature/p1").headers["ETag"]
+
+    assert client.get("/api/literature/p1", headers={"If-None-Match": etag}).status_code == 304
+    _add_tag(client, "p1", "ml")
+    assert client.get("/api/literature/p1", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_records_without_version_still_get_a_usable_etag(client, repository):
+    add_paper(repository, "p1", "First paper")
+    path = os.path.join(repository.get_paper_dir("p1"), "analysis.json")
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    del data["version"]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+    etag = client.get("/api/literature/p1").headers["ETag"]
+    assert _add_tag(client, "p1", "ml", if_match=etag).status_code == 200
+    assert _add_tag(client, "p1", "nlp", if_match=etag).status_code == 409
+
+
+def test_if_match_accepts_version_numbers_and_rejects_garbage(client, repository):
+    add_paper(repository, "p1", "First paper")
+
+    assert _add_tag(client, "p1", "ml", if_match='"1"').status_code == 200
+    assert _add_tag(client, "p1", "nlp", if_match="1").status_code == 409
+    assert _add_tag(client, "p1", "nlp", if_match="2").status_code == 200
+    assert _add_tag(client, "p1", "x", if_match="*").status_code == 200
+    assert _add_tag(client, "p1", "x", if_match="bogus").status_code == 400
+
+
+def test_record_writes_keep_the_list_order(client, repository):
+    add_paper(repository, "p1", "Older paper")
+    time.sleep(0.05)
+    add_paper(repository, "p2", "Newer paper")
+    assert [item["id"] for item in client.get("/api/literature").get_json()] == ["p2", "p1"]
+
+    _add_tag(client, "p1", "ml")
+    assert [item["id"] for item in client.get("/api/literature").get_json()] == ["p2", "p1"]
+
+
+def test_image_etag_is_the_content_sha256(client, repository):
+    add_paper(repository, "p1", "First paper")
+    content = b"\x89PNG\r\n\x1a\nnot really a png"
+    for name in ("fig_1.png", "fig_2.png"):
+        with open(os.path.join(repository.get_paper_dir("p1"), name), "wb") as f:
+            f.write(content)
+    repository.blob_store.intern_files("p1", repository.get_paper_dir("p1"), ["fig_1.png"])
+    expected = f'"{hashlib.sha256(content).hexdigest()}"'
+
+    for name in ("fig_1.png", "fig_2.png"):
+        response = client.get(f"/api/literature/p1/images/{name}")
+        assert response.status_code == 200
+        assert response.headers["ETag"] == expected
+        assert client.get(
+            f"/api/literature/p1/images/{name}", headers={"If-None-Match": expected}
+        ).status_code == 304
+
+
+def test_overwriting_a_record_keeps_its_version_increasing(client, repository):
+    add_paper(repository, "p1", "First paper")
+    _add_tag(client, "p1", "ml")
+    stale = client.get("/api/literature/p1").headers["ETag"]
+
+    add_paper(repository, "p1", "Replacement")
+    assert repository.get_literature_by_id("p1")["version"] == 3
+    assert _add_tag(client, "p1", "nlp", if_match=stale).status_code == 409
+    assert _add_tag(client, "p1", "nlp", if_match='"3"').status_code == 200
+
+
+def test_failed_record_write_is_not_indexed(repository, monkeypatch):
+    def fail(paper_id, data):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(repository.store, "write", fail)
+    with pytest.raises(OSError):
+        add_paper(repository, "p1", "Never stored")
+    assert repository.search_literature("Never")[0] == 0
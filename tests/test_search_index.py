@@ -0,0 +1,58 @@
+import pytest
+
+from conftest import make_record
+from search_index import SearchIndex, _tokens, build_match_query
+
+
+def _record(title, abstract):
+    record = make_record(title)
+    record["内容提取"]["摘要"] = abstract
+    return record
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.sqlite3"))
+    index.upsert_many([
+        ("gnn", _record("图神经网络综述", "本文总结了图神经网络在分子性质预测中的应用。"), None),
+        ("nn", _record("神经网络剪枝", "我们提出一种结构化剪枝方法。"), "The pruning method keeps accuracy on ImageNet."),
+        ("graphene", _record("Graphene sensors", "Graphene based gas sensors."), "石墨烯传感器的灵敏度很高。"),
+    ])
+    return index
+
+
+def test_cjk_runs_become_overlapping_bigrams():
+    assert _tokens("图神经网络 GNN-2") == ["图神", "神经", "经网", "网络", "gnn", "2"]
+    assert _tokens("图") == ["图"]
+    assert build_match_query("神经网络 graph") == '"神经" + "经网" + "网络"* AND "graph"*'
+
+
+def _ids(index, query):
+    return sorted(hit["paper_id"] for hit in index.search(query)[1])
+
+
+def test_chinese_words_match_inside_longer_runs(index):
+    assert _ids(index, "神经网络") == ["gnn", "nn"]
+    assert _ids(index, "图神经网络") == ["gnn"]
+    # The characters must be adjacent: 网 + 神 never occur as "网神".
+    assert _ids(index, "网神") == []
+
+
+def test_single_character_and_prefix_queries(index):
+    assert _ids(index, "神") == ["gnn", "nn"]
+    assert _ids(index, "graph") == ["graphene"]
+
+
+def test_full_text_is_searched_and_snippets_point_at_the_match(index):
+    total, hits = index.search("石墨烯")
+    assert total == 1
+    assert hits[0]["paper_id"] == "graphene"
+    assert hits[0]["matched_field"] == "full_text"
+    assert "石墨烯" in hits[0]["snippet"]
+
+
+def test_title_matches_rank_above_body_matches(index):
+    index.upsert("body", _record("Model compression", "关于剪枝的一些讨论。"), None)
+    hits = index.search("剪枝")[1]
+    assert hits[0]["paper_id"] == "nn"
+    assert {hit["paper_id"] for hit in hits} == {"nn", "body"}
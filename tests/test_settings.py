@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from settings import DEFAULTS, load_settings
+
+
+def test_later_sources_override_earlier_ones(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"PORT": 8000, "INGEST_WORKERS": 3, "NOT_A_SETTING": 1}), encoding="utf-8")
+
+    settings = load_settings(
+        environ={"LITERATURE_CONFIG": str(config), "INGEST_WORKERS": "5", "TIMING_LOG": "yes"},
+        overrides={"INGEST_WORKERS": 7, "HOST": None},
+    )
+
+    assert settings["PORT"] == 8000
+    assert settings["INGEST_WORKERS"] == 7
+    assert settings["TIMING_LOG"] is True
+    assert settings["HOST"] == DEFAULTS["HOST"]
+    assert "NOT_A_SETTING" not in settings
+
+
+def test_values_are_converted_to_the_type_of_their_default():
+    settings = load_settings(environ={"SHUTDOWN_DRAIN_SECONDS": "2.5", "TIMING_LOG": "off", "PORT": "8080"})
+    assert settings["SHUTDOWN_DRAIN_SECONDS"] == 2.5
+    assert settings["TIMING_LOG"] is False
+    assert settings["PORT"] == 8080
+
+    with pytest.raises(ValueError, match="INGEST_WORKERS"):
+        load_settings(environ={"INGEST_WORKERS": "many"})
@@ -0,0 +1,89 @@
+import json
+import os
+
+from conftest import add_paper
+from db_manager import LiteratureRepository, RecordCache, TagIndex
+
+
+def test_tag_index_tracks_paper_tags():
+    index = TagIndex()
+    index.load({"p1": ["ml", "nlp"], "p2": ["ml"]})
+    assert index.papers_with_tag("ml") == ["p1", "p2"]
+
+    index.set_paper_tags("p1", ["nlp", "nlp", 3])
+    assert index.papers_with_tag("ml") == ["p2"]
+    assert index.papers_with_tag("nlp") == ["p1"]
+
+    index.remove_paper("p2")
+    assert index.tags() == ["nlp"]
+    assert index.stats() == [{"tag": "nlp", "count": 1}]
+
+
+def test_tag_edits_update_tags_and_stats(repository):
+    add_paper(repository, "p1", "First paper", tags=["ml"])
+    add_paper(repository, "p2", "Second paper", tags=["ml", "vision"])
+
+    repository.add_tag_to_literature("p1", "nlp")
+    repository.remove_tag_from_literature("p2", "ml")
+    assert repository.get_tag_stats() == [
+        {"tag": "ml", "count": 1},
+        {"tag": "nlp", "count": 1},
+        {"tag": "vision", "count": 1},
+    ]
+
+    repository.rename_tag_globally("vision", "ml")
+    assert repository.get_all_tags() == ["ml", "nlp"]
+    assert repository.get_literature_by_id("p2")["custom_tags"] == ["ml"]
+
+    repository.delete_tag_globally("ml")
+    assert repository.get_all_tags() == ["nlp"]
+    summaries = {summary["id"]: summary for summary in repository.get_all_literature_summaries()}
+    assert summaries["p1"]["custom_tags"] == ["nlp"]
+    assert summaries["p2"]["custom_tags"] == []
+
+
+def test_tag_index_reloads_after_changes_by_another_instance(repository):
+    add_paper(repository, "p1", "First paper", tags=["ml"])
+    other = LiteratureRepository(repository.db_base_path)
+    assert other.get_all_tags() == ["ml"]
+
+    repository.add_tag_to_literature("p1", "nlp")
+    assert other.get_all_tags() == ["ml", "nlp"]
+
+
+def test_record_cache_is_invalidated_by_tag_edits(repository):
+    add_paper(repository, "p1", "First paper", tags=["ml"])
+    assert repository.get_literature_by_id("p1")["custom_tags"] == ["ml"]
+
+    repository.add_tag_to_literature("p1", "nlp")
+    assert repository.get_literature_by_id("p1")["custom_tags"] == ["ml", "nlp"]
+
+    repository.rename_tag_globally("ml", "machine learning")
+    assert repository.get_literature_by_id("p1")["custom_tags"] == ["machine learning", "nlp"]
+
+
+def test_record_cache_picks_up_edits_by_hand(repository):
+    add_paper(repository, "p1", "First paper")
+    assert repository.get_literature_by_id("p1")["文献信息"]["标题"] == "First paper"
+
+    path = os.path.join(repository.get_paper_dir("p1"), "analysis.json")
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["文献信息"]["标题"] = "Edited by hand, with a longer title"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+    assert repository.get_literature_by_id("p1")["文献信息"]["标题"] == "Edited by hand, with a longer title"
+
+
+def test_record_cache_validates_tokens_and_evicts_least_recent():
+    cache = RecordCache(max_entries=2)
+    cache.put("p1", "t1", {"n": 1})
+    cache.put("p2", "t1", {"n": 2})
+    assert cache.get("p1", "t1") == {"n": 1}
+    assert cache.get("p1", "t2") is None
+
+    cache.put("p3", "t1", {"n": 3})
+    assert cache.get("p2", "t1") is None
+    assert cache.get("p1", "t1") == {"n": 1}
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,111 @@
+import json
+
+from analysis_core import AnalysisService
+from text_chunking import estimate_tokens, merge_partial_analyses, split_into_chunks, strip_references
+
+SECTIONS = [
+    "Abstract\nWe study sparse attention for long documents in detail.\n\n",
+    "1. Introduction\nLong inputs make dense attention quadratic in cost.\n\n",
+    "2. Methods\nWe keep a sliding window plus a few global tokens per layer.\n\n",
+    "3. Results\nThe sparse model matches dense accuracy at a fraction of the cost.\n\n",
+    "4. Conclusion\nSparse attention is a practical default for long inputs.\n",
+]
+
+
+def test_chunks_follow_section_headings_within_the_budget():
+    text = "".join(SECTIONS)
+    budget = estimate_tokens(SECTIONS[0] + SECTIONS[1])
+
+    chunks = split_into_chunks(text, budget)
+
+    assert "".join(chunks) == text
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= budget for chunk in chunks)
+    # Sections are packed whole, never cut in the middle.
+    for chunk in chunks:
+        assert any(chunk.startswith(section) for section in SECTIONS)
+
+
+def test_oversized_cjk_paragraph_is_hard_split():
+    paragraph = "稀疏注意力在长文档上的表现" * 200
+    chunks = split_into_chunks(paragraph, 100)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 101 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "") == paragraph
+
+
+def test_strip_references_ignores_an_early_table_of_contents():
+    body = "Contents\nReferences\n" + "Body sentence about the method.\n" * 20
+    text = body + "References\n[1] A. Author. Some paper. 2020.\n"
+
+    assert strip_references(text) == body.rstrip()
+    assert strip_references(body) == body
+
+
+def test_merge_keeps_first_scalars_and_deduplicates_lists():
+    partials = [
+        {
+            "文献信息": {"标题": "Sparse attention", "年份": ""},
+            "内容提取": {
+                "摘要": "First abstract.",
+                "结论": ["Linear cost."],
+                "关键图表": [{"图序号": "图1", "核心内容": "Speed"}],
+            },
+        },
+        {
+            "文献信息": {"标题": "Other title", "年份": "2024"},
+            "内容提取": {
+                "摘要": "Second abstract.",
+                "结论": ["Linear cost.", "Same accuracy."],
+                "关键图表": [{"图序号": "图1", "核心内容": "Duplicate"}, {"图序号": "图2", "核心内容": "Accuracy"}],
+            },
+        },
+    ]
+
+    merged = merge_partial_analyses(partials)
+
+    assert merged["文献信息"] == {"标题": "Sparse attention", "年份": "2024"}
+    assert merged["内容提取"]["摘要"] == "First abstract."
+    assert merged["内容提取"]["结论"] == ["Linear cost.", "Same accuracy."]
+    assert [figure["核心内容"] for figure in merged["内容提取"]["关键图表"]] == ["Speed", "Accuracy"]
+
+
+class ScriptedClient:
+    """
+    Answers each request with the next scripted completion text.
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = 0
+
+    def post_json(self, url, headers, payload):
+        self.requests += 1
+        return {"choices": [{"message": {"content": self.replies.pop(0)}}], "usage": {"total_tokens": 1}}
+
+
+def test_reply_without_json_is_asked_again():
+    client = ScriptedClient(["Sorry, I cannot help with that.", json.dumps({"文献信息": {"标题": "T"}})])
+    analyzer = AnalysisService(sharded_text_min_pages=0, llm_client=client)
+
+    result = analyzer.analyze_text_with_deepseek("Some paper text.", "sk-test")
+
+    assert client.requests == 2
+    assert result["文献信息"] == {"标题": "T"}
+
+
+def test_chunked_analysis_makes_one_request_per_chunk_plus_the_merge(llm_stub_url):
+    analyzer = AnalysisService(sharded_text_min_pages=0, api_url=llm_stub_url)
+    analyzer.chunk_tokens = estimate_tokens(SECTIONS[0] + SECTIONS[1])
+    text = "".join(SECTIONS)
+    try:
+        result = analyzer.analyze_text_chunked(text, "sk-test")
+    finally:
+        analyzer.close()
+
+    chunks = len(split_into_chunks(text, analyzer.chunk_tokens))
+    assert "error" not in result
+    assert result["token_usage"]["chunks"] == chunks
+    assert result["token_usage"]["calls"] == chunks + 1
+    assert result["文献信息"]["标题"]
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from vector_index import VectorIndex
+
+pytestmark = pytest.mark.skipif(not VectorIndex.available(), reason="NumPy is not installed")
+
+
+def _record(abstract: str):
+    return {"内容提取": {"摘要": abstract, "结论": [], "创新点": []}}
+
+
+def test_growing_past_capacity_keeps_rows_and_mapped_readers_working(tmp_path):
+    index = VectorIndex(str(tmp_path / "_vectors"), dim=64)
+    index.upsert_many((f"p{n}", _record(f"topic{n % 50} shared words")) for n in range(1000))
+    # Map the current matrix, as a query between ingests would.
+    assert index.similar("p0", k=3)
+
+    index.upsert_many((f"p{n}", _record(f"topic{n % 50} shared words")) for n in range(1000, 1100))
+
+    assert len(index.paper_ids()) == 1100
+    related = dict(index.similar("p1050", k=30))
+    assert "p0" in related and "p1000" in related
+    assert [name for name in os.listdir(index.index_dir) if name.endswith(".f32")] == ["vectors-2048.f32"]
+
+    reopened = VectorIndex(index.index_dir, dim=64)
+    assert reopened.similar("p1050", k=30) == index.similar("p1050", k=30)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = VectorIndex(str(tmp_path / "_vectors"), dim=256)
+    index.upsert_many([
+        ("gnn1", _record("graph neural networks predict molecular properties")),
+        ("gnn2", _record("message passing graph neural networks for molecules")),
+        ("cv", _record("convolutional image classification on imagenet")),
+        ("zh1", _record("图神经网络用于分子性质预测")),
+        ("zh2", _record("基于图神经网络的分子性质预测方法")),
+    ])
+    return index
+
+
+def test_similar_ranks_related_papers_first(index):
+    related = index.similar("gnn1", k=4)
+    assert related[0][0] == "gnn2"
+    assert 0 < related[0][1] <= 1
+    assert "gnn1" not in dict(related)
+    assert "cv" not in dict(related)
+    assert index.similar("zh1", k=1)[0][0] == "zh2"
+    assert index.similar("unknown") is None
+
+
+def test_changed_and_removed_rows_are_seen_by_the_next_query(index):
+    # Unchanged text is not rewritten.
+    assert index.upsert_many([("gnn1", _record("graph neural networks predict molecular properties"))]) == 0
+
+    index.upsert("cv", _record("message passing graph neural networks on images"))
+    assert "cv" in dict(index.similar("gnn2", k=4))
+
+    index.remove("gnn2")
+    assert "gnn2" not in dict(index.similar("gnn1", k=4))
+    assert index.similar("gnn2") is None
+    index.upsert("new", _record("graph neural networks"))
+    assert "new" in dict(index.similar("gnn1", k=4))
+
+
+def test_group_partitions_papers_by_similarity(index):
+    groups = index.group(["cv", "gnn1", "zh1", "gnn2", "zh2", "unindexed"], threshold=0.3)
+    assert sorted(sorted(group) for group in groups) == [
+        ["cv"], ["gnn1", "gnn2"], ["unindexed"], ["zh1", "zh2"],
+    ]
+    assert len(groups[0]) == 2
+    assert index.group(["gnn1"]) == [["gnn1"]]
@@ -0,0 +1,122 @@
+import re
+from typing import Dict, List
+
+# DeepSeek documents roughly 0.6 tokens per CJK character and 0.3 tokens
+# per other character; good enough for budgeting without a tokenizer.
+CJK_TOKEN_RATIO = 0.6
+OTHER_TOKEN_RATIO = 0.3
+
+CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+HEADING_RE = re.compile(
+    r"^[ \t]*(?:(?:\d+(?:\.\d+)*\.?|[IVX]+\.|[一二三四五六七八九十]+[、.．])[ \t]*)?"
+    r"(?:abstract|introduction|background|related work|materials and methods|methods?|methodology|"
+    r"experiments?|experimental|results?(?: and discussion)?|discussion|conclusions?|"
+    r"acknowledge?ments?|appendix|摘要|引言|前言|绪论|方法|实验|结果|讨论|结论|致谢|附录)"
+    r"[^\n]{0,60}$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+REFERENCES_RE = re.compile(
+    r"^[ \t]*(?:\d+\.?[ \t]*)?(?:references|bibliography|literature cited|参考文献)[ \t]*[:：]?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    cjk = len(CJK_RE.findall(text))
+    return int(cjk * CJK_TOKEN_RATIO + (len(text) - cjk) * OTHER_TOKEN_RATIO) + 1
+
+
+def strip_references(text: str, min_position: float = 0.4) -> str:
+    """
+    Drop the reference list (and anything after it, usually appendices).
+
+    Only a heading in the latter part of the text counts, so a table of
+    contents entry near the start never truncates the paper.
+    """
+    cutoff = None
+    for match in REFERENCES_RE.finditer(text):
+        if match.start() >= len(text) * min_position:
+            cutoff = match.start()
+    return text[:cutoff].rstrip() if cutoff is not None else text
+
+
+def _split_sections(text: str) -> List[str]:
+    starts = [match.start() for match in HEADING_RE.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(text)]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(len(starts)) if text[bounds[i]:bounds[i + 1]].strip()]
+
+
+def _split_oversized(section: str, max_tokens: int) -> List[str]:
+    pieces: List[str] = []
+    for paragraph in section.split("\n\n"):
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph + "\n\n")
+            continue
+        # Hard split of a single huge paragraph by characters.
+        step = max(1, int(max_tokens / OTHER_TOKEN_RATIO))
+        if CJK_RE.search(paragraph):
+            step = max(1, int(max_tokens / CJK_TOKEN_RATIO))
+        pieces.extend(paragraph[i:i + step] for i in range(0, len(paragraph), step))
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text on section headings, then pack sections into chunks that
+    stay within ``max_tokens``. Oversized sections fall back to paragraphs.
+    """
+    pieces: List[str] = []
+    for section in _split_sections(text):
+        if estimate_tokens(section) <= max_tokens:
+            pieces.append(section)
+        else:
+            pieces.extend(_split_oversized(section, max_tokens))
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and estimate_tokens(current) + estimate_tokens(piece) > max_tokens:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def merge_partial_analyses(partials: List[Dict]) -> Dict:
+    """
+    Deterministically merge per-chunk analyses into the 文献信息/内容提取 schema.
+
+    Scalars keep the first non-empty value; lists are concatenated without
+    duplicates and 关键图表 entries are de-duplicated by 图序号.
+    """
+    info: Dict = {}
+    content: Dict = {}
+    seen_figures = set()
+
+    for partial in partials:
+        for key, value in (partial.get("文献信息") or {}).items():
+            if value and not info.get(key):
+                info[key] = value
+
+        for key, value in (partial.get("内容提取") or {}).items():
+            if key == "关键图表":
+                figures = content.setdefault(key, [])
+                for figure in value or []:
+                    figure_key = figure.get("图序号") if isinstance(figure, dict) else str(figure)
+                    if figure_key in seen_figures:
+                        continue
+                    seen_figures.add(figure_key)
+                    figures.append(figure)
+            elif isinstance(value, list):
+                merged = content.setdefault(key, [])
+                merged.extend(item for item in value if item and item not in merged)
+            elif value and not content.get(key):
+                content[key] = value
+
+    return {"文献信息": info, "内容提取": content}
@@ -0,0 +1,413 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it related-paper lookups are unavailable.
+    np = None
+
+from search_index import _join, _tokens
+
+# Analysis fields that describe what a paper is about.
+VECTOR_FIELDS = (("内容提取", "摘要"), ("内容提取", "结论"), ("内容提取", "创新点"))
+
+
+def vector_text(record: Dict) -> str:
+    return "\n".join(_join((record.get(section) or {}).get(key)) for section, key in VECTOR_FIELDS)
+
+
+class VectorIndex:
+    """
+    Hashed TF-IDF vectors of paper analyses with batched cosine search.
+
+    Tokens (Latin words, CJK bigrams) are hashed into ``dim`` buckets and
+    stored as sublinear term frequencies, one float32 row per paper, in
+    ``vectors-<capacity>.f32``: a raw matrix that is memory-mapped rather
+    than loaded. ``vectors.sqlite3`` maps paper ids to rows and keeps free
+    rows for reuse.
+
+    Growing writes a new, larger matrix file instead of resizing the mapped
+    one: Windows refuses to resize a file while any process has it mapped.
+
+    IDF weights depend on the whole collection, so they are not baked into
+    the rows; document frequencies and weighted row norms are recomputed in
+    one chunked pass the first time the index is queried after a change
+    (by any process), and every later query is a single matrix product.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS vector_rows (
+        paper_id TEXT PRIMARY KEY,
+        row INTEGER NOT NULL UNIQUE,
+        digest TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS vector_free_rows (
+        row INTEGER PRIMARY KEY
+    );
+    CREATE TABLE IF NOT EXISTS vector_meta (
+        key TEXT PRIMARY KEY,
+        value
+    );
+    INSERT OR IGNORE INTO vector_meta (key, value) VALUES ('rows', 0);
+    INSERT OR IGNORE INTO vector_meta (key, value) VALUES ('capacity', 0);
+    INSERT OR IGNORE INTO vector_meta (key, value) VALUES ('generation', 0);
+    """
+
+    # Rows per block when scanning the matrix, bounding temporary memory.
+    CHUNK_ROWS = 8192
+
+    def __init__(self, index_dir: str, dim: int = 1024):
+        if np is None:
+            raise RuntimeError("VectorIndex requires NumPy")
+        self.index_dir = index_dir
+        self.db_path = os.path.join(index_dir, "vectors.sqlite3")
+        os.makedirs(index_dir, exist_ok=True)
+        self._setup(dim)
+        self._lock = threading.Lock()
+        self._state = None
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None
+
+    def _setup(self, dim: int):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO vector_meta (key, value) VALUES ('dim', ?)", (dim,))
+            self.dim = int(conn.execute("SELECT value FROM vector_meta WHERE key = 'dim'").fetchone()[0])
+            capacity = self._meta(conn)["capacity"]
+        legacy_path = os.path.join(self.index_dir, "vectors.f32")
+        if os.path.exists(legacy_path):
+            # Indexes from before matrix files were named by capacity.
+            os.replace(legacy_path, self.matrix_path(capacity))
+        if self.dim != dim:
+            logging.info(f"Vector index at {self.index_dir} keeps its existing dimension {self.dim}")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _meta(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        return {row["key"]: int(row["value"]) for row in conn.execute("SELECT key, value FROM vector_meta")}
+
+    # ------------------------------------------------------------------ #
+    # Writes
+    # ------------------------------------------------------------------ #
+
+    def vectorize(self, text: str) -> "np.ndarray":
+        vector = np.zeros(self.dim, dtype=np.float32)
+        counts = Counter(zlib.crc32(token.encode("utf-8")) % self.dim for token in _tokens(text or ""))
+        for bucket, count in counts.items():
+            vector[bucket] = 1.0 + math.log(count)
+        return vector
+
+    def upsert(self, paper_id: str, record: Dict):
+        self.upsert_many([(paper_id, record)])
+
+    def upsert_many(self, items: Iterable[Tuple[str, Dict]]) -> int:
+        """
+        Vectorize and store ``(paper_id, record)`` pairs; returns how many
+        rows were written (records whose text is unchanged are skipped).
+        """
+        prepared = []
+        for paper_id, record in items:
+            text = vector_text(record)
+            prepared.append((paper_id, text, hashlib.sha256(text.encode("utf-8")).hexdigest()))
+        if not prepared:
+            return 0
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            meta = self._meta(conn)
+            rows, capacity = meta["rows"], meta["capacity"]
+            writes = []
+            for paper_id, text, digest in prepared:
+                existing = conn.execute(
+                    "SELECT row, digest FROM vector_rows WHERE paper_id = ?", (paper_id,)
+                ).fetchone()
+                if existing and existing["digest"] == digest:
+                    continue
+                if existing:
+                    row = existing["row"]
+                else:
+                    free = conn.execute("SELECT row FROM vector_free_rows ORDER BY row LIMIT 1").fetchone()
+                    if free:
+                        row = free["row"]
+                        conn.execute("DELETE FROM vector_free_rows WHERE row = ?", (row,))
+                    else:
+                        row, rows = rows, rows + 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO vector_rows (paper_id, row, digest) VALUES (?, ?, ?)",
+                    (paper_id, row, digest),
+                )
+                writes.append((row, self.vectorize(text)))
+            if not writes:
+                return 0
+
+            old_capacity = capacity
+            if rows > capacity:
+                capacity = self._grow(capacity, max(rows, capacity * 2, 1024))
+            matrix = np.memmap(self.matrix_path(capacity), dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+            for row, vector in writes:
+                matrix[row] = vector
+            matrix.flush()
+            del matrix
+            conn.execute("UPDATE vector_meta SET value = ? WHERE key = 'rows'", (rows,))
+            conn.execute("UPDATE vector_meta SET value = ? WHERE key = 'capacity'", (capacity,))
+            conn.execute("UPDATE vector_meta SET value = value + 1 WHERE key = 'generation'")
+        if capacity != old_capacity:
+            self._remove_stale_matrices(capacity)
+        return len(writes)
+
+    def matrix_path(self, capacity: int) -> str:
+        return os.path.join(self.index_dir, f"vectors-{capacity}.f32")
+
+    def _grow(self, old_capacity: int, capacity: int) -> int:
+        """
+        Create the matrix file for ``capacity`` rows holding the current
+        rows; the rest are zero-filled.
+        """
+        with self._lock:
+            # Drop this process's mapping of the old file.
+            self._state = None
+        with open(self.matrix_path(capacity), "wb") as f:
+            f.truncate(capacity * self.dim * 4)
+        if old_capacity:
+            old = np.memmap(self.matrix_path(old_capacity), dtype=np.float32, mode="r", shape=(old_capacity, self.dim))
+            new = np.memmap(self.matrix_path(capacity), dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+            for start in range(0, old_capacity, self.CHUNK_ROWS):
+                stop = min(start + self.CHUNK_ROWS, old_capacity)
+                new[start:stop] = old[start:stop]
+            new.flush()
+            del old, new
+        return capacity
+
+    def _remove_stale_matrices(self, capacity: int):
+        """
+        Delete matrix files of earlier capacities. A file still mapped by
+        a reader elsewhere (Windows) is left for a later call.
+        """
+        current = os.path.basename(self.matrix_path(capacity))
+        for name in os.listdir(self.index_dir):
+            if name.startswith("vectors-") and name.endswith(".f32") and name != current:
+                try:
+                    os.remove(os.path.join(self.index_dir, name))
+                except OSError:
+                    pass
+
+    def remove(self, paper_id: str):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = conn.execute("SELECT row FROM vector_rows WHERE paper_id = ?", (paper_id,)).fetchone()
+            if not existing:
+                return
+            meta = self._meta(conn)
+            matrix = np.memmap(
+                self.matrix_path(meta["capacity"]), dtype=np.float32, mode="r+", shape=(meta["capacity"], self.dim)
+            )
+            matrix[existing["row"]] = 0
+            matrix.flush()
+            del matrix
+            conn.execute("DELETE FROM vector_rows WHERE paper_id = ?", (paper_id,))
+            conn.execute("INSERT OR IGNORE INTO vector_free_rows (row) VALUES (?)", (existing["row"],))
+            conn.execute("UPDATE vector_meta SET value = value + 1 WHERE key = 'generation'")
+
+    def retain_only(self, paper_ids: Iterable[str]) -> int:
+        keep = set(paper_ids)
+        removed = [pid for pid in self.paper_ids() if pid not in keep]
+        for paper_id in removed:
+            self.remove(paper_id)
+        return len(removed)
+
+    # ------------------------------------------------------------------ #
+    # Reads
+    # ------------------------------------------------------------------ #
+
+    def is_empty(self) -> bool:
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM vector_rows LIMIT 1").fetchone() is None
+
+    def paper_ids(self) -> List[str]:
+        with self._connect() as conn:
+            return [row["paper_id"] for row in conn.execute("SELECT paper_id FROM vector_rows")]
+
+    def _current(self) -> Optional[Dict]:
+        """
+        Matrix view, id maps, IDF weights and weighted norms for the current
+        generation, recomputed only when the index changed.
+        """
+        while True:
+            try:
+                return self._load_current()
+            except FileNotFoundError:
+                # Another process grew the index (and removed the old
+                # matrix file) after the metadata was read; read it again.
+                continue
+
+    def _load_current(self) -> Dict:
+        with self._connect() as conn:
+            meta = self._meta(conn)
+            if self._state is not None and self._state["generation"] == meta["generation"]:
+                return self._state
+            id_rows = conn.execute("SELECT paper_id, row FROM vector_rows").fetchall()
+
+        with self._lock:
+            if self._state is not None and self._state["generation"] == meta["generation"]:
+                return self._state
+            if not id_rows or meta["rows"] == 0:
+                self._state = {"generation": meta["generation"], "matrix": None}
+                return self._state
+
+            rows = meta["rows"]
+            matrix = np.memmap(
+                self.matrix_path(meta["capacity"]), dtype=np.float32, mode="r", shape=(meta["capacity"], self.dim)
+            )[:rows]
+            df = np.zeros(self.dim, dtype=np.float64)
+            for start in range(0, rows, self.CHUNK_ROWS):
+                df += np.count_nonzero(matrix[start:start + self.CHUNK_ROWS], axis=0)
+            idf = (np.log((1.0 + len(id_rows)) / (1.0 + df)) + 1.0).astype(np.float32)
+            weights_sq = idf * idf
+
+            norms = np.empty(rows, dtype=np.float32)
+            for start in range(0, rows, self.CHUNK_ROWS):
+                block = matrix[start:start + self.CHUNK_ROWS]
+                norms[start:start + len(block)] = np.sqrt((block * block) @ weights_sq)
+
+            row_to_id = [None] * rows
+            for item in id_rows:
+                row_to_id[item["row"]] = item["paper_id"]
+            self._state = {
+                "generation": meta["generation"],
+                "matrix": matrix,
+                "weights_sq": weights_sq,
+                "norms": norms,
+                "row_to_id": row_to_id,
+                "id_to_row": {item["paper_id"]: item["row"] for item in id_rows},
+            }
+            return self._state
+
+    def _scores(self, state: Dict, queries: "np.ndarray") -> "np.ndarray":
+        """
+        Cosine similarity of every row against each query: ``(rows, n)``.
+        """
+        matrix, norms, weights_sq = state["matrix"], state["norms"], state["weights_sq"]
+        weighted = queries * weights_sq
+        query_norms = np.sqrt(np.einsum("ij,ij->i", weighted, queries))
+        scores = np.empty((len(matrix), len(queries)), dtype=np.float32)
+        for start in range(0, len(matrix), self.CHUNK_ROWS):
+            scores[start:start + self.CHUNK_ROWS] = matrix[start:start + self.CHUNK_ROWS] @ weighted.T
+        denominator = np.outer(norms, query_norms)
+        return np.divide(scores, denominator, out=np.zeros_like(scores), where=denominator > 0)
+
+    def _top_k(self, state: Dict, column: "np.ndarray", k: int, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        excluded = set(exclude)
+        take = min(len(column), k + len(excluded))
+        if take <= 0:
+            return []
+        candidates = np.argpartition(-column, take - 1)[:take]
+        results = []
+        for row in candidates[np.argsort(-column[candidates])]:
+            paper_id = state["row_to_id"][row]
+            if paper_id is None or paper_id in excluded or column[row] <= 0:
+                continue
+            results.append((paper_id, round(float(column[row]), 4)))
+            if len(results) == k:
+                break
+        return results
+
+    def similar(self, paper_id: str, k: int = 10) -> Optional[List[Tuple[str, float]]]:
+        """
+        The ``k`` most similar papers as ``(paper_id, cosine)``, or None if
+        ``paper_id`` is not indexed.
+        """
+        state = self._current()
+        if state["matrix"] is None or paper_id not in state["id_to_row"]:
+            return None
+        query = np.array(state["matrix"][state["id_to_row"][paper_id]])[None, :]
+        return self._top_k(state, self._scores(state, query)[:, 0], k, exclude=[paper_id])
+
+    def search_text(self, text: str, k: int = 10) -> List[Tuple[str, float]]:
+        state = self._current()
+        if state["matrix"] is None:
+            return []
+        return self._top_k(state, self._scores(state, self.vectorize(text)[None, :])[:, 0], k)
+
+    def group(self, paper_ids: List[str], threshold: float = 0.25) -> List[List[str]]:
+        """
+        Partition ``paper_ids`` into groups of mutually related papers:
+        connected components of the pairwise cosine >= ``threshold`` graph.
+        Unindexed papers end up alone; larger groups come first.
+        """
+        state = self._current()
+        indexed = [pid for pid in paper_ids if state["matrix"] is not None and pid in state["id_to_row"]]
+        parent = {pid: pid for pid in paper_ids}
+
+        def find(pid):
+            while parent[pid] != pid:
+                parent[pid] = parent[parent[pid]]
+                pid = parent[pid]
+            return pid
+
+        if len(indexed) > 1:
+            vectors = np.array(state["matrix"][[state["id_to_row"][pid] for pid in indexed]])
+            weighted = vectors * np.sqrt(state["weights_sq"])
+            norms = np.linalg.norm(weighted, axis=1)
+            norms[norms == 0] = 1.0
+            unit = weighted / norms[:, None]
+            similarity = unit @ unit.T
+            for i, j in zip(*np.nonzero(np.triu(similarity >= threshold, k=1))):
+                parent[find(indexed[i])] = find(indexed[j])
+
+        groups: Dict[str, List[str]] = {}
+        for pid in paper_ids:
+            groups.setdefault(find(pid), []).append(pid)
+        return sorted(groups.values(), key=len, reverse=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point: ``python vector_index.py rebuild|related``.
+    """
+    from db_manager import LiteratureRepository
+
+    parser = argparse.ArgumentParser(description="Rebuild or query the related-papers vector index.")
+    parser.add_argument("command", choices=["rebuild", "related"])
+    parser.add_argument("paper_id", nargs="?", help="Paper to find related papers for")
+    parser.add_argument("--db", default="literature_db", help="Path to the literature database folder")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    repository = LiteratureRepository(args.db)
+    if repository.vector_index is None:
+        print("NumPy is not installed; the vector index is unavailable")
+        return 1
+
+    if args.command == "related":
+        print(json.dumps(repository.vector_index.similar(args.paper_id, args.k), ensure_ascii=False, indent=2))
+        return 0
+
+    count = repository.rebuild_vector_index()
+    print(f"Vector index rebuilt with {count} records")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production servers, e.g.
+
+    gunicorn -c gunicorn.conf.py
+    waitress-serve --port 5000 wsgi:app
+"""
+from app import create_app
+
+app = create_app()